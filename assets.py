@@ -0,0 +1,332 @@
+"""
+assets.py
+Static asset pipeline: a build step writing content-hashed, minified and
+precompressed copies of ``static/`` into ``static/dist`` with a manifest,
+and the Flask side serving them with far-future immutable caching.
+
+    python -m assets vendor   # fetch third-party client files into static/vendor
+    python -m assets build    # fetch missing vendor files, then hash, minify,
+                              # compress and resize into static/dist
+
+WebP and resized image variants need Pillow, and ``.br`` files need brotli;
+without them the build skips those outputs and keeps the rest.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import urllib.request
+from flask import request, send_from_directory, url_for
+from markupsafe import Markup, escape
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+LOGGER = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+URL_PREFIX = '/assets'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+HASH_LENGTH = 12
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+RESIZABLE = ('.png', '.jpg', '.jpeg')
+DEFAULT_WIDTHS = (480, 960)
+WEBP_QUALITY = 80
+
+# Third-party files served locally so pages work without internet access
+VENDOR_FILES = {
+    'vendor/socket.io.min.js':
+        'https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.1.2/socket.io.min.js',
+}
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)/static/([^'")]+)\1\s*\)''')
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+CSS_COLON = re.compile(r':\s+')
+
+
+def minify_css(text):
+    """
+    Strip comments and redundant whitespace from a stylesheet.
+    """
+    text = CSS_COMMENT.sub('', text)
+    text = CSS_SPACE.sub(' ', text)
+    text = CSS_PUNCTUATION.sub(r'\1', text)
+    text = CSS_COLON.sub(':', text)
+    return text.replace(';}', '}').strip()
+
+
+def hashed_name(name, content):
+    """
+    Insert a content hash before the extension: ``css/a.css`` -> ``css/a.<hash>.css``.
+    """
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def _write(dist_dir, name, content):
+    """
+    Write a build output, creating its directory.
+    """
+    path = os.path.join(dist_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as handle:
+        handle.write(content)
+
+
+def _compress(dist_dir, name, content):
+    """
+    Write ``.gz`` and ``.br`` siblings that are smaller than the original.
+    """
+    encodings = []
+    packed = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(packed) < len(content):
+        _write(dist_dir, name + '.gz', packed)
+        encodings.append('gzip')
+    if brotli is not None:
+        packed = brotli.compress(content, quality=11)
+        if len(packed) < len(content):
+            _write(dist_dir, name + '.br', packed)
+            encodings.append('br')
+    return encodings
+
+
+def _image_variants(dist_dir, name, source, widths):
+    """
+    Write a WebP copy and narrower PNG/JPEG/WebP copies of an image.
+    """
+    variants = {}
+    with Image.open(source) as image:
+        image.load()
+        root = os.path.splitext(name)[0]
+        ext = os.path.splitext(name)[1]
+        sizes = [(image.width, '')] + [(width, f'-{width}w') for width in widths
+                                       if width < image.width]
+        for width, suffix in sizes:
+            resized = image
+            if width != image.width:
+                resized = image.resize((width, round(image.height * width / image.width)))
+            for fmt, out_ext, options in (('WEBP', '.webp', {'quality': WEBP_QUALITY}),
+                                          (None, ext, {'optimize': True})):
+                if fmt is None and not suffix:
+                    continue  # The original is already copied as is
+                target = f'{root}{suffix}{out_ext}'
+                path = os.path.join(dist_dir, target)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                frame = resized
+                if out_ext in ('.jpg', '.jpeg') and frame.mode not in ('RGB', 'L'):
+                    frame = frame.convert('RGB')
+                frame.save(path, fmt, **options)
+                variants.setdefault(str(width), {})[out_ext.lstrip('.')] = target
+    return variants
+
+
+def build(static_dir, dist_dir=None, widths=DEFAULT_WIDTHS):
+    """
+    Build every file under ``static_dir`` into ``dist_dir`` and return the manifest.
+
+    The manifest maps each logical path (relative to ``static_dir``) to its
+    hashed file, the precompressed encodings available and, for images with
+    Pillow installed, WebP and resized variants keyed by width.
+    """
+    dist_dir = os.path.abspath(dist_dir or os.path.join(static_dir, DIST_DIR))
+    sources = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != dist_dir]
+        for filename in files:
+            path = os.path.join(root, filename)
+            sources.append(os.path.relpath(path, static_dir).replace(os.sep, '/'))
+    # Images first so stylesheets can point at their hashed names
+    sources.sort(key=lambda name: (name.endswith('.css'), name))
+    manifest = {}
+    for name in sources:
+        source = os.path.join(static_dir, name)
+        with open(source, 'rb') as handle:
+            content = handle.read()
+        ext = os.path.splitext(name)[1].lower()
+        if ext == '.css':
+            text = CSS_URL.sub(lambda match: _css_url(match, manifest), content.decode('utf-8'))
+            content = minify_css(text).encode('utf-8')
+        target = hashed_name(name, content)
+        _write(dist_dir, target, content)
+        entry = {'file': target, 'size': len(content)}
+        if ext in COMPRESSIBLE:
+            entry['encodings'] = _compress(dist_dir, target, content)
+        if ext in RESIZABLE and Image is not None:
+            try:
+                entry['variants'] = _image_variants(dist_dir, target, source, widths)
+            except OSError as exc:
+                LOGGER.warning("Could not make variants of %s: %s", name, str(exc))
+        manifest[name] = entry
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    if Image is None:
+        LOGGER.warning("Pillow not installed: no WebP or resized images were built")
+    LOGGER.info("Built %d assets into %s", len(manifest), dist_dir)
+    return manifest
+
+
+def _css_url(match, manifest):
+    """
+    Replace a ``url(/static/...)`` reference with its hashed asset URL.
+    """
+    entry = manifest.get(match.group(2))
+    if entry is None:
+        return match.group(0)
+    return f"url('{URL_PREFIX}/{entry['file']}')"
+
+
+def vendor(static_dir, files=None, missing_only=False):
+    """
+    Download the third-party files in ``VENDOR_FILES`` into ``static_dir``,
+    skipping the ones already there when ``missing_only`` is set.
+    """
+    for name, url in (files or VENDOR_FILES).items():
+        if missing_only and os.path.exists(os.path.join(static_dir, name)):
+            continue
+        with urllib.request.urlopen(url, timeout=30) as response:  # nosec - pinned URLs
+            content = response.read()
+        _write(static_dir, name, content)
+        LOGGER.info("Vendored %s (%d bytes, sha256 %s)", name, len(content),
+                    hashlib.sha256(content).hexdigest())
+
+
+class Assets:
+    """
+    Flask integration: template helpers resolving logical paths to hashed
+    URLs, and the ``/assets`` route serving them with immutable caching and
+    the best precompressed encoding the browser accepts.
+
+    Without a built manifest the helpers fall back to ``url_for('static')``,
+    so development works without running the build.
+    """
+
+    def __init__(self, app=None):
+        self.dist_dir = None
+        self.static_dir = None
+        self._manifest = {}
+        self._mtime = None
+        self._warned = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the route and template helpers on an app.
+        """
+        self.static_dir = app.static_folder
+        self.dist_dir = os.path.join(app.static_folder, DIST_DIR)
+        app.add_url_rule(f'{URL_PREFIX}/<path:filename>', 'assets', self.serve)
+        app.context_processor(lambda: {'asset_url': self.url, 'asset_picture': self.picture})
+
+    def manifest(self):
+        """
+        Return the manifest, reloading it when the build rewrote it.
+        """
+        path = os.path.join(self.dist_dir, MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._manifest, self._mtime = {}, None
+            return self._manifest
+        if mtime != self._mtime:
+            with open(path, encoding='utf-8') as handle:
+                self._manifest = json.load(handle)
+            self._mtime = mtime
+        return self._manifest
+
+    def version(self):
+        """
+        Return a token that changes whenever the manifest is rebuilt.
+        """
+        self.manifest()
+        return self._mtime
+
+    def url(self, name):
+        """
+        Return the URL for a static file: hashed when built, else the plain
+        static URL, or the upstream URL of a vendor file not downloaded yet.
+        """
+        entry = self.manifest().get(name)
+        if entry is not None:
+            return f"{URL_PREFIX}/{entry['file']}"
+        if name in VENDOR_FILES and not os.path.exists(os.path.join(self.static_dir, name)):
+            if name not in self._warned:
+                self._warned.add(name)
+                LOGGER.warning("%s not vendored, using %s", name, VENDOR_FILES[name])
+            return VENDOR_FILES[name]
+        return url_for('static', filename=name)
+
+    def picture(self, name, alt='', **attrs):
+        """
+        Return a ``<picture>`` element offering WebP and resized variants when built.
+        """
+        entry = self.manifest().get(name, {})
+        attributes = ''.join(f' {key}="{escape(value)}"' for key, value in attrs.items())
+        img = Markup(f'<img src="{escape(self.url(name))}" alt="{escape(alt)}"{attributes}>')
+        variants = entry.get('variants')
+        if not variants:
+            return img
+        widths = sorted(variants, key=int)
+        srcset = ', '.join(f"{URL_PREFIX}/{variants[w]['webp']} {w}w" for w in widths
+                           if 'webp' in variants[w])
+        return Markup(f'<picture><source type="image/webp" srcset="{escape(srcset)}">'
+                      f'{img}</picture>')
+
+    def serve(self, filename):
+        """
+        Serve a hashed file, precompressed when the client accepts it.
+        """
+        encodings = request.accept_encodings
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encodings[encoding] and os.path.isfile(os.path.join(self.dist_dir,
+                                                                   filename + suffix)):
+                response = send_from_directory(self.dist_dir, filename + suffix,
+                                               mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.dist_dir, filename, mimetype=mimetype)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+def main():
+    """
+    Command line entry point for building and vendoring assets.
+    """
+    parser = argparse.ArgumentParser(description='Build the static asset pipeline')
+    parser.add_argument('command', choices=('build', 'vendor'))
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(__file__), 'static'))
+    parser.add_argument('--widths', type=int, nargs='*', default=list(DEFAULT_WIDTHS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'vendor':
+        vendor(args.static)
+        return
+    try:
+        vendor(args.static, missing_only=True)
+    except OSError as exc:
+        LOGGER.warning("Could not vendor client files, pages will use the CDN: %s", str(exc))
+    build(args.static, widths=args.widths)
+
+
+if __name__ == '__main__':
+    main()
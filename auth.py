@@ -0,0 +1,132 @@
+"""
+auth.py
+Salted password hashing for customer logins and migration of plain-text rows.
+
+Hashes are stored as ``pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>``.
+Rows that predate hashing hold the plain-text password and are upgraded on
+the next successful login, or all at once with:
+    python -m auth migrate --database server.db
+
+Customer names are unique for new rows; older databases may hold several
+rows per name, and all but the oldest are removed with:
+    python -m auth dedupe --database server.db
+"""
+
+import argparse
+import hashlib
+import hmac
+import logging
+import os
+
+LOGGER = logging.getLogger(__name__)
+
+ALGORITHM = 'pbkdf2_sha256'
+DEFAULT_ITERATIONS = 60000
+MAX_ITERATIONS = 5 * DEFAULT_ITERATIONS  # Stored hashes above this cost are refused
+SALT_BYTES = 16
+DUMMY_SALT = b'\0' * SALT_BYTES  # Salt of the check run for names with no customer
+
+
+def hash_password(password, iterations=DEFAULT_ITERATIONS):
+    """
+    Return a salted PBKDF2-SHA256 hash string for a password.
+    """
+    if not 1 <= iterations <= MAX_ITERATIONS:
+        raise ValueError(f"iterations must be between 1 and {MAX_ITERATIONS}")
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f'{ALGORITHM}${iterations}${salt.hex()}${digest.hex()}'
+
+
+def is_hashed(stored):
+    """
+    Check whether a stored password is already in the hashed format.
+    """
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + '$')
+
+
+def parse_hash(stored):
+    """
+    Split a stored hash into ``(iterations, salt bytes, digest hex)``.
+
+    Raises ValueError for a value that is not a well-formed hash, or whose
+    iteration count is above MAX_ITERATIONS, which would stall every login.
+    """
+    parts = stored.split('$') if isinstance(stored, str) else []
+    if len(parts) != 4 or parts[0] != ALGORITHM or not parts[1].isdecimal():
+        raise ValueError(f"not a {ALGORITHM} hash")
+    rounds, salt, expected = int(parts[1]), bytes.fromhex(parts[2]), parts[3]
+    if rounds < 1 or not salt or len(bytes.fromhex(expected)) != hashlib.sha256().digest_size:
+        raise ValueError(f"malformed {ALGORITHM} hash")
+    if rounds > MAX_ITERATIONS:
+        raise ValueError(f"{rounds} iterations is above the limit of {MAX_ITERATIONS}")
+    return rounds, salt, expected
+
+
+def verify_password(stored, password, iterations=DEFAULT_ITERATIONS):
+    """
+    Check a password against a stored value.
+
+    Returns ``(matches, needs_rehash)``: ``needs_rehash`` is True for legacy
+    plain-text rows and for hashes made with a different iteration count.
+    A malformed stored hash, or one above MAX_ITERATIONS, matches nothing.
+    """
+    if not is_hashed(stored):
+        matches = hmac.compare_digest(str(stored).encode('utf-8'), password.encode('utf-8'))
+        return matches, matches
+    try:
+        rounds, salt, expected = parse_hash(stored)
+    except ValueError:
+        LOGGER.warning("Ignoring a malformed stored password hash")
+        return False, False
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, rounds)
+    matches = hmac.compare_digest(digest.hex(), expected)
+    return matches, matches and rounds != iterations
+
+
+def verify_unknown(password, iterations=DEFAULT_ITERATIONS):
+    """
+    Spend the time of one password check for a login naming no customer, so
+    response times do not reveal which names exist; always ``(False, False)``.
+    """
+    hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), DUMMY_SALT, iterations)
+    return False, False
+
+
+def migrate_passwords(customers, iterations=DEFAULT_ITERATIONS):
+    """
+    Hash every plain-text password in the customer table; return the row count.
+    """
+    rows = [(name, password) for name, password in customers.all_passwords()
+            if not is_hashed(password)]
+    customers.update_passwords((hash_password(password, iterations), name, password)
+                               for name, password in rows)
+    LOGGER.info("Migrated %d plain-text passwords", len(rows))
+    return len(rows)
+
+
+def main():
+    """
+    Command line entry point for the password migration.
+    """
+    import db  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description='Customer password maintenance')
+    parser.add_argument('command', choices=['migrate', 'dedupe'])
+    parser.add_argument('--database', default=db.DEFAULT_DATABASE)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    pool = db.ConnectionPool(args.database)
+    customers = db.CustomerRepository(pool)
+    customers.ensure_indexes()
+    if args.command == 'dedupe':
+        LOGGER.info("Removed %d duplicate customer rows", customers.remove_duplicate_names())
+    else:
+        migrate_passwords(customers, args.iterations)
+    pool.close()
+
+
+if __name__ == '__main__':
+    main()
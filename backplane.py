@@ -0,0 +1,290 @@
+"""
+backplane.py
+Message-queue backplane so one bridge process can run the ROS node while any
+number of web workers serve the browsers.
+
+Redis works out of the box through Flask-SocketIO (``redis://`` URLs). For
+hosts without Redis, ``local://<path>`` selects a built-in broker that relays
+pickled Socket.IO messages between processes over a Unix socket:
+
+    python -m backplane broker --address /tmp/parkonomous-bus.sock
+    python -m backplane bridge --message-queue local:///tmp/parkonomous-bus.sock
+    python serve.py --no-ros --port 5001 --message-queue local:///tmp/parkonomous-bus.sock
+    python serve.py --no-ros --port 5002 --message-queue local:///tmp/parkonomous-bus.sock
+
+Put the workers behind a load balancer with sticky sessions (e.g. nginx
+``ip_hash``) so a client's long-polling requests keep reaching the same worker.
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import socket
+import struct
+import threading
+import time
+import socketio
+
+LOGGER = logging.getLogger(__name__)
+
+LOCAL_SCHEME = 'local://'
+DEFAULT_ADDRESS = '/tmp/parkonomous-bus.sock'
+
+FRAME_HEADER = struct.Struct('!I')
+ROLE_PUBLISHER = b'P'
+ROLE_SUBSCRIBER = b'S'
+SEND_TIMEOUT = 5.0  # Seconds before a subscriber that stopped reading is dropped
+
+
+def send_frame(sock, payload):
+    """
+    Send one length-prefixed frame.
+    """
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    """
+    Read exactly ``size`` bytes, or return None if the peer closed the socket.
+    """
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    """
+    Receive one length-prefixed frame, or None at end of stream.
+    """
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, FRAME_HEADER.unpack(header)[0])
+
+
+class LocalBroker:
+    """
+    Relays every frame received from any connection to all subscribers.
+
+    Each connection starts with one role byte: publishers only send, while
+    subscribers receive every frame, including ones their own process
+    published (the Socket.IO managers skip those by host id).
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self._server = None
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._publishers = set()
+        self._closed = threading.Event()
+        self.relayed = 0
+
+    def start(self):
+        """
+        Bind the Unix socket and accept connections in a background thread.
+        """
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            os.unlink(self.address)
+        except FileNotFoundError:
+            pass
+        self._server.bind(self.address)
+        self._server.listen(64)
+        threading.Thread(target=self._accept, name='broker-accept', daemon=True).start()
+        LOGGER.info("Local broker listening on %s", self.address)
+
+    def _accept(self):
+        """
+        Accept loop: subscribers join the fan-out set, publishers get a reader thread.
+        """
+        while not self._closed.is_set():
+            try:
+                client, _ = self._server.accept()
+                role = _recv_exact(client, 1)
+            except OSError:
+                if self._closed.is_set():
+                    break
+                continue
+            if role == ROLE_SUBSCRIBER:
+                client.settimeout(SEND_TIMEOUT)
+                with self._lock:
+                    self._clients.add(client)
+            elif role == ROLE_PUBLISHER:
+                with self._lock:
+                    self._publishers.add(client)
+                threading.Thread(target=self._relay, args=(client,), daemon=True).start()
+            else:
+                client.close()
+
+    def _relay(self, client):
+        """
+        Forward every frame from one publisher to all subscribers.
+        """
+        while True:
+            try:
+                payload = recv_frame(client)
+            except OSError:
+                payload = None
+            if payload is None:
+                break
+            with self._lock:
+                self.relayed += 1
+                for peer in list(self._clients):
+                    try:
+                        send_frame(peer, payload)
+                    except OSError:
+                        self._clients.discard(peer)
+                        peer.close()
+        with self._lock:
+            self._publishers.discard(client)
+        client.close()
+
+    def close(self):
+        """
+        Stop accepting and drop every connection.
+        """
+        self._closed.set()
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            clients = self._clients | self._publishers
+            self._clients, self._publishers = set(), set()
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+
+    def serve_forever(self):
+        """
+        Start and block until closed.
+        """
+        self.start()
+        self._closed.wait()
+
+
+class LocalPubSubManager(socketio.PubSubManager):  # pylint: disable=abstract-method
+    """
+    Socket.IO client manager that publishes through a ``LocalBroker``.
+    """
+    name = 'localpubsub'
+
+    def __init__(self, address=DEFAULT_ADDRESS, channel='flask-socketio', write_only=False,
+                 logger=None, reconnect_delay=1.0):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.address = address
+        self.reconnect_delay = reconnect_delay
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self, role):
+        """
+        Open a connection to the broker in the given role.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.address)
+        sock.sendall(role)
+        return sock
+
+    def _publish(self, data):
+        """
+        Send a message to the broker, reconnecting once if the connection dropped.
+        """
+        payload = pickle.dumps(data)
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect(ROLE_PUBLISHER)
+                    send_frame(self._publisher, payload)
+                    return
+                except OSError:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                    self._publisher = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        """
+        Yield messages relayed by the broker, reconnecting if it restarts.
+        """
+        while True:
+            try:
+                sock = self._connect(ROLE_SUBSCRIBER)
+            except OSError as exc:
+                LOGGER.warning("Broker %s unavailable: %s", self.address, str(exc))
+                time.sleep(self.reconnect_delay)
+                continue
+            while True:
+                try:
+                    payload = recv_frame(sock)
+                except OSError:
+                    payload = None
+                if payload is None:
+                    break
+                yield pickle.loads(payload)
+            sock.close()
+            time.sleep(self.reconnect_delay)
+
+
+def message_queue_options(url, write_only=False):
+    """
+    Return the ``SocketIO`` keyword arguments for a message queue URL.
+
+    ``write_only`` managers publish without subscribing, for processes that
+    emit but serve no clients.
+    """
+    if url.startswith(LOCAL_SCHEME):
+        return {'client_manager': LocalPubSubManager(url[len(LOCAL_SCHEME):],
+                                                     write_only=write_only)}
+    if write_only and url.startswith(('redis://', 'rediss://')):
+        return {'client_manager': socketio.RedisManager(url, channel='flask-socketio',
+                                                        write_only=True)}
+    return {'message_queue': url}
+
+
+def run_bridge(url):
+    """
+    Run the ROS node in this process and publish its events to the message queue.
+    """
+    from web import create_app  # pylint: disable=import-outside-toplevel
+
+    services = create_app({'SOCKETIO_ASYNC_MODE': 'threading', 'SOCKETIO_MESSAGE_QUEUE': url,
+                           'SOCKETIO_QUEUE_WRITE_ONLY': True}).extensions['parkonomous']
+    for vehicle_id in services.get_customers().vehicle_ids():
+        services.ros_bridge.watch_vehicle(vehicle_id)
+    services.start_ros_node()
+    LOGGER.info("ROS bridge publishing to %s", url)
+    threading.Event().wait()
+
+
+def main():
+    """
+    Command line entry point for the broker and the bridge process.
+    """
+    parser = argparse.ArgumentParser(description='Socket.IO message-queue backplane')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    broker = subcommands.add_parser('broker', help='Run the built-in Unix socket broker')
+    broker.add_argument('--address', default=DEFAULT_ADDRESS)
+    bridge = subcommands.add_parser('bridge', help='Run the ROS bridge publishing to a queue')
+    bridge.add_argument('--message-queue', default=LOCAL_SCHEME + DEFAULT_ADDRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'broker':
+        LocalBroker(args.address).serve_forever()
+    else:
+        run_bridge(args.message_queue)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+backpressure.py
+Per-client send-queue monitoring for Socket.IO: clients whose outbound queue
+passes a high-water mark are moved from the shared pose rooms to a slow,
+latest-only schedule, and clients that stay stuck are disconnected.
+"""
+
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HIGH_WATER = 64  # Packets queued for one client before it is slowed down
+DEFAULT_LOW_WATER = 8  # Packets it must drain back to before getting full rate again
+DEFAULT_SLOW_RATE_HZ = 2.0  # Pose updates per second sent to a slowed-down client
+DEFAULT_STALL_SECONDS = 15.0  # Seconds above high water before a client is disconnected
+MIN_RATE_HZ = 0.2  # Lowest max rate a client may ask for
+
+
+class Client:
+    """
+    Pacing state of one connected socket.
+
+    ``rooms`` are the target rooms whose poses the client receives (None is
+    the broadcast stream). A paced client is not in the shared pose rooms;
+    it gets the latest values of its rooms at ``rate`` Hz instead, and
+    ``sent`` holds what it was last sent so unchanged values are skipped.
+    """
+    __slots__ = ('sid', 'rooms', 'pose_format', 'max_rate', 'rate', 'paced', 'throttled',
+                 'over_since', 'next_send', 'sent', 'encoder')
+
+    def __init__(self, sid, rooms, pose_format, max_rate):
+        self.sid = sid
+        self.rooms = rooms
+        self.pose_format = pose_format
+        self.max_rate = max_rate
+        self.rate = None
+        self.paced = False
+        self.throttled = False
+        self.over_since = None
+        self.next_send = 0.0
+        self.sent = {}
+        self.encoder = None
+
+
+class Backpressure:
+    """
+    Watches the outbound queue of every client on each fan-out tick.
+
+    ``queue_size(sid)`` returns the packets waiting for a client, or None
+    once its socket is gone. ``pace(client)`` is called when a client is
+    added and whenever ``client.paced`` changes; it puts the client in the
+    shared pose rooms when it is not paced and takes it out when it is.
+    ``send(client)`` pushes the latest values to a paced client and
+    ``disconnect(sid)`` drops a client.
+
+    A client past ``high_water`` is throttled to ``slow_rate_hz`` and is
+    sent nothing more from the pose streams until its queue drains below
+    ``high_water``; it gets its requested rate back once the queue is at
+    ``low_water`` or less. A client above ``high_water`` for
+    ``stall_seconds`` is disconnected, so each client holds at most about
+    ``high_water`` packets plus the low-rate events of ``stall_seconds``.
+    """
+
+    def __init__(self, queue_size, pace, send, disconnect, full_rate_hz,
+                 high_water=DEFAULT_HIGH_WATER, low_water=DEFAULT_LOW_WATER,
+                 slow_rate_hz=DEFAULT_SLOW_RATE_HZ, stall_seconds=DEFAULT_STALL_SECONDS,
+                 clock=time.monotonic):
+        if not 0 <= low_water < high_water:
+            raise ValueError("low_water must be below high_water")
+        self._queue_size = queue_size
+        self._pace = pace
+        self._send = send
+        self._disconnect = disconnect
+        self.full_rate_hz = full_rate_hz
+        self.high_water = high_water
+        self.low_water = low_water
+        self.slow_rate_hz = slow_rate_hz
+        self.stall_seconds = stall_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._clients = {}
+        self.throttled = 0
+        self.restored = 0
+        self.disconnected = 0
+        self.paced_sends = 0
+        self.max_queued = 0
+
+    def add(self, sid, rooms, pose_format='json', max_rate=None):
+        """
+        Start watching a client; ``max_rate`` is the pose rate in Hz it asked for.
+
+        A client asking for less than the full rate is paced from the start.
+        """
+        if max_rate is not None:
+            max_rate = min(max(float(max_rate), MIN_RATE_HZ), self.full_rate_hz)
+        client = Client(sid, list(rooms), pose_format, max_rate)
+        self._update(client)
+        with self._lock:
+            self._clients[sid] = client
+        self._pace(client)
+        return client
+
+    def remove(self, sid):
+        """
+        Stop watching a client, e.g. when it disconnects.
+        """
+        with self._lock:
+            return self._clients.pop(sid, None)
+
+    def _update(self, client):
+        """
+        Set a client's rate from its request and throttling; returns True if
+        it moved in or out of pacing.
+        """
+        rate = client.max_rate or self.full_rate_hz
+        if client.throttled:
+            rate = min(rate, self.slow_rate_hz)
+        client.rate = rate
+        paced = rate < self.full_rate_hz
+        changed = paced != client.paced
+        client.paced = paced
+        return changed
+
+    def _set_throttled(self, client, throttled):
+        """
+        Throttle or restore a client and move it between the shared and paced streams.
+        """
+        client.throttled = throttled
+        if self._update(client):
+            self._pace(client)
+
+    def check(self):
+        """
+        Check every client's queue once, throttling, restoring, disconnecting
+        and sending paced updates as needed. Runs on each fan-out tick.
+        """
+        now = self._clock()
+        with self._lock:
+            clients = list(self._clients.values())
+        peak = 0
+        for client in clients:
+            size = self._queue_size(client.sid)
+            if size is None:
+                continue
+            peak = max(peak, size)
+            if size > self.high_water:
+                if client.over_since is None:
+                    client.over_since = now
+                elif now - client.over_since >= self.stall_seconds:
+                    LOGGER.warning("Disconnecting %s: %d packets queued for %.0fs",
+                                   client.sid, size, now - client.over_since)
+                    self.remove(client.sid)
+                    self.disconnected += 1
+                    self._disconnect(client.sid)
+                    continue
+                if not client.throttled:
+                    LOGGER.info("Slowing %s to %.1f Hz: %d packets queued",
+                                client.sid, self.slow_rate_hz, size)
+                    self.throttled += 1
+                    self._set_throttled(client, True)
+                continue
+            client.over_since = None
+            if client.throttled and size <= self.low_water:
+                LOGGER.info("Restoring %s: send queue drained", client.sid)
+                self.restored += 1
+                self._set_throttled(client, False)
+            if client.paced and now >= client.next_send:
+                client.next_send = now + 1.0 / client.rate
+                self._send(client)
+                self.paced_sends += 1
+        self.max_queued = peak
+
+    def stats(self):
+        """
+        Return the client counts, the throttle and disconnect counters and the
+        longest queue seen on the last check.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+        return {
+            'clients': len(clients),
+            'paced': sum(1 for client in clients if client.paced),
+            'throttling': sum(1 for client in clients if client.throttled),
+            'throttled': self.throttled,
+            'restored': self.restored,
+            'disconnected': self.disconnected,
+            'paced_sends': self.paced_sends,
+            'max_queued': self.max_queued,
+        }
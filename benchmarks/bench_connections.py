@@ -0,0 +1,110 @@
+"""
+Connection-scaling benchmark for serve.py: opens Socket.IO clients in steps
+and reports server memory and OS threads per connection for each backend,
+and the largest step where every client connected and stayed connected.
+
+Run from the repository root (Linux only, reads /proc):
+    python -m benchmarks.bench_connections --backends threading eventlet --steps 100 500 1000
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import socketio
+
+def proc_status(pid):
+    """Return (rss_kib, threads) for a process from /proc."""
+    fields = {}
+    with open(f'/proc/{pid}/status', encoding='utf-8') as handle:
+        for line in handle:
+            key, _, value = line.partition(':')
+            fields[key] = value.strip()
+    return int(fields['VmRSS'].split()[0]), int(fields['Threads'])
+
+def wait_until_up(port, timeout=15.0):
+    """Poll the server until it answers HTTP."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/fanout_stats', timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+async def open_clients(port, count, transport):
+    """Connect ``count`` more clients; return (clients, failures)."""
+    clients = []
+    failures = 0
+
+    async def connect():
+        nonlocal failures
+        client = socketio.AsyncClient(reconnection=False)
+        try:
+            await client.connect(f'http://127.0.0.1:{port}', transports=[transport],
+                                 wait_timeout=10)
+            clients.append(client)
+        except (socketio.exceptions.ConnectionError, asyncio.TimeoutError):
+            failures += 1
+
+    for start in range(0, count, 50):
+        await asyncio.gather(*(connect() for _ in range(min(50, count - start))))
+    return clients, failures
+
+async def run_backend(backend, args):
+    """Measure one backend across the connection steps."""
+    if backend != 'threading' and importlib.util.find_spec(backend) is None:
+        print(f"{backend}: not installed, skipped")
+        return
+    server = subprocess.Popen([sys.executable, 'serve.py', '--backend', backend, '--port',
+                               str(args.port), '--no-ros'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(args.port):
+            print(f"{backend}: server did not start")
+            return
+        await asyncio.sleep(0.5)
+        base_rss, base_threads = proc_status(server.pid)
+        print(f"{backend}: idle rss {base_rss / 1024:.1f} MiB, {base_threads} threads")
+        clients = []
+        sustained = 0
+        for step in args.steps:
+            opened, failures = await open_clients(args.port, step - len(clients), args.transport)
+            clients.extend(opened)
+            await asyncio.sleep(args.settle)
+            alive = sum(1 for client in clients if client.connected)
+            rss, threads = proc_status(server.pid)
+            per_conn = (rss - base_rss) / max(alive, 1)
+            print(f"{backend}: {alive:>6}/{step} connected  rss {rss / 1024:8.1f} MiB  "
+                  f"{per_conn:6.1f} KiB/conn  {threads:>5} threads  {failures} failed")
+            if failures or alive < step:
+                break
+            sustained = step
+        print(f"{backend}: max sustained clients {sustained}")
+        await asyncio.gather(*(client.disconnect() for client in clients),
+                             return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    """Run the scaling steps for each requested backend."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backends', nargs='+', default=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--steps', type=int, nargs='+', default=[50, 200, 500, 1000])
+    parser.add_argument('--port', type=int, default=5066)
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help='Seconds to wait after each step before measuring')
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for backend in args.backends:
+        asyncio.run(run_backend(backend, args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Concurrency stress benchmark for login lookups under concurrent registrations.
+
+Compares the original per-request ``sqlite3.connect`` with the default
+journal and the original login query against the pooled WAL access layer
+in db.py. Both arms start from the same schema and indexes and are given
+the same ``--busy-timeout``. Run from the repository root:
+    python -m benchmarks.bench_db_login
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import db
+
+SCHEMA = '''CREATE TABLE customer (
+                name TEXT PRIMARY KEY,
+                password TEXT NOT NULL,
+                mobile_number INTEGER NOT NULL,
+                vehicle_id INTEGER NOT NULL)'''
+
+def make_database(seed_users):
+    """Create a temporary database seeded with customers; return its path."""
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    con = sqlite3.connect(path)
+    con.execute(SCHEMA)
+    for statement in db.CUSTOMER_INDEXES:
+        con.execute(statement)
+    con.executemany(db.INSERT_CUSTOMER,
+                    [(f'seed{i}', 'pw', 5550000 + i, i) for i in range(seed_users)])
+    con.commit()
+    con.close()
+    return path
+
+def remove_database(path):
+    """Delete a database and its WAL side files."""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+def baseline_ops(path, busy_timeout):
+    """Login/register functions shaped like the original app.py routes."""
+    def login(name):
+        con = sqlite3.connect(path, timeout=busy_timeout)
+        con.execute("SELECT * FROM customer WHERE name=? AND password=?", (name, 'pw')).fetchone()
+        con.close()
+
+    def register(name, index):
+        con = sqlite3.connect(path, timeout=busy_timeout)
+        con.execute(db.INSERT_CUSTOMER, (name, 'pw', 5550000 + index, index))
+        con.commit()
+        con.close()
+    return login, register, lambda: None
+
+def pooled_ops(path, busy_timeout):
+    """Login/register functions going through the pooled, cached repository."""
+    pool = db.ConnectionPool(path, busy_timeout_ms=busy_timeout * 1000)
+    customers = db.CustomerRepository(pool, db.CustomerCache())
+    return (customers.find_by_name,
+            lambda name, index: customers.insert(name, 'pw', 5550000 + index, index),
+            pool.close)
+
+def run(ops_factory, args):
+    """Run the mixed workload and return (login latencies, logins, errors)."""
+    path = make_database(args.seed_users)
+    login, register, close = ops_factory(path, args.busy_timeout)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def login_worker(index):
+        local = []
+        failed = 0
+        for i in range(args.logins):
+            start = time.perf_counter()
+            try:
+                login(f'seed{(index * 31 + i) % args.seed_users}')
+            except sqlite3.Error:
+                failed += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    def register_worker(index):
+        for i in range(args.registrations):
+            try:
+                register(f'new{index}_{i}', i)
+            except sqlite3.Error:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(args.login_threads)]
+    threads += [threading.Thread(target=register_worker, args=(i,))
+                for i in range(args.register_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    close()
+    remove_database(path)
+    return sorted(latencies), errors[0]
+
+def percentile(values, fraction):
+    """Return the given percentile of a sorted list."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    """Run the workload against both access layers and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--register-threads', type=int, default=4)
+    parser.add_argument('--logins', type=int, default=500, help='Logins per thread')
+    parser.add_argument('--registrations', type=int, default=200, help='Registrations per thread')
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--busy-timeout', type=float, default=5.0,
+                        help="Seconds either arm waits on a locked database; 5 is the "
+                             "sqlite3.connect default the original routes ran with")
+    args = parser.parse_args()
+
+    total_ops = (args.login_threads * args.logins
+                 + args.register_threads * args.registrations)
+    for name, factory in (('before', baseline_ops), ('after', pooled_ops)):
+        latencies, errors = run(factory, args)
+        print(f"{name:>6}: login p50 {percentile(latencies, 0.50) * 1000:7.2f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms  "
+              f"error rate {errors / total_ops:6.2%}")
+
+if __name__ == '__main__':
+    main()
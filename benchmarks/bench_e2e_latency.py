@@ -0,0 +1,141 @@
+"""
+End-to-end latency benchmark for the map pipeline: simulated poses are fed
+into ROSNode callbacks and received by many Socket.IO clients.
+
+The frame index is encoded in the x coordinate (index / 1000, which survives
+the 3-decimal rounding), so each client can match what it receives to the
+moment the callback was invoked. Frames a client never sees were coalesced
+away by the fan-out and are reported as dropped. Run from the repository root:
+    python -m benchmarks.bench_e2e_latency --clients 50 --rate 100 --duration 10
+"""
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from types import SimpleNamespace
+import socketio
+
+try:
+    import rclpy  # pylint: disable=unused-import
+except ImportError:
+    # Without ROS, use the test stand-ins so the real callbacks can still run
+    from tests import fake_ros
+    fake_ros.install()
+
+from web import create_app  # pylint: disable=wrong-import-position
+from bridge.node import ROSNode  # pylint: disable=wrong-import-position
+from simulator import PoseReplayer  # pylint: disable=wrong-import-position
+
+# Set once every client is connected, so the replay starts with a full audience
+ready = threading.Event()
+
+def percentile(values, fraction):
+    """Return the given percentile of a sorted list, or NaN when empty."""
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def start_server(application, port):
+    """Serve the app with Socket.IO in a background thread."""
+    thread = threading.Thread(
+        target=application.extensions['parkonomous'].socketio.run, args=(application,),
+        kwargs={'host': '127.0.0.1', 'port': port, 'allow_unsafe_werkzeug': True,
+                'log_output': False},
+        daemon=True)
+    thread.start()
+    time.sleep(1.0)
+
+async def run_clients(args, sent_at, done):
+    """Connect the clients, collect latencies until the replay ends, disconnect."""
+    latencies = []
+    received = []
+    clients = []
+
+    async def connect(index):
+        client = socketio.AsyncClient(reconnection=False)
+        count = [0]
+
+        @client.on('pose_update')
+        async def on_pose(data):
+            now = time.perf_counter()
+            frame = round(data['x'] * 1000)
+            if frame in sent_at:
+                latencies.append(now - sent_at[frame])
+            count[0] += 1
+
+        await client.connect(f'http://127.0.0.1:{args.port}', transports=[args.transport])
+        clients.append(client)
+        received.append(count)
+        return index
+
+    await asyncio.gather(*(connect(i) for i in range(args.clients)))
+    ready.set()
+    while not done.is_set():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)  # Let the last flush arrive
+    await asyncio.gather(*(client.disconnect() for client in clients))
+    return sorted(latencies), [count[0] for count in received]
+
+def main():
+    """Replay poses into ROSNode callbacks and report latency, throughput and drops."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=50.0, help='Pose callback rate in Hz')
+    parser.add_argument('--duration', type=float, default=5.0, help='Replay length in seconds')
+    parser.add_argument('--fanout-hz', type=float, default=None,
+                        help='Override POSE_FANOUT_HZ for this run')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # Threading mode, so the fan-out loop runs beside the asyncio clients
+    config = {'SOCKETIO_ASYNC_MODE': 'threading'}
+    if args.fanout_hz:
+        config['POSE_FANOUT_HZ'] = args.fanout_hz
+    application = create_app(config)
+    services = application.extensions['parkonomous']
+    services.fanout.start()
+    start_server(application, args.port)
+
+    frames = int(args.rate * args.duration)
+    trajectory = [(i / 1000.0, 1.0) for i in range(frames)]
+    sent_at = {}
+    # The state pose_callback feeds besides the fan-out, as on the app's own node
+    node = SimpleNamespace(fanout=services.fanout, last_values=services.last_values,
+                           history=services.history, eta=services.eta)
+    replayer = PoseReplayer(lambda msg: ROSNode.pose_callback(node, msg), trajectory, args.rate,
+                            on_send=lambda index, stamp: sent_at.__setitem__(index, stamp))
+    done = threading.Event()
+
+    def replay():
+        ready.wait()
+        try:
+            replayer.run()
+        finally:
+            done.set()
+
+    threading.Thread(target=replay, daemon=True).start()
+    start = time.perf_counter()
+    latencies, counts = asyncio.run(run_clients(args, sent_at, done))
+    elapsed = time.perf_counter() - start
+    stats = services.fanout.stats()
+    services.fanout.stop(timeout=1)
+
+    delivered = sum(counts)
+    expected = replayer.sent * args.clients
+    print(f"clients {args.clients}  callbacks {replayer.sent} at {args.rate:g} Hz "
+          f"({replayer.late} late)  fan-out emitted {stats['emitted']} "
+          f"coalesced {stats['coalesced']}")
+    print(f"latency ms: p50 {percentile(latencies, 0.50) * 1000:.2f}  "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}  "
+          f"max {percentile(latencies, 1.0) * 1000:.2f}")
+    print(f"throughput {delivered / elapsed:.0f} msgs/s delivered  "
+          f"dropped {expected - delivered} of {expected} "
+          f"({(expected - delivered) / max(expected, 1):.1%})")
+
+if __name__ == '__main__':
+    main()
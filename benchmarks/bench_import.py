@@ -0,0 +1,74 @@
+"""
+Benchmark of bulk customer import versus one insert and commit per row.
+
+Runs against a copy of server.db, so the tracked database is left as it is.
+Passwords in the generated file are already hashed, so both paths measure
+parsing and inserting; the PBKDF2 cost per row is measured separately.
+Run from the repository root:
+    python -m benchmarks.bench_import --rows 100000
+"""
+
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+import auth
+import db
+import importer
+
+def generate(rows, password, start=0):
+    """Return a CSV file with ``rows`` customers sharing one hashed password."""
+    lines = ['name,password,contact,vehicle_id']
+    lines.extend(f'bulk_{index},{password},{5550000000 + index},{index % 5000}'
+                 for index in range(start, start + rows))
+    return '\n'.join(lines) + '\n'
+
+def main():
+    """Import the same rows row by row and in executemany chunks and report rows/sec."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--baseline-rows', type=int, default=2000,
+                        help='Rows inserted one transaction at a time')
+    parser.add_argument('--chunk-size', type=int, default=importer.DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--database', default=db.DEFAULT_DATABASE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'server.db')
+    shutil.copy(args.database, path)
+    pool = db.ConnectionPool(path)
+    customers = db.CustomerRepository(pool)
+    customers.ensure_indexes()
+    try:
+        start = time.perf_counter()
+        for _ in range(10):
+            password = auth.hash_password('secret')
+        hash_ms = (time.perf_counter() - start) / 10 * 1000
+
+        start = time.perf_counter()
+        for index in range(args.baseline_rows):
+            customers.insert(f'single_{index}', password, 5550000000 + index, index % 5000)
+        single = args.baseline_rows / (time.perf_counter() - start)
+
+        data = generate(args.rows, password)
+        start = time.perf_counter()
+        report = importer.import_customers(customers, io.StringIO(data), 'csv',
+                                           chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        bulk = report.imported / elapsed
+
+        print(f"one row per transaction {single:10.0f} rows/s  "
+              f"({args.rows / single:.1f}s for {args.rows} rows)")
+        print(f"bulk import, chunks {args.chunk_size:<5d}{bulk:10.0f} rows/s  "
+              f"({elapsed:.1f}s for {report.imported} rows, {bulk / single:.0f}x)")
+        print(f"password hashing        {hash_ms:10.1f} ms/row with "
+              f"{auth.DEFAULT_ITERATIONS} iterations, on {os.cpu_count()} CPUs")
+        print({key: value for key, value in report.to_dict().items() if key != 'errors'})
+    finally:
+        pool.close()
+        shutil.rmtree(workdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of login throughput with the customer cache cold and warm.
+
+Each login is a name lookup plus a password check, as done by the /login
+route. Run from the repository root:
+    python -m benchmarks.bench_login_cache --iterations 1000 60000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import auth
+import db
+
+def make_customers(path, users, iterations):
+    """Create a customer table of hashed passwords and return its repository."""
+    pool = db.ConnectionPool(path)
+    with pool.transaction() as con:
+        con.execute('''CREATE TABLE customer(sno INTEGER PRIMARY KEY, name TEXT,
+                       password TEXT, mobile_number INTEGER, vehicle_id INTEGER)''')
+        stored = auth.hash_password('pw', iterations)
+        con.executemany(db.INSERT_CUSTOMER,
+                        [(f'user{i}', stored, 5550000 + i, i) for i in range(users)])
+    customers = db.CustomerRepository(pool, db.CustomerCache(size=users))
+    customers.ensure_indexes()
+    return customers
+
+def logins_per_second(customers, names, check, warm):
+    """Run one login per name and return the achieved rate."""
+    if warm:
+        for name in names:
+            customers.find_by_name(name)
+    start = time.perf_counter()
+    for name in names:
+        if not warm:
+            customers.cache.invalidate(name)
+        record = customers.find_by_name(name)
+        check(record[1])
+    return len(names) / (time.perf_counter() - start)
+
+def main():
+    """Measure cold and warm logins/sec for each hashing cost."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--iterations', type=int, nargs='+',
+                        default=[0, 1000, auth.DEFAULT_ITERATIONS],
+                        help='PBKDF2 iteration counts; 0 skips hashing to isolate lookups')
+    args = parser.parse_args()
+
+    for iterations in args.iterations:
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        customers = make_customers(path, args.users, max(iterations, 1))
+        names = [f'user{i}' for i in range(args.users)]
+        if iterations:
+            check = lambda stored, rounds=iterations: auth.verify_password(stored, 'pw', rounds)
+        else:
+            check = lambda stored: None  # Lookup cost only
+        cold = logins_per_second(customers, names, check, warm=False)
+        warm = logins_per_second(customers, names, check, warm=True)
+        print(f"iterations {iterations:>6}: cold {cold:10.0f} logins/s  warm {warm:10.0f} logins/s")
+        customers.pool.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of parking_status traffic with full maps versus settled deltas.
+
+Run from the repository root:
+    python -m benchmarks.bench_occupancy
+"""
+
+import argparse
+import json
+import random
+import time
+from occupancy import OccupancyMap, status_payload
+
+def readings(count, spots, flap_ratio, seed=1):
+    """Yield (time, spot_id, occupied) readings, some of them sensor flaps.
+
+    A flap is a reading immediately contradicted 50 ms later.
+    """
+    rng = random.Random(seed)
+    state = [False] * spots
+    now = 0.0
+    for _ in range(count):
+        now += 0.01
+        spot = rng.randrange(spots)
+        if rng.random() < flap_ratio:
+            yield now, spot, not state[spot]
+            yield now + 0.05, spot, state[spot]
+        else:
+            state[spot] = not state[spot]
+            yield now, spot, state[spot]
+
+def encoded_size(payload):
+    """Size of a payload as the JSON text Socket.IO sends."""
+    return len(json.dumps(payload, separators=(',', ':')))
+
+def bench_full(stream, spots):
+    """Send the whole map on every reading, as a naive publisher would."""
+    state = {spot: True for spot in range(spots)}
+    messages = size = 0
+    start = time.perf_counter()
+    for _, spot, occupied in stream:
+        state[spot] = not occupied
+        size += encoded_size(status_payload(state, snapshot=True))
+        messages += 1
+    return messages, size, time.perf_counter() - start
+
+def bench_delta(stream, spots, rate, settle):
+    """Feed the occupancy map and send only settled changes on each tick."""
+    lot = OccupancyMap(spots, settle=settle)
+    interval = 1.0 / rate
+    next_tick = interval
+    messages = size = 0
+    start = time.perf_counter()
+    for now, spot, occupied in stream:
+        while now >= next_tick:
+            changed = lot.collect(next_tick)
+            if changed:
+                size += encoded_size(status_payload(changed))
+                messages += 1
+            next_tick += interval
+        lot.update(spot, occupied, now)
+    elapsed = time.perf_counter() - start
+    return messages, size, elapsed, lot.stats()
+
+def main():
+    """Replay the same readings through both publishers and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--spots', type=int, default=500)
+    parser.add_argument('--readings', type=int, default=20000)
+    parser.add_argument('--flap-ratio', type=float, default=0.2)
+    parser.add_argument('--rate', type=float, default=15.0, help='Flush rate in Hz')
+    parser.add_argument('--settle', type=float, default=0.5)
+    args = parser.parse_args()
+
+    stream = list(readings(args.readings, args.spots, args.flap_ratio))
+    print(f"{args.spots} spots, {len(stream)} readings ({args.flap_ratio:.0%} flaps), "
+          f"snapshot {encoded_size(status_payload(OccupancyMap(args.spots).snapshot(), True))} B")
+    messages, size, elapsed = bench_full(stream, args.spots)
+    print(f"  full: {messages:6d} messages  {size / 1024:9.1f} KiB  "
+          f"{size / max(messages, 1):7.1f} B/message  {len(stream) / elapsed:9.0f} readings/s")
+    messages, size, elapsed, stats = bench_delta(stream, args.spots, args.rate, args.settle)
+    print(f" delta: {messages:6d} messages  {size / 1024:9.1f} KiB  "
+          f"{size / max(messages, 1):7.1f} B/message  {len(stream) / elapsed:9.0f} readings/s  "
+          f"({stats['suppressed']} flaps suppressed)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark of page throughput with rendering on every request versus the page cache.
+
+Requests go through the Flask test client, so the numbers include routing
+and response building but no network. Run from the repository root:
+    python -m benchmarks.bench_page_cache --requests 2000
+"""
+
+import argparse
+import time
+
+try:
+    import rclpy  # pylint: disable=unused-import
+except ImportError:
+    # Without ROS, use the test stand-ins so the app module can be imported
+    from tests import fake_ros
+    fake_ros.install()
+
+import app  # pylint: disable=wrong-import-position
+
+PAGES = ('/', '/about', '/register', '/service')
+
+def requests_per_second(client, count, headers=None):
+    """Request the pages round-robin and return the achieved rate."""
+    start = time.perf_counter()
+    for index in range(count):
+        response = client.get(PAGES[index % len(PAGES)], headers=headers)
+        response.close()
+    return count / (time.perf_counter() - start)
+
+def main():
+    """Measure requests/sec uncached, cached, and for conditional revalidation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = app.APP.test_client()
+    app.PAGE_CACHE.enabled = False
+    uncached = requests_per_second(client, args.requests)
+    app.PAGE_CACHE.enabled = True
+    app.PAGE_CACHE.clear()
+    cached = requests_per_second(client, args.requests)
+    etags = ', '.join(client.get(page).headers['ETag'] for page in PAGES)
+    revalidated = requests_per_second(client, args.requests, {'If-None-Match': etags})
+    print(f"render every time {uncached:10.0f} req/s")
+    print(f"page cache        {cached:10.0f} req/s  ({cached / uncached:.1f}x)")
+    print(f"304 revalidation  {revalidated:10.0f} req/s  ({revalidated / uncached:.1f}x)")
+    print(app.PAGE_CACHE.stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark comparing the JSON pose dicts with the binary pose frames.
+
+Run from the repository root:
+    python -m benchmarks.bench_pose_frames
+"""
+
+import argparse
+import json
+import math
+import time
+from socketio import packet
+from frames import PoseFrameEncoder
+
+def trajectory(count):
+    """Yield (car, user) pose pairs along a slow loop around the lot."""
+    for i in range(count):
+        angle = i * 0.01
+        car = (round(5.0 + 4.0 * math.cos(angle), 3), round(5.0 + 4.0 * math.sin(angle), 3))
+        user = (round(9.0 + 0.002 * i, 3), round(1.0, 3))
+        yield car, user
+
+def wire_bytes(encoded):
+    """Size of an encoded Socket.IO packet including binary attachments.
+
+    Binary attachments travel after a text header with a placeholder, so the
+    wire size is the header plus the raw frame.
+    """
+    if isinstance(encoded, list):
+        return sum(len(part) for part in encoded)
+    return len(encoded.encode('utf-8'))
+
+def bench_json(poses):
+    """Encode each pose pair as the two JSON events the server used to emit."""
+    payload = wire = 0
+    start = time.perf_counter()
+    for car, user in poses:
+        for event, pose in (('pose_update', car), ('user_update', user)):
+            data = {'x': pose[0], 'y': pose[1]}
+            payload += len(json.dumps(data, separators=(',', ':')))
+            wire += wire_bytes(packet.Packet(packet.EVENT, data=[event, data]).encode())
+    return payload, wire, time.perf_counter() - start
+
+def bench_binary(poses):
+    """Encode each pose pair as a single binary pose frame."""
+    encoder = PoseFrameEncoder()
+    payload = wire = 0
+    start = time.perf_counter()
+    for car, user in poses:
+        frame = encoder.encode(car=car, user=user)
+        payload += len(frame)
+        wire += wire_bytes(packet.Packet(packet.EVENT, data=['pose_frame', frame]).encode())
+    return payload, wire, time.perf_counter() - start
+
+def main():
+    """Run both encoders over the same trajectory and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=100000)
+    parser.add_argument('--rate', type=float, default=15.0, help='Flush rate in Hz')
+    args = parser.parse_args()
+
+    poses = list(trajectory(args.frames))
+    for name, bench in (('json', bench_json), ('binary', bench_binary)):
+        payload, wire, elapsed = bench(poses)
+        per_frame = wire / args.frames
+        print(f"{name:>6}: payload {payload / args.frames:5.1f} B/frame  "
+              f"wire {per_frame:5.1f} B/frame  {per_frame * args.rate:7.1f} B/s per client "
+              f"at {args.rate:g} Hz  {elapsed / args.frames * 1e6:6.2f} us/frame encode")
+
+if __name__ == '__main__':
+    main()
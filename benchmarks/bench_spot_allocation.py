@@ -0,0 +1,81 @@
+"""
+Benchmark of concurrent nearest-free spot allocation over a large lot.
+
+Compares the grid index with an exhaustive scan under the same lock. Run
+from the repository root:
+    python -m benchmarks.bench_spot_allocation --spots 10000 --requests 1000
+"""
+
+import argparse
+import math
+import random
+import statistics
+import threading
+import time
+from spots import Spot, SpotRegistry
+
+class LinearRegistry(SpotRegistry):
+    """Same reservations, but every query scans every spot."""
+
+    def _nearest(self, xpos, ypos, count):
+        hits = [(math.hypot(self._xs[i] - xpos, self._ys[i] - ypos), self._ids[i])
+                for i in range(len(self._ids)) if self._is_free(self._ids[i])]
+        return sorted(hits)[:count]
+
+def make_lot(count, spacing=2.5):
+    """Lay out roughly square rows of spots ``spacing`` metres apart."""
+    columns = int(math.ceil(math.sqrt(count)))
+    return [Spot(i, (i % columns) * spacing, (i // columns) * spacing) for i in range(count)]
+
+def run(registry, requests, threads, extent, seed=3):
+    """Allocate one spot per vehicle from ``threads`` threads at once.
+
+    Returns per-request latencies in seconds and the wall time.
+    """
+    rng = random.Random(seed)
+    positions = [(rng.uniform(0, extent), rng.uniform(0, extent)) for _ in range(requests)]
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset):
+        barrier.wait()
+        local = []
+        for vehicle_id in range(offset, requests, threads):
+            xpos, ypos = positions[vehicle_id]
+            start = time.perf_counter()
+            registry.allocate(vehicle_id, xpos, ypos)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+def main():
+    """Run both registries over the same requests and print latency percentiles."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--spots', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=64)
+    args = parser.parse_args()
+
+    lot = make_lot(args.spots)
+    extent = max(spot.x for spot in lot)
+    for name, cls in (('linear', LinearRegistry), ('grid', SpotRegistry)):
+        registry = cls(lot)
+        latencies, wall = run(registry, args.requests, args.threads, extent)
+        reserved = registry.stats()['reserved']
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f"{name:>6}: {args.requests / wall:9.0f} allocations/s  "
+              f"p50 {quantiles[49] * 1e3:8.3f} ms  p99 {quantiles[98] * 1e3:8.3f} ms  "
+              f"({reserved} unique spots reserved)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark of web worker cold start: process launch to the first served request.
+
+Each run starts a fresh interpreter that creates the app with the factory
+and serves ``GET /`` through the test client, so the numbers cover imports,
+app construction and the first render. Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5 --async-modes auto threading
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from web import create_app
+app = create_app({'SOCKETIO_ASYNC_MODE': %r})
+created = time.perf_counter()
+response = app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({'create': created - start, 'first_request': served - created,
+                  'status': response.status_code, 'rclpy': 'rclpy' in sys.modules}))
+'''
+
+def cold_start(env, async_mode):
+    """Run one child and return its timings plus the wall time to first response."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD % async_mode], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['wall'] = time.perf_counter() - start
+    return result
+
+def main():
+    """Report median cold-start timings over several runs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--async-modes', nargs='+', default=[None, 'threading'],
+                        type=lambda mode: None if mode == 'auto' else mode,
+                        help="Socket.IO backends to start with; 'auto' picks the best installed")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])))
+    for async_mode in args.async_modes:
+        mode = async_mode or 'auto'
+        runs = [cold_start(env, async_mode) for _ in range(args.runs)]
+        print(f"async mode {mode}: status {runs[0]['status']}, "
+              f"rclpy imported: {runs[0]['rclpy']}")
+        for key in ('wall', 'create', 'first_request'):
+            median = statistics.median(run[key] for run in runs)
+            print(f"  {key:<14} median {median * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+"""
+bridge
+The ROS side of the app. Importing the package does not import rclpy: the
+node in ``bridge.node`` is loaded only when a ``RosBridge`` starts.
+"""
+
+from bridge.runtime import (DEFAULT_EXECUTOR_THREADS, LastValueCache, RosBridge,
+                            RosUnavailableError, vehicle_room, vehicle_topic)
+
+__all__ = ['DEFAULT_EXECUTOR_THREADS', 'LastValueCache', 'RosBridge', 'RosUnavailableError',
+           'vehicle_room', 'vehicle_topic']
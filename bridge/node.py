@@ -0,0 +1,140 @@
+"""
+bridge/node.py
+ROS node relaying pose, destination and parking topics to the web side.
+
+This is the only module importing rclpy and the message packages; the
+bridge loads it when it starts.
+"""
+
+import logging
+from functools import partial
+from rclpy.node import Node
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from geometry_msgs.msg import PoseStamped
+from std_msgs.msg import Bool, Int32MultiArray
+from bridge.runtime import LastValueCache, vehicle_room, vehicle_topic
+
+LOGGER = logging.getLogger(__name__)
+
+PARKING_STATUS_TOPIC = '/parking_spot_status'
+
+
+class ROSNode(Node):
+    """
+    ROS Node class for handling ROS operations.
+
+    Pose callbacks share one callback group and destination callbacks another,
+    so a slow destination emit never holds up pose handling on the executor.
+
+    With an ``occupancy`` map, spot sensor readings published on
+    ``/parking_spot_status`` as ``[spot_id, occupied, spot_id, occupied, ...]``
+    are fed into it.
+
+    Every relayed value is also kept in ``last_values`` for connect-time
+    snapshots, and ``destination_reached`` is only emitted when it changes.
+    Car poses are recorded in ``history`` when given, under the room name
+    (``all`` for the broadcast stream), and car and user poses feed the
+    ``eta`` tracker keyed by room.
+
+    ``instrument``, when given, is called as ``instrument(topic, callback)``
+    for every subscription and returns the callback to register, e.g. one
+    that counts messages and times the call.
+    """
+    def __init__(self, fanout, emit, vehicle_ids=(), legacy_topics=True, occupancy=None,
+                 last_values=None, history=None, eta=None, instrument=None):
+        super().__init__('web_ros_node')
+        self.fanout = fanout
+        self.emit = emit
+        self.occupancy = occupancy
+        self.last_values = last_values if last_values is not None else LastValueCache()
+        self.history = history
+        self.eta = eta
+        self.instrument = instrument
+        self.vehicles = set()
+        self.pose_group = MutuallyExclusiveCallbackGroup()
+        self.destination_group = MutuallyExclusiveCallbackGroup()
+        if legacy_topics:
+            self._subscribe('/ego_vehicle_pose', '/user_pose', '/destination_reached', None)
+        for vehicle_id in vehicle_ids:
+            self.watch_vehicle(vehicle_id)
+        if occupancy is not None:
+            self._listen(Int32MultiArray, PARKING_STATUS_TOPIC, self.parking_callback,
+                         self.destination_group)
+
+    def _listen(self, msg_type, topic, callback, group):
+        """
+        Create one subscription, wrapped by ``instrument`` when there is one.
+        """
+        if self.instrument is not None:
+            callback = self.instrument(topic, callback)
+        self.create_subscription(msg_type, topic, callback, 10, callback_group=group)
+
+    def _subscribe(self, pose_topic, user_topic, destination_topic, room):
+        """
+        Subscribe to one set of pose, user and destination topics for a room.
+        """
+        self._listen(PoseStamped, pose_topic, partial(self.pose_callback, room=room),
+                     self.pose_group)
+        self._listen(PoseStamped, user_topic, partial(self.user_callback, room=room),
+                     self.pose_group)
+        self._listen(Bool, destination_topic, partial(self.destination_callback, room=room),
+                     self.destination_group)
+
+    def watch_vehicle(self, vehicle_id):
+        """
+        Subscribe to a vehicle's namespaced topics, routing them to its room.
+        """
+        if vehicle_id in self.vehicles:
+            return
+        self.vehicles.add(vehicle_id)
+        self._subscribe(vehicle_topic(vehicle_id, 'ego_vehicle_pose'),
+                        vehicle_topic(vehicle_id, 'user_pose'),
+                        vehicle_topic(vehicle_id, 'destination_reached'),
+                        vehicle_room(vehicle_id))
+        LOGGER.info('Subscribed to topics for vehicle %s', vehicle_id)
+
+    def pose_callback(self, msg, room=None):
+        """
+        Callback function for handling pose updates.
+        """
+        xpos = round(msg.pose.position.x, 3)
+        ypos = round(msg.pose.position.y, 3)
+        payload = {'x': xpos, 'y': ypos}
+        self.last_values.remember(room, 'pose_update', payload)
+        if self.history is not None:
+            self.history.record(room or 'all', xpos, ypos)
+        if self.eta is not None:
+            self.eta.update_car(room, xpos, ypos)
+        self.fanout.submit('pose_update', payload, room=room)
+
+    def user_callback(self, msg, room=None):
+        """
+        Callback function for handling user pose updates.
+        """
+        xpos = round(msg.pose.position.x, 3)
+        ypos = round(msg.pose.position.y, 3)
+        payload = {'x': xpos, 'y': ypos}
+        self.last_values.remember(room, 'user_update', payload)
+        if self.eta is not None:
+            self.eta.update_user(room, xpos, ypos)
+        self.fanout.submit('user_update', payload, room=room)
+
+    def destination_callback(self, msg, room=None):
+        """
+        Callback function for handling destination reached updates; repeats
+        of the current value are dropped.
+        """
+        payload = {'reached': msg.data}
+        if self.last_values.remember(room, 'destination_reached', payload):
+            self.emit('destination_reached', payload, to=room)
+
+    def parking_callback(self, msg):
+        """
+        Callback function for handling spot sensor readings.
+        """
+        data = list(msg.data)
+        readings = zip(data[0::2], data[1::2])
+        try:
+            self.occupancy.update_many(readings)
+        except IndexError as exc:
+            LOGGER.warning('Ignoring parking reading: %s', str(exc))
@@ -0,0 +1,163 @@
+"""
+bridge/runtime.py
+The singleton bridge that owns rclpy and its multi-threaded executor, plus
+the room naming and last-value cache shared with the web side.
+
+Nothing here imports rclpy at module level: it is loaded when the bridge
+starts, so the web app imports and serves pages on machines without ROS.
+"""
+
+import importlib
+import logging
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_EXECUTOR_THREADS = 4
+
+
+class RosUnavailableError(RuntimeError):
+    """
+    Raised when the bridge is started on a machine without ROS 2.
+    """
+
+
+def vehicle_room(vehicle_id):
+    """
+    Return the Socket.IO room name for a vehicle.
+    """
+    return f'vehicle_{vehicle_id}'
+
+
+def vehicle_topic(vehicle_id, name):
+    """
+    Return the namespaced ROS topic for a vehicle.
+    """
+    return f'/vehicle_{vehicle_id}/{name}'
+
+
+class LastValueCache:
+    """
+    Latest payload per (room, event), so new sockets get current state at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def remember(self, room, event, payload):
+        """
+        Store a payload; returns True if it differs from the previous one.
+        """
+        with self._lock:
+            rooms = self._values.setdefault(room, {})
+            changed = rooms.get(event) != payload
+            rooms[event] = payload
+        return changed
+
+    def snapshot(self, rooms):
+        """
+        Return ``{event: payload}`` merged over ``rooms``, later rooms winning.
+        """
+        merged = {}
+        with self._lock:
+            for room in rooms:
+                merged.update(self._values.get(room, {}))
+        return merged
+
+    def clear(self):
+        """
+        Forget every cached value.
+        """
+        with self._lock:
+            self._values.clear()
+
+
+class RosBridge:
+    """
+    Owns rclpy, the web ROS node and its executor; initialises them exactly once.
+
+    ``node_factory`` is called with the watched vehicle ids and returns the
+    node. rclpy is imported by the first ``start``; without ROS 2 installed,
+    ``start`` raises RosUnavailableError and the bridge stays stopped.
+    """
+
+    def __init__(self, node_factory, num_threads=DEFAULT_EXECUTOR_THREADS):
+        self._node_factory = node_factory
+        self.num_threads = num_threads
+        self._lock = threading.Lock()
+        self._vehicles = set()
+        self.node = None
+        self._executor = None
+        self._thread = None
+        self._owns_context = False
+        self._rclpy = None
+
+    @property
+    def started(self):
+        """
+        Whether the node is up and the executor thread has been started.
+        """
+        return self._thread is not None
+
+    def start(self):
+        """
+        Initialise rclpy, create the node and spin it; returns False if already started.
+        """
+        if self._thread is not None:
+            return False
+        with self._lock:
+            if self._thread is not None:
+                return False
+            try:
+                rclpy = importlib.import_module('rclpy')
+                executors = importlib.import_module('rclpy.executors')
+            except ImportError as exc:
+                raise RosUnavailableError(f"ROS 2 is not available: {exc}") from exc
+            self._rclpy = rclpy
+            if not rclpy.ok():
+                rclpy.init()
+                self._owns_context = True
+            self.node = self._node_factory(sorted(self._vehicles))
+            self._executor = executors.MultiThreadedExecutor(num_threads=self.num_threads)
+            self._executor.add_node(self.node)
+            self._thread = threading.Thread(target=self._spin, name='ros-bridge', daemon=True)
+            self._thread.start()
+        LOGGER.info("ROS bridge started with %d executor threads", self.num_threads)
+        return True
+
+    def _spin(self):
+        """
+        Executor loop run by the bridge thread.
+        """
+        try:
+            self._executor.spin()
+        except Exception as exc:  # pylint: disable=broad-except
+            LOGGER.error("ROS executor stopped: %s", str(exc))
+
+    def watch_vehicle(self, vehicle_id):
+        """
+        Make sure the node relays the given vehicle's topics, now or once it starts.
+        """
+        with self._lock:
+            self._vehicles.add(vehicle_id)
+            if self.node is not None:
+                self.node.watch_vehicle(vehicle_id)
+
+    def shutdown(self, timeout=5.0):
+        """
+        Stop the executor, destroy the node and release rclpy if this bridge initialised it.
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+            self._executor.shutdown()
+            self._thread.join(timeout)
+            self.node.destroy_node()
+            if self._owns_context and self._rclpy.ok():
+                self._rclpy.shutdown()
+            self.node = None
+            self._executor = None
+            self._thread = None
+            self._owns_context = False
+        LOGGER.info("ROS bridge shut down")
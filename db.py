@@ -0,0 +1,409 @@
+"""
+db.py
+Pooled, thread-safe SQLite access layer for the web application.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DATABASE = 'server.db'
+DEFAULT_POOL_SIZE = 8
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_MMAP_SIZE = 64 * 1024 * 1024
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 300.0
+
+# Customer queries are kept as constants so sqlite3's statement cache reuses
+# the prepared statements across requests on the same connection.
+SELECT_CUSTOMERS_BY_NAME = (
+    "SELECT name, password, vehicle_id, rowid FROM customer WHERE name=? ORDER BY rowid"
+)
+SELECT_CUSTOMER_PASSWORDS = "SELECT name, password FROM customer"
+SELECT_VEHICLE_IDS = "SELECT DISTINCT vehicle_id FROM customer ORDER BY vehicle_id"
+INSERT_CUSTOMER = (
+    "INSERT INTO customer(name, password, mobile_number, vehicle_id) VALUES (?,?,?,?)"
+)
+# Inserts only when no customer has the name yet, as one atomic statement
+INSERT_NEW_CUSTOMER = (
+    "INSERT INTO customer(name, password, mobile_number, vehicle_id) "
+    "SELECT ?,?,?,? WHERE NOT EXISTS (SELECT 1 FROM customer WHERE name=?)"
+)
+DELETE_DUPLICATE_CUSTOMERS = (
+    "DELETE FROM customer WHERE rowid NOT IN (SELECT MIN(rowid) FROM customer GROUP BY name)"
+)
+UPDATE_CUSTOMER_PASSWORD = "UPDATE customer SET password=? WHERE name=? AND password=?"
+CUSTOMER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_customer_name ON customer(name)",
+    "CREATE INDEX IF NOT EXISTS idx_customer_vehicle_id ON customer(vehicle_id)",
+)
+
+
+# Called as ``observer(seconds, label)`` after each checked-out connection is returned
+_QUERY_OBSERVER = None
+
+
+def set_query_observer(observer):
+    """
+    Report how long every pooled connection block takes, e.g. to a metrics
+    histogram; None turns reporting off.
+    """
+    global _QUERY_OBSERVER  # pylint: disable=global-statement
+    _QUERY_OBSERVER = observer
+
+
+class PoolExhaustedError(sqlite3.OperationalError):
+    """
+    Raised when no pooled connection frees up within the checkout timeout.
+    """
+
+
+class DuplicateCustomerError(sqlite3.IntegrityError):
+    """
+    Raised when a customer name is already taken.
+    """
+
+    def __init__(self):
+        super().__init__("UNIQUE constraint failed: customer.name")
+
+
+def connect(path, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS, mmap_size=DEFAULT_MMAP_SIZE):
+    """
+    Open a SQLite connection in WAL mode with the tuned pragmas applied.
+    """
+    con = sqlite3.connect(path, timeout=busy_timeout_ms / 1000.0, check_same_thread=False,
+                          cached_statements=64)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+    con.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    return con
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared between request threads.
+
+    A thread holds at most one connection at a time: nested ``connection()``
+    blocks on the same thread reuse the connection already checked out.
+    """
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, checkout_timeout=5.0,
+                 busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS, mmap_size=DEFAULT_MMAP_SIZE):
+        self.path = path
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def _acquire(self):
+        """
+        Take an idle connection or open a new one while under the size limit.
+        """
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolExhaustedError(f"No free connection to {self.path} "
+                                     f"after {self.checkout_timeout}s")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            con = connect(self.path, self.busy_timeout_ms, self.mmap_size)
+        except sqlite3.Error:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._all.append(con)
+        return con
+
+    def _release(self, con):
+        """
+        Return a connection to the idle set, rolling back any open transaction.
+        """
+        if con.in_transaction:
+            con.rollback()
+        self._idle.put(con)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self, label='query'):
+        """
+        Check out a connection for the duration of a ``with`` block.
+
+        The block's duration, checkout included, is reported to the query
+        observer under ``label``; nested blocks count towards the outer one.
+        """
+        con = getattr(self._local, 'con', None)
+        if con is not None:
+            yield con
+            return
+        start = time.perf_counter()
+        con = self._acquire()
+        self._local.con = con
+        try:
+            yield con
+        finally:
+            self._local.con = None
+            self._release(con)
+            observer = _QUERY_OBSERVER
+            if observer is not None:
+                observer(time.perf_counter() - start, label)
+
+    @contextmanager
+    def transaction(self, label='transaction'):
+        """
+        Check out a connection and commit on success or roll back on error.
+        """
+        with self.connection(label) as con:
+            try:
+                yield con
+            except BaseException:
+                con.rollback()
+                raise
+            con.commit()
+
+    def close(self):
+        """
+        Close every connection opened by the pool.
+        """
+        with self._lock:
+            connections, self._all = self._all, []
+        for con in connections:
+            con.close()
+        self._idle = queue.LifoQueue()
+
+
+_POOLS = {}
+_REPOSITORIES = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(path, size=DEFAULT_POOL_SIZE):
+    """
+    Return the shared pool for a database path, creating it on first use.
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(path)
+        if pool is None:
+            pool = ConnectionPool(path, size=size)
+            _POOLS[path] = pool
+            LOGGER.info("Opened connection pool for %s (size %d)", path, size)
+        return pool
+
+
+def close_pools():
+    """
+    Close every pool, e.g. at shutdown or between tests.
+    """
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+        _REPOSITORIES.clear()
+    for pool in pools:
+        pool.close()
+
+
+class CustomerCache:
+    """
+    Bounded LRU cache of customer records with a per-entry time to live.
+    """
+
+    def __init__(self, size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name):
+        """
+        Return the cached record for a name, or None if absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] < self._clock():
+                if entry is not None:
+                    del self._entries[name]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, name, record):
+        """
+        Cache a record, evicting the least recently used one when full.
+        """
+        with self._lock:
+            self._entries[name] = (self._clock() + self.ttl, record)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name=None):
+        """
+        Drop one name, or every entry when no name is given.
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+class CustomerRepository:
+    """
+    Customer table queries on top of a connection pool.
+    """
+
+    def __init__(self, pool, cache=None):
+        self.pool = pool
+        self.cache = cache
+
+    def ensure_indexes(self):
+        """
+        Create the lookup indexes on ``name`` and ``vehicle_id`` if missing.
+        """
+        with self.pool.transaction('ensure_indexes') as con:
+            for statement in CUSTOMER_INDEXES:
+                con.execute(statement)
+
+    def find_all_by_name(self, name):
+        """
+        Return ``(name, password, vehicle_id, customer id)`` for every customer
+        with a name, oldest first; the id is the row id, e.g. the ``sno``
+        column. Older databases may hold several rows per name.
+        """
+        if self.cache is not None:
+            records = self.cache.get(name)
+            if records is not None:
+                return records
+        with self.pool.connection('find_by_name') as con:
+            records = tuple(con.execute(SELECT_CUSTOMERS_BY_NAME, (name,)))
+        if records and self.cache is not None:
+            self.cache.put(name, records)
+        return records
+
+    def find_by_name(self, name):
+        """
+        Return ``(name, password, vehicle_id, customer id)`` for the oldest
+        customer with a name, or None.
+        """
+        records = self.find_all_by_name(name)
+        return records[0] if records else None
+
+    def insert(self, name, password, mobile_number, vehicle_id):
+        """
+        Insert a customer row in its own transaction; raises
+        DuplicateCustomerError if the name is taken.
+        """
+        with self.pool.transaction('insert_customer') as con:
+            cursor = con.execute(INSERT_NEW_CUSTOMER,
+                                 (name, password, mobile_number, vehicle_id, name))
+            if cursor.rowcount == 0:
+                raise DuplicateCustomerError()
+        if self.cache is not None:
+            self.cache.invalidate(name)
+
+    def insert_many(self, rows):
+        """
+        Insert ``(name, password, mobile_number, vehicle_id)`` rows in one transaction.
+
+        The rows go in with a single ``executemany``; only if the database
+        rejects one, or one names a taken customer, is the batch replayed
+        row by row to find it. Returns ``[(position, error)]`` for the
+        rejected rows; the others are kept.
+        """
+        rows = list(rows)
+        failed = []
+        params = [row + (row[0],) for row in rows]
+        with self.pool.transaction('insert_customers') as con:
+            con.execute("SAVEPOINT insert_many")
+            try:
+                complete = con.executemany(INSERT_NEW_CUSTOMER, params).rowcount == len(rows)
+            except sqlite3.IntegrityError:
+                complete = False
+            if not complete:
+                con.execute("ROLLBACK TO insert_many")
+                for position, row in enumerate(params):
+                    try:
+                        if con.execute(INSERT_NEW_CUSTOMER, row).rowcount == 0:
+                            raise DuplicateCustomerError()
+                    except sqlite3.IntegrityError as exc:
+                        failed.append((position, str(exc)))
+            con.execute("RELEASE insert_many")
+        if self.cache is not None:
+            for name, _, _, _ in rows:
+                self.cache.invalidate(name)
+        return failed
+
+    def remove_duplicate_names(self):
+        """
+        Delete every customer row but the oldest for each name; returns the
+        number of rows deleted.
+        """
+        with self.pool.transaction('remove_duplicate_names') as con:
+            deleted = con.execute(DELETE_DUPLICATE_CUSTOMERS).rowcount
+        if self.cache is not None:
+            self.cache.invalidate()
+        return deleted
+
+    def vehicle_ids(self):
+        """
+        Return every distinct vehicle id registered to a customer.
+        """
+        with self.pool.connection('vehicle_ids') as con:
+            return [row[0] for row in con.execute(SELECT_VEHICLE_IDS)]
+
+    def all_passwords(self):
+        """
+        Return ``(name, password)`` for every customer.
+        """
+        with self.pool.connection('all_passwords') as con:
+            return con.execute(SELECT_CUSTOMER_PASSWORDS).fetchall()
+
+    def update_passwords(self, rows):
+        """
+        Replace stored passwords from ``(new, name, old)`` rows in one transaction.
+        """
+        rows = list(rows)
+        with self.pool.transaction('update_passwords') as con:
+            con.executemany(UPDATE_CUSTOMER_PASSWORD, rows)
+        if self.cache is not None:
+            for _, name, _ in rows:
+                self.cache.invalidate(name)
+
+
+
+def get_customers(path, pool_size=DEFAULT_POOL_SIZE, cache_size=DEFAULT_CACHE_SIZE,
+                  cache_ttl=DEFAULT_CACHE_TTL):
+    """
+    Return the shared, cached customer repository for a database path.
+
+    The lookup indexes are created the first time a path is used.
+    """
+    with _POOLS_LOCK:
+        customers = _REPOSITORIES.get(path)
+    if customers is not None:
+        return customers
+    customers = CustomerRepository(get_pool(path, pool_size), CustomerCache(cache_size, cache_ttl))
+    try:
+        customers.ensure_indexes()
+    except sqlite3.Error as exc:
+        LOGGER.warning("Could not create customer indexes on %s: %s", path, str(exc))
+        return customers
+    with _POOLS_LOCK:
+        return _REPOSITORIES.setdefault(path, customers)
@@ -0,0 +1,162 @@
+"""
+eta.py
+Incremental distance, smoothed speed and ETA between each vehicle and its
+user, computed once per fan-out tick for every stream that moved.
+"""
+
+import logging
+import math
+import threading
+import time
+from array import array
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SMOOTHING = 0.3  # Weight of the newest speed sample in the exponential filter
+DEFAULT_MIN_CHANGE = 1.0  # Seconds the ETA must move before it is re-sent
+DEFAULT_RELATIVE_CHANGE = 0.1  # ...or this fraction of the last sent ETA, whichever is larger
+DEFAULT_MIN_SPEED = 0.05  # m/s below which the vehicle counts as stopped (no ETA)
+
+NAN = float('nan')
+
+
+class EtaTracker:
+    """
+    Latest car and user positions per stream, with the derived ETA.
+
+    State lives in parallel ``array('d')`` columns indexed by a slot per
+    stream. Pose callbacks only overwrite a slot's latest positions and mark
+    it dirty; ``compute`` then runs one pass over the dirty slots, updating
+    the speed filter and returning an ``eta_update`` payload for each stream
+    seen for the first time or whose ETA moved by more than the change
+    threshold. NaN marks values not known yet.
+    """
+
+    def __init__(self, smoothing=DEFAULT_SMOOTHING, min_change=DEFAULT_MIN_CHANGE,
+                 relative_change=DEFAULT_RELATIVE_CHANGE, min_speed=DEFAULT_MIN_SPEED,
+                 clock=time.monotonic):
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing must be in (0, 1]")
+        self.smoothing = smoothing
+        self.min_change = min_change
+        self.relative_change = relative_change
+        self.min_speed = min_speed
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._streams = []
+        self._dirty = set()
+        # Latest samples, written by the callbacks
+        self._car_x = array('d')
+        self._car_y = array('d')
+        self._car_t = array('d')
+        self._user_x = array('d')
+        self._user_y = array('d')
+        # Filter state, written by compute
+        self._prev_x = array('d')
+        self._prev_y = array('d')
+        self._prev_t = array('d')
+        self._speed = array('d')
+        self._sent_eta = array('d')
+        self._sent_distance = array('d')
+        self.computed = 0
+        self.emitted = 0
+
+    def _slot(self, stream):
+        """
+        Return the slot for a stream, adding one on first use; the caller holds the lock.
+        """
+        slot = self._slots.get(stream)
+        if slot is None:
+            slot = self._slots[stream] = len(self._streams)
+            self._streams.append(stream)
+            for column in (self._car_x, self._car_y, self._car_t, self._user_x, self._user_y,
+                           self._prev_x, self._prev_y, self._prev_t, self._speed,
+                           self._sent_eta, self._sent_distance):
+                column.append(NAN)
+        return slot
+
+    def update_car(self, stream, xpos, ypos, stamp=None):
+        """
+        Record the latest car position for a stream.
+        """
+        stamp = self._clock() if stamp is None else stamp
+        with self._lock:
+            slot = self._slot(stream)
+            self._car_x[slot] = xpos
+            self._car_y[slot] = ypos
+            self._car_t[slot] = stamp
+            self._dirty.add(slot)
+
+    def update_user(self, stream, xpos, ypos):
+        """
+        Record the latest user position for a stream.
+        """
+        with self._lock:
+            slot = self._slot(stream)
+            self._user_x[slot] = xpos
+            self._user_y[slot] = ypos
+            self._dirty.add(slot)
+
+    def _changed(self, eta, sent):
+        """
+        Check whether a new ETA differs enough from the last one sent.
+        """
+        if math.isnan(eta) or math.isnan(sent):
+            return math.isnan(eta) != math.isnan(sent)
+        return abs(eta - sent) >= max(self.min_change, self.relative_change * sent)
+
+    def compute(self):
+        """
+        Update every stream touched since the last call.
+
+        Returns ``[(stream, payload)]`` for streams seen for the first time or
+        whose ETA changed meaningfully; payloads carry ``distance`` (m), ``speed`` (m/s) and
+        ``eta`` (s, or None while the car is stopped).
+        """
+        updates = []
+        alpha = self.smoothing
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for slot in dirty:
+                car_t = self._car_t[slot]
+                if car_t != self._prev_t[slot] and not math.isnan(car_t):
+                    prev_t = self._prev_t[slot]
+                    if not math.isnan(prev_t) and car_t > prev_t:
+                        moved = math.hypot(self._car_x[slot] - self._prev_x[slot],
+                                           self._car_y[slot] - self._prev_y[slot])
+                        sample = moved / (car_t - prev_t)
+                        speed = self._speed[slot]
+                        self._speed[slot] = (sample if math.isnan(speed)
+                                             else alpha * sample + (1 - alpha) * speed)
+                    self._prev_x[slot] = self._car_x[slot]
+                    self._prev_y[slot] = self._car_y[slot]
+                    self._prev_t[slot] = car_t
+                distance = math.hypot(self._car_x[slot] - self._user_x[slot],
+                                      self._car_y[slot] - self._user_y[slot])
+                if math.isnan(distance):
+                    continue
+                speed = self._speed[slot]
+                moving = not math.isnan(speed) and speed >= self.min_speed
+                eta = distance / speed if moving else NAN
+                self.computed += 1
+                first = math.isnan(self._sent_distance[slot])
+                if not first and not self._changed(eta, self._sent_eta[slot]):
+                    continue
+                self._sent_eta[slot] = eta
+                self._sent_distance[slot] = distance
+                self.emitted += 1
+                updates.append((self._streams[slot], {
+                    'distance': round(distance, 2),
+                    'speed': round(speed, 2) if not math.isnan(speed) else None,
+                    'eta': round(eta, 1) if moving else None,
+                }))
+        return updates
+
+    def stats(self):
+        """
+        Return the stream, computed and emitted counters.
+        """
+        with self._lock:
+            return {'streams': len(self._streams), 'computed': self.computed,
+                    'emitted': self.emitted}
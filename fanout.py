@@ -0,0 +1,162 @@
+"""
+fanout.py
+Rate-limited, coalescing fan-out stage between ROS callbacks and Socket.IO emits.
+"""
+
+import logging
+import threading
+from collections import deque
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RATE_HZ = 15.0
+
+
+class PoseFanout:
+    """
+    Keeps only the latest payload per (event, room) and flushes it on a fixed tick.
+
+    ROS callbacks call ``submit`` and return immediately; a dedicated thread
+    emits whatever is pending every ``1 / rate_hz`` seconds. Payloads that are
+    overwritten before a flush are dropped rather than queued.
+
+    ``emit`` is called once per pending payload. The optional ``batch_emit`` is
+    called once per flush with the whole ``{(event, room): payload}`` mapping,
+    for sinks that combine several events into one message.
+
+    Under an event-loop server, pass the server's ``spawn`` and ``sleep`` so the
+    flush loop runs as a green task; ROS threads then only ever touch the
+    pending dict and the ``call_soon`` queue, never the Socket.IO server.
+    """
+
+    def __init__(self, emit, rate_hz=DEFAULT_RATE_HZ, batch_emit=None, spawn=None, sleep=None):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self._emit = emit
+        self._batch_emit = batch_emit
+        self._spawn = spawn
+        self._sleep = sleep
+        self._calls = deque()
+        self._hooks = []
+        self._running = False
+        self.interval = 1.0 / rate_hz
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.coalesced = 0
+        self.emitted = 0
+
+    def submit(self, event, payload, room=None):
+        """
+        Record the latest payload for an event and room, replacing any unsent one.
+
+        A ``room`` of None means the payload is broadcast to every client.
+        """
+        key = (event, room)
+        with self._lock:
+            self.received += 1
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = payload
+
+    def call_soon(self, func, *args, **kwargs):
+        """
+        Run a call from the flush loop at the next tick; safe from any thread.
+        """
+        self._calls.append((func, args, kwargs))
+
+    def on_flush(self, func):
+        """
+        Run ``func()`` on every tick, after the queued calls; returns ``func``.
+        """
+        self._hooks.append(func)
+        return func
+
+    def flush(self):
+        """
+        Run queued calls and flush hooks, then emit every pending payload once
+        and clear the pending set.
+        """
+        while self._calls:
+            func, args, kwargs = self._calls.popleft()
+            try:
+                func(*args, **kwargs)
+            except Exception as exc:  # pylint: disable=broad-except
+                LOGGER.error("Error in deferred call %s: %s", func, str(exc))
+        for func in self._hooks:
+            try:
+                func()
+            except Exception as exc:  # pylint: disable=broad-except
+                LOGGER.error("Error in flush hook %s: %s", func, str(exc))
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if self._batch_emit is not None and pending:
+            try:
+                self._batch_emit(pending)
+            except Exception as exc:  # pylint: disable=broad-except
+                LOGGER.error("Error emitting pose batch: %s", str(exc))
+        for (event, room), payload in pending.items():
+            try:
+                self._emit(event, payload, to=room)
+            except Exception as exc:  # pylint: disable=broad-except
+                LOGGER.error("Error emitting %s: %s", event, str(exc))
+                continue
+            with self._lock:
+                self.emitted += 1
+        return len(pending)
+
+    def stats(self):
+        """
+        Return the received, coalesced and emitted counters.
+        """
+        with self._lock:
+            return {
+                'received': self.received,
+                'coalesced': self.coalesced,
+                'emitted': self.emitted,
+            }
+
+    def _run(self):
+        """
+        Flush loop executed by the fan-out thread or task.
+        """
+        stopped = False
+        while not stopped:
+            if self._sleep is None:
+                stopped = self._stop.wait(self.interval)
+            else:
+                self._sleep(self.interval)
+                stopped = self._stop.is_set()
+            self.flush()
+
+    def start(self):
+        """
+        Start the flush loop if it is not already running.
+        """
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._stop.clear()
+        if self._spawn is None:
+            self._thread = threading.Thread(target=self._run, name='pose-fanout', daemon=True)
+            self._thread.start()
+        else:
+            self._thread = self._spawn(self._run)
+        LOGGER.info("Pose fan-out started at %.1f Hz", 1.0 / self.interval)
+
+    def stop(self, timeout=None):
+        """
+        Stop the flush loop, emitting anything still pending.
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            if self._spawn is None:
+                thread.join(timeout)
+            else:
+                thread.join()
+        with self._lock:
+            self._running = False
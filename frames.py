@@ -0,0 +1,148 @@
+"""
+frames.py
+Compact binary pose frames with delta encoding for the service map stream.
+
+Frame layout (little-endian):
+    uint8  flags     bit 0 keyframe, bit 1 car present, bit 2 user present
+    uint16 stream    id of the encoder, since one socket can be in several streams
+    uint16 sequence  wraps at 65536, per stream
+    then, for the car and then the user pose if present:
+        keyframe: int32 x, int32 y   absolute position in millimetres
+        delta:    int16 dx, int16 dy change since the previous frame
+"""
+
+import struct
+
+SCALE = 1000  # Fixed-point units per metre, matching the 3-decimal JSON rounding
+KEYFRAME_INTERVAL = 15  # Frames between forced keyframes, about 1 s at 15 Hz
+
+FLAG_KEYFRAME = 0x01
+FLAG_CAR = 0x02
+FLAG_USER = 0x04
+
+HEADER = struct.Struct('<BHH')
+ABSOLUTE = struct.Struct('<ii')
+DELTA = struct.Struct('<hh')
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+def to_fixed(value):
+    """
+    Convert a coordinate in metres to fixed-point millimetres.
+    """
+    return int(round(value * SCALE))
+
+
+class PoseFrameEncoder:
+    """
+    Encodes car and user poses for one stream into binary frames.
+
+    Each stream (one per room) keeps its own reference positions, so deltas are
+    always relative to what that stream's clients last received. ``stream``
+    goes in every frame header, so a client in several rooms can tell the
+    streams apart.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, stream=0):
+        self.keyframe_interval = keyframe_interval
+        self.stream = stream & 0xFFFF
+        self.sequence = 0
+        self._since_keyframe = keyframe_interval
+        self._last = {FLAG_CAR: None, FLAG_USER: None}
+
+    def force_keyframe(self):
+        """
+        Make the next frame a keyframe, e.g. after a client joins the stream.
+        """
+        self._since_keyframe = self.keyframe_interval
+
+    def encode(self, car=None, user=None):
+        """
+        Encode the given poses as ``(x, y)`` tuples in metres, or None if absent.
+        """
+        poses = []
+        flags = 0
+        if car is not None:
+            flags |= FLAG_CAR
+            poses.append((FLAG_CAR, to_fixed(car[0]), to_fixed(car[1])))
+        if user is not None:
+            flags |= FLAG_USER
+            poses.append((FLAG_USER, to_fixed(user[0]), to_fixed(user[1])))
+
+        keyframe = self._since_keyframe >= self.keyframe_interval or any(
+            not self._fits_delta(slot, xpos, ypos) for slot, xpos, ypos in poses)
+        if keyframe:
+            flags |= FLAG_KEYFRAME
+            # A keyframe must carry both references, so fill in the last known ones
+            for slot in (FLAG_CAR, FLAG_USER):
+                if not flags & slot and self._last[slot] is not None:
+                    flags |= slot
+                    poses.append((slot,) + self._last[slot])
+            poses.sort()
+            self._since_keyframe = 0
+        else:
+            self._since_keyframe += 1
+
+        parts = [HEADER.pack(flags, self.stream, self.sequence)]
+        for slot, xpos, ypos in poses:
+            if keyframe:
+                parts.append(ABSOLUTE.pack(xpos, ypos))
+            else:
+                last_x, last_y = self._last[slot]
+                parts.append(DELTA.pack(xpos - last_x, ypos - last_y))
+            self._last[slot] = (xpos, ypos)
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        return b''.join(parts)
+
+    def _fits_delta(self, slot, xpos, ypos):
+        """
+        Check whether a pose can be sent as an int16 delta from the reference.
+        """
+        last = self._last[slot]
+        if last is None:
+            return False
+        return (INT16_MIN <= xpos - last[0] <= INT16_MAX
+                and INT16_MIN <= ypos - last[1] <= INT16_MAX)
+
+
+class PoseFrameDecoder:
+    """
+    Reference decoder mirroring the one in templates/service.html; it keeps
+    the sequence and reference poses of each stream separately.
+    """
+
+    def __init__(self):
+        self.streams = {}
+
+    def decode(self, frame):
+        """
+        Apply a frame and return the updated poses in metres, or None if the
+        frame cannot be applied until its stream's next keyframe arrives.
+        """
+        flags, stream, sequence = HEADER.unpack_from(frame, 0)
+        state = self.streams.setdefault(stream, {'sequence': None, 'car': None, 'user': None})
+        keyframe = bool(flags & FLAG_KEYFRAME)
+        expected = None if state['sequence'] is None else (state['sequence'] + 1) & 0xFFFF
+        if not keyframe and sequence != expected:
+            state['sequence'] = None
+            return None
+        state['sequence'] = sequence
+
+        offset = HEADER.size
+        updated = {}
+        for name, slot in (('car', FLAG_CAR), ('user', FLAG_USER)):
+            if not flags & slot:
+                continue
+            if keyframe:
+                xpos, ypos = ABSOLUTE.unpack_from(frame, offset)
+                offset += ABSOLUTE.size
+            else:
+                delta_x, delta_y = DELTA.unpack_from(frame, offset)
+                offset += DELTA.size
+                xpos = state[name][0] + delta_x
+                ypos = state[name][1] + delta_y
+            state[name] = (xpos, ypos)
+            updated[name] = (xpos / SCALE, ypos / SCALE)
+        return updated
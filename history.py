@@ -0,0 +1,308 @@
+"""
+history.py
+Pose history: a fixed-size ring of (timestamp, x, y) per stream kept in
+preallocated arrays, optional batched flushes to SQLite, and downsampling
+for replaying a time window to a phone.
+"""
+
+import logging
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+import db
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 6000  # Poses kept in memory per stream (~140 KiB)
+DEFAULT_MAX_STREAMS = 128  # Streams kept in memory; the least recently updated is evicted
+DEFAULT_FLUSH_INTERVAL = 5.0  # Seconds between SQLite flushes
+DEFAULT_PENDING_LIMIT = 100000  # Unflushed rows kept before the oldest are dropped
+DEFAULT_POINTS = 500  # Points returned by a history query
+DEFAULT_MAX_WINDOW = 3600.0  # Seconds one history query may span, bounding the rows read
+
+CREATE_HISTORY_TABLE = (
+    "CREATE TABLE IF NOT EXISTS pose_history("
+    "stream TEXT NOT NULL, t REAL NOT NULL, x REAL NOT NULL, y REAL NOT NULL)"
+)
+CREATE_HISTORY_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_pose_history_stream_t ON pose_history(stream, t)"
+)
+INSERT_HISTORY = "INSERT INTO pose_history(stream, t, x, y) VALUES (?,?,?,?)"
+SELECT_HISTORY = (
+    "SELECT t, x, y FROM pose_history WHERE stream=? AND t>=? AND t<? ORDER BY t"
+)
+
+
+class PoseRing:
+    """
+    The last ``capacity`` poses of one stream, oldest overwritten first.
+
+    Timestamps must not go backwards, so windows are found by bisection.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._t = array('d', bytes(8 * capacity))
+        self._x = array('d', bytes(8 * capacity))
+        self._y = array('d', bytes(8 * capacity))
+        self._next = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """
+        Return the timestamp of the ``index``-th oldest pose (for bisection).
+        """
+        return self._t[self._physical(index)]
+
+    def _physical(self, index):
+        """
+        Map a logical index (0 = oldest) to an array slot.
+        """
+        return (self._next - self.count + index) % self.capacity
+
+    def append(self, stamp, xpos, ypos):
+        """
+        Store one pose, overwriting the oldest when full.
+        """
+        slot = self._next
+        self._t[slot] = stamp
+        self._x[slot] = xpos
+        self._y[slot] = ypos
+        self._next = (slot + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def oldest(self):
+        """
+        Return the oldest timestamp held, or None when empty.
+        """
+        return self[0] if self.count else None
+
+    def window(self, start, end):
+        """
+        Return the ``(t, x, y)`` poses with ``start <= t <= end``, oldest first.
+        """
+        first = bisect_left(self, start)
+        last = bisect_right(self, end)
+        points = []
+        for index in range(first, last):
+            slot = self._physical(index)
+            points.append((self._t[slot], self._x[slot], self._y[slot]))
+        return points
+
+
+class PoseHistory:
+    """
+    Rings of recent poses keyed by stream, with an optional SQLite archive.
+
+    ``record`` is cheap enough for ROS callbacks: it writes three doubles
+    into a ring and, with a database, queues the row. A background thread
+    writes the queued rows every ``flush_interval`` seconds in one
+    transaction, so the callbacks never wait on disk.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_streams=DEFAULT_MAX_STREAMS,
+                 database=None, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 pending_limit=DEFAULT_PENDING_LIMIT, clock=time.time):
+        self.capacity = capacity
+        self.max_streams = max_streams
+        self.database = database
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rings = OrderedDict()
+        self._pending = deque(maxlen=pending_limit)
+        self._stop = threading.Event()
+        self._thread = None
+        self._schema_ready = False
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+
+    def record(self, stream, xpos, ypos, stamp=None):
+        """
+        Append a pose to a stream's ring and queue it for the archive.
+        """
+        stamp = self._clock() if stamp is None else stamp
+        with self._lock:
+            ring = self._rings.get(stream)
+            if ring is None:
+                if len(self._rings) >= self.max_streams:
+                    self._rings.popitem(last=False)
+                ring = self._rings[stream] = PoseRing(self.capacity)
+            else:
+                self._rings.move_to_end(stream)
+            ring.append(stamp, xpos, ypos)
+            self.recorded += 1
+            if self.database is not None:
+                if len(self._pending) == self._pending.maxlen:
+                    self.dropped += 1
+                self._pending.append((stream, stamp, xpos, ypos))
+
+    def _pool(self):
+        """
+        Return the archive's connection pool, creating the table on first use.
+        """
+        pool = db.get_pool(self.database)
+        if not self._schema_ready:
+            with pool.transaction('history_schema') as con:
+                con.execute(CREATE_HISTORY_TABLE)
+                con.execute(CREATE_HISTORY_INDEX)
+            self._schema_ready = True
+        return pool
+
+    def flush(self):
+        """
+        Write every queued pose to the archive in one transaction; returns the count.
+        """
+        if self.database is None:
+            return 0
+        with self._lock:
+            rows = list(self._pending)
+            self._pending.clear()
+        if not rows:
+            return 0
+        with self._pool().transaction('history_flush') as con:
+            con.executemany(INSERT_HISTORY, rows)
+        with self._lock:
+            self.flushed += len(rows)
+        return len(rows)
+
+    def window(self, stream, start, end):
+        """
+        Return a stream's ``(t, x, y)`` poses between ``start`` and ``end``.
+
+        The part of the window older than the in-memory ring is read from
+        the archive when there is one.
+        """
+        with self._lock:
+            ring = self._rings.get(stream)
+            points = ring.window(start, end) if ring is not None else []
+            oldest = ring.oldest() if ring is not None else None
+        if self.database is not None and (oldest is None or start < oldest):
+            self.flush()
+            cutoff = math.nextafter(end, math.inf)
+            if oldest is not None:
+                cutoff = min(cutoff, oldest)
+            with self._pool().connection('history_window') as con:
+                archived = con.execute(SELECT_HISTORY, (stream, start, cutoff)).fetchall()
+            points = [tuple(row) for row in archived] + points
+        return points
+
+    def stats(self):
+        """
+        Return the stream, recorded, flushed, pending and dropped counters.
+        """
+        with self._lock:
+            return {
+                'streams': len(self._rings),
+                'recorded': self.recorded,
+                'flushed': self.flushed,
+                'pending': len(self._pending),
+                'dropped': self.dropped,
+            }
+
+    def _run(self):
+        """
+        Flush loop executed by the history thread.
+        """
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as exc:  # pylint: disable=broad-except
+                LOGGER.error("Error flushing pose history: %s", str(exc))
+
+    def start(self):
+        """
+        Start the flush thread if there is an archive and it is not running.
+        """
+        if self.database is None or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='pose-history', daemon=True)
+        self._thread.start()
+        LOGGER.info("Pose history archiving to %s every %.1fs", self.database,
+                    self.flush_interval)
+
+    def stop(self, timeout=None):
+        """
+        Stop the flush thread and write whatever is still queued.
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+
+def lttb(points, threshold):
+    """
+    Downsample ``(t, x, y)`` points with Largest-Triangle-Three-Buckets.
+
+    Triangle areas are measured in the x/y plane, so the kept points are
+    the ones that best preserve the shape of the trail.
+    """
+    count = len(points)
+    if threshold >= count or count <= 2:
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]][:max(threshold, 0)]
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    anchor = 0
+    for bucket in range(threshold - 2):
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        following = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(point[1] for point in following) / len(following)
+        avg_y = sum(point[2] for point in following) / len(following)
+        anchor_x, anchor_y = points[anchor][1], points[anchor][2]
+        best, best_area = None, -1.0
+        for index in range(int(bucket * every) + 1, next_start):
+            area = abs((anchor_x - avg_x) * (points[index][2] - anchor_y)
+                       - (anchor_x - points[index][1]) * (avg_y - anchor_y))
+            if area > best_area:
+                best, best_area = index, area
+        sampled.append(points[best])
+        anchor = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax(points, threshold):
+    """
+    Downsample ``(t, x, y)`` points keeping each bucket's x and y extremes.
+
+    Every bucket of about ``threshold / 4`` contributes its points with the
+    smallest and largest x and y, so spikes from localisation glitches
+    survive; the result has at most ``threshold`` points, in time order.
+    Below four points there is no room for a bucket, so only the ends are kept.
+    """
+    count = len(points)
+    if threshold >= count:
+        return list(points)
+    if threshold < 4:
+        return [points[0], points[-1]][:max(threshold, 0)]
+    buckets = threshold // 4
+    size = count / buckets
+    keep = set()
+    for bucket in range(buckets):
+        chunk = range(int(bucket * size), min(int((bucket + 1) * size), count))
+        if not chunk:
+            continue
+        keep.add(min(chunk, key=lambda index: points[index][1]))
+        keep.add(max(chunk, key=lambda index: points[index][1]))
+        keep.add(min(chunk, key=lambda index: points[index][2]))
+        keep.add(max(chunk, key=lambda index: points[index][2]))
+    return [points[index] for index in sorted(keep)]
+
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax': minmax}
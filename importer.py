@@ -0,0 +1,207 @@
+"""
+importer.py
+Bulk customer import from CSV or JSON-lines files, for onboarding a site in
+one go instead of one /register form at a time.
+
+Rows carry ``name``, ``password``, ``contact`` and ``vehicle_id`` and are
+validated like /register. Valid rows are inserted with ``executemany`` in
+chunked transactions, and rejected rows are reported by line without
+aborting the import:
+    python -m importer customers.csv --database server.db
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from auth import DEFAULT_ITERATIONS, hash_password, is_hashed, parse_hash
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000  # Rows per executemany transaction
+DEFAULT_MAX_ERRORS = 1000  # Row errors kept in a report; the failed count stays exact
+FIELDS = ('name', 'password', 'contact', 'vehicle_id')
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename):
+    """
+    Return ``jsonl`` for .jsonl, .ndjson and .json file names, else ``csv``.
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    return 'jsonl' if extension in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def read_records(lines, fmt='csv'):
+    """
+    Yield ``(line number, record dict or error message)`` from a text stream.
+
+    CSV files need a header row naming the columns; blank JSON lines are skipped.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, f"invalid JSON: {exc}"
+            continue
+        yield number, record if isinstance(record, dict) else "expected a JSON object"
+
+
+def parse_integer(value, field):
+    """
+    Return an integer field given as a JSON integer or a string of digits.
+    """
+    if isinstance(value, str) and value.strip().isdecimal():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"{field} must be an integer, got {value!r}")
+
+
+def validate(record):
+    """
+    Return the ``(name, password, mobile_number, vehicle_id)`` row for a record.
+
+    Raises ValueError like /register does for a contact or vehicle id that is
+    not an integer, for missing fields and for a password that looks hashed
+    but is not a well-formed hash, which could never be logged in with, or
+    whose iteration count is above ``auth.MAX_ITERATIONS``.
+    """
+    missing = [field for field in FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    password = str(record['password'])
+    if is_hashed(password):
+        try:
+            parse_hash(password)
+        except ValueError as exc:
+            raise ValueError(f"invalid password hash: {exc}") from exc
+    return (str(record['name']), password, parse_integer(record['contact'], 'contact'),
+            parse_integer(record['vehicle_id'], 'vehicle_id'))
+
+
+class ImportReport:
+    """
+    Counts of an import and the first ``max_errors`` row errors by line.
+    """
+
+    def __init__(self, max_errors=DEFAULT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        """
+        Record a rejected row.
+        """
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        """
+        Return the report as a JSON-ready dict.
+        """
+        return {'imported': self.imported, 'failed': self.failed, 'errors': self.errors,
+                'errors_truncated': self.failed > len(self.errors)}
+
+
+def import_customers(customers, lines, fmt='csv', iterations=DEFAULT_ITERATIONS,
+                     chunk_size=DEFAULT_CHUNK_SIZE, max_errors=DEFAULT_MAX_ERRORS,
+                     hash_workers=None):
+    """
+    Stream rows from ``lines`` into a CustomerRepository; returns an ImportReport.
+
+    Plain-text passwords are hashed like /register, on ``hash_workers``
+    threads since PBKDF2 releases the GIL; already hashed ones are kept.
+    Each chunk of valid rows is one transaction, so a failure only ever
+    costs the rows the database rejected.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {FORMATS}")
+    report = ImportReport(max_errors)
+    records = read_records(lines, fmt)
+
+    with ThreadPoolExecutor(max_workers=hash_workers or os.cpu_count() or 1) as executor:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            numbers, rows, errors = [], [], []
+            for number, record in chunk:
+                try:
+                    if isinstance(record, str):
+                        raise ValueError(record)
+                    rows.append(validate(record))
+                    numbers.append(number)
+                except (TypeError, ValueError) as exc:
+                    errors.append((number, str(exc)))
+            if rows:
+                plain = [position for position, row in enumerate(rows) if not is_hashed(row[1])]
+                hashes = executor.map(hash_password, [rows[position][1] for position in plain],
+                                      [iterations] * len(plain))
+                for position, password in zip(plain, hashes):
+                    name, _, mobile_number, vehicle_id = rows[position]
+                    rows[position] = (name, password, mobile_number, vehicle_id)
+                failed = customers.insert_many(rows)
+                errors.extend((numbers[position], message) for position, message in failed)
+                report.imported += len(rows) - len(failed)
+            for number, message in sorted(errors):
+                report.error(number, message)
+    LOGGER.info("Imported %d customers, %d rows rejected", report.imported, report.failed)
+    return report
+
+
+def main():
+    """
+    Command line entry point for a bulk import.
+    """
+    import db  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description='Bulk customer import')
+    parser.add_argument('file', help="CSV or JSON-lines file, or - for stdin")
+    parser.add_argument('--database', default=db.DEFAULT_DATABASE)
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help='Input format; guessed from the file name by default')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--hash-workers', type=int, default=None,
+                        help='Threads hashing passwords; one per CPU by default')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    fmt = args.format or detect_format(args.file)
+    pool = db.ConnectionPool(args.database)
+    customers = db.CustomerRepository(pool)
+    customers.ensure_indexes()
+    if args.file == '-':
+        lines = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        # pylint: disable-next=consider-using-with
+        lines = open(args.file, encoding='utf-8', newline='')
+    with lines:
+        report = import_customers(customers, lines, fmt, args.iterations, args.chunk_size,
+                                  hash_workers=args.hash_workers)
+    pool.close()
+    for error in report.errors:
+        LOGGER.warning("Line %d: %s", error['line'], error['error'])
+    if report.failed > len(report.errors):
+        LOGGER.warning("%d more rejected rows not listed", report.failed - len(report.errors))
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,434 @@
-import tkinter as tk
+"""
+launch.py
+Headless launcher for the whole stack: starts the web app, the localization
+node and the park node in parallel from a JSON config, waits on readiness
+probes instead of fixed sleeps, restarts crashed components and reports how
+long everything took to come up. Every component is expected to keep
+running, so one that exits, even with status 0, fails the launch.
+
+    python launch.py --config launch.json
+    python launch.py --config launch.json --exit-when-ready   # e.g. in CI
+
+Each component has a ``command`` (a list, or a string run with bash after
+the optional ``setup`` snippet), an optional ``cwd`` relative to the config
+file, ``env`` additions, a ``ready`` probe and ``restart`` options passed to
+the supervisor. Entries under ``defaults`` apply to every component. Probes:
+    {"http": "http://127.0.0.1:5000/healthz"}   a 2xx or 3xx response
+    {"tcp": "127.0.0.1:5000"}                   the port accepts connections
+    {"topic": "/ego_vehicle_pose"}              ``ros2 topic echo --once`` gets a message
+    {"node": "/park"}                           ``ros2 node list`` lists the node
+    {"command": ["sh", "-c", "..."]}            the command exits with 0
+    {"output": "regex"}                         the component prints a matching line
+Without a probe a component is ready as soon as its process is running.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shlex
+import signal
+import socket
 import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from supervisor import ManagedProcess
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = 'launch.json'
+DEFAULT_READY_TIMEOUT = 60.0  # Seconds a component may take to pass its probe
+DEFAULT_PROBE_INTERVAL = 0.2  # Seconds between probe attempts
+DEFAULT_PROBE_TIMEOUT = 2.0  # Seconds one probe attempt may take
+RESTART_OPTIONS = ('backoff', 'max_backoff', 'max_restarts', 'stable_after')
 
-def run_ros2_and_script():
-    command = """
-    cd /home/af/siva &&
-    . install/setup.bash &&
-    cd park_app &&
-    python3 app.py; bash
+
+class LaunchConfigError(ValueError):
+    """
+    Raised for a config file that does not describe a valid set of components.
     """
-    subprocess.Popen(['gnome-terminal', '--', 'bash', '-c', command])
 
-def ego_local():
-    command = """
-    cd /home/af/siva &&
-    . install/setup.bash &&
-    ros2 run ego_localization ego_localization; bash
+
+def http_probe(url, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Return a probe passing when ``url`` answers with a 2xx or 3xx status.
+    """
+    def probe():
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return 200 <= response.status < 400
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+    return probe
+
+
+def tcp_probe(address, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Return a probe passing when ``host:port`` accepts a TCP connection.
+    """
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise LaunchConfigError(f"tcp probe needs host:port, got {address!r}")
+
+    def probe():
+        try:
+            with socket.create_connection((host, int(port)), timeout=timeout):
+                return True
+        except OSError:
+            return False
+    return probe
+
+
+def command_probe(command, timeout=DEFAULT_PROBE_TIMEOUT, env=None, cwd=None):
     """
-    subprocess.Popen(['gnome-terminal', '--', 'bash', '-c', command])
+    Return a probe passing when ``command`` exits with status 0 within ``timeout``.
+    """
+    def probe():
+        try:
+            return subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL, timeout=timeout, env=env, cwd=cwd,
+                                  check=False).returncode == 0
+        except (subprocess.TimeoutExpired, OSError):
+            return False
+    return probe
+
+
+def topic_probe(topic, timeout=DEFAULT_PROBE_TIMEOUT, env=None, cwd=None, setup=None):
+    """
+    Return a probe passing once a message arrives on a ROS 2 topic, after
+    running the ``setup`` shell snippet, e.g. sourcing the workspace.
+    """
+    command = ['ros2', 'topic', 'echo', '--once', topic]
+    if setup:
+        command = ['bash', '-c', f'{setup} && exec {shlex.join(command)}']
+    return command_probe(command, timeout, env, cwd)
+
+
+def node_probe(node, timeout=DEFAULT_PROBE_TIMEOUT, env=None, cwd=None, setup=None):
+    """
+    Return a probe passing once ``ros2 node list`` lists a fully qualified
+    node name, after running the ``setup`` shell snippet.
+    """
+    command = ['ros2', 'node', 'list']
+    if setup:
+        command = ['bash', '-c', f'{setup} && exec {shlex.join(command)}']
+
+    def probe():
+        try:
+            result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, timeout=timeout, env=env, cwd=cwd,
+                                    check=False, text=True)
+        except (subprocess.TimeoutExpired, OSError):
+            return False
+        return result.returncode == 0 and node in result.stdout.split()
+    return probe
+
+
+def output_probe(process, pattern):
+    """
+    Return a probe passing once the current run of ``process`` printed a line
+    matching ``pattern``.
+    """
+    regex = re.compile(pattern)
+
+    def probe():
+        return any(regex.search(line) for line in process.run_output())
+    return probe
+
+
+class Component:
+    """
+    One supervised process and the thread tracking whether it is ready.
+
+    The tracking thread probes every ``interval`` seconds until the probe
+    passes or ``ready_timeout`` runs out. When the supervisor restarts the
+    process, the component is not ready again until the probe passes anew.
+    """
+
+    def __init__(self, name, command, ready=None, ready_timeout=DEFAULT_READY_TIMEOUT,
+                 interval=DEFAULT_PROBE_INTERVAL, probe_timeout=DEFAULT_PROBE_TIMEOUT,
+                 env=None, cwd=None, setup=None, **process_options):
+        self.name = name
+        self.ready_timeout = ready_timeout
+        self.interval = interval
+        self.process = ManagedProcess(name, command, env=env, cwd=cwd, **process_options)
+        self.probe = self._make_probe(ready or {}, probe_timeout, env, cwd, setup)
+        self.ready = threading.Event()
+        self.settled = threading.Event()  # Set once ready, timed out or failed
+        self.started = None
+        self.ready_seconds = None
+        self.timed_out = False
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._track, name=f'ready-{name}', daemon=True)
+
+    def _make_probe(self, spec, timeout, env, cwd, setup):
+        """
+        Build the probe function described by a ``ready`` config entry.
+        """
+        if not spec:
+            return lambda: self.process.pid is not None
+        if len(spec) != 1:
+            raise LaunchConfigError(f"{self.name}: ready needs exactly one probe, got {spec}")
+        kind, target = next(iter(spec.items()))
+        if kind == 'http':
+            return http_probe(target, timeout)
+        if kind == 'tcp':
+            return tcp_probe(target, timeout)
+        if kind == 'command':
+            return command_probe(target, timeout, env, cwd)
+        if kind == 'topic':
+            return topic_probe(target, timeout, env, cwd, setup)
+        if kind == 'node':
+            return node_probe(target, timeout, env, cwd, setup)
+        if kind == 'output':
+            return output_probe(self.process, target)
+        raise LaunchConfigError(f"{self.name}: unknown probe {kind!r}")
+
+    def start(self, started=None):
+        """
+        Start the process and its readiness tracking; ``started`` is the launch time.
+        """
+        self.started = started if started is not None else time.monotonic()
+        self.process.start()
+        self._thread.start()
+
+    def _alive(self):
+        """
+        Check whether the process is still running or about to be restarted.
+        """
+        return self.process.is_active() and not self._stopping.is_set()
+
+    def _track(self):
+        """
+        Probe after each (re)start of the process until the launcher stops.
+        """
+        deadline = self.started + self.ready_timeout
+        while self._alive():
+            run = self.process.started_at
+            if run is None or self.process.state != 'running':
+                self._stopping.wait(self.interval / 4)
+                continue
+            while self._alive() and self.process.started_at == run and not self.probe():
+                if time.monotonic() >= deadline:
+                    LOGGER.error("%s not ready after %.0fs", self.name, self.ready_timeout)
+                    self.timed_out = True
+                    self.settled.set()
+                    return
+                self._stopping.wait(self.interval)
+            if not self._alive() or self.process.started_at != run:
+                continue
+            if self.ready_seconds is None:
+                self.ready_seconds = time.monotonic() - self.started
+                LOGGER.info("%s ready after %.2fs", self.name, self.ready_seconds)
+            else:
+                LOGGER.info("%s ready again after restart %d", self.name, self.process.restarts)
+            self.ready.set()
+            self.settled.set()
+            while self._alive() and self.process.started_at == run:
+                self._stopping.wait(self.interval)
+            if self._alive():
+                LOGGER.warning("%s restarted, waiting for it to be ready again", self.name)
+                self.ready.clear()
+                deadline = time.monotonic() + self.ready_timeout
+        self.ready.clear()
+        self.settled.set()
+
+    def failed(self):
+        """
+        Check whether the component gave up: it crashed too often, never got
+        ready or exited cleanly, which a long-running component should not do.
+        """
+        return self.timed_out or self.process.state in ('failed', 'exited')
+
+    def stop(self, timeout=5.0):
+        """
+        Stop the process and the readiness tracking.
+        """
+        self._stopping.set()
+        self.process.stop(timeout)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def status(self):
+        """
+        Return the state, readiness and restart count of the component.
+        """
+        return {
+            'name': self.name,
+            'state': self.process.state,
+            'ready': self.ready.is_set(),
+            'ready_seconds': self.ready_seconds,
+            'restarts': self.process.restarts,
+            'pid': self.process.pid,
+        }
+
+
+def load_config(path, only=None):
+    """
+    Read a launch config and return its Components, optionally only the named ones.
+    """
+    try:
+        with open(path, encoding='utf-8') as config_file:
+            config = json.load(config_file)
+    except (OSError, ValueError) as exc:
+        raise LaunchConfigError(f"cannot read {path}: {exc}") from exc
+    entries = config.get('components') if isinstance(config, dict) else None
+    if not isinstance(entries, dict) or not entries:
+        raise LaunchConfigError(f"{path} has no components")
+    unknown = set(only or ()) - set(entries)
+    if unknown:
+        raise LaunchConfigError(f"unknown components: {', '.join(sorted(unknown))}")
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = config.get('defaults', {})
+    components = []
+    for name, entry in entries.items():
+        if only and name not in only:
+            continue
+        entry = dict(defaults, **entry)
+        command = entry.get('command')
+        setup = entry.get('setup')
+        if isinstance(command, str):
+            command = ['bash', '-c', f'{setup} && exec {command}' if setup else command]
+        if not command:
+            raise LaunchConfigError(f"{name}: missing command")
+        env = None
+        if entry.get('env'):
+            env = dict(os.environ, **{key: str(value) for key, value in entry['env'].items()})
+        restart = entry.get('restart', {})
+        bad = set(restart) - set(RESTART_OPTIONS)
+        if bad:
+            raise LaunchConfigError(f"{name}: unknown restart options {', '.join(sorted(bad))}")
+        components.append(Component(
+            name, command, ready=entry.get('ready'),
+            ready_timeout=float(entry.get('ready_timeout', DEFAULT_READY_TIMEOUT)),
+            interval=float(entry.get('probe_interval', DEFAULT_PROBE_INTERVAL)),
+            probe_timeout=float(entry.get('probe_timeout', DEFAULT_PROBE_TIMEOUT)),
+            env=env, cwd=os.path.join(base, entry.get('cwd', '.')), setup=setup, **restart))
+    return components
+
+
+class Launcher:
+    """
+    Starts components in parallel and waits until all are ready or one fails.
+    """
+
+    def __init__(self, components):
+        self.components = list(components)
+        self.started = None
+
+    def start(self):
+        """
+        Start every component at once.
+        """
+        self.started = time.monotonic()
+        for component in self.components:
+            component.start(self.started)
+
+    def wait_ready(self, timeout=None, stop=None):
+        """
+        Block until every component is ready; returns the seconds it took, or
+        None if a component failed, ``timeout`` ran out or ``stop`` was set.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for component in self.components:
+            while not component.settled.wait(0.1):
+                if (stop is not None and stop.is_set()) or \
+                        (deadline is not None and time.monotonic() >= deadline):
+                    return None
+            if not component.ready.is_set():
+                return None
+        return max(component.ready_seconds for component in self.components)
+
+    def failed(self):
+        """
+        Return the components that gave up.
+        """
+        return [component for component in self.components if component.failed()]
+
+    def watch(self, stop, interval=1.0):
+        """
+        Keep supervising until ``stop`` is set or a component gives up; returns
+        the failed components.
+        """
+        while not stop.wait(interval):
+            failed = self.failed()
+            if failed:
+                return failed
+        return []
+
+    def stop(self, timeout=5.0):
+        """
+        Stop every component, all at once.
+        """
+        threads = [threading.Thread(target=component.stop, args=(timeout,))
+                   for component in self.components]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def report(self):
+        """
+        Return one status line per component.
+        """
+        lines = []
+        for status in (component.status() for component in self.components):
+            ready = (f"ready in {status['ready_seconds']:.2f}s"
+                     if status['ready_seconds'] is not None else 'not ready')
+            lines.append(f"{status['name']:<16} {status['state']:<9} {ready:<18} "
+                         f"restarts {status['restarts']}")
+        return lines
+
+
+def main():
+    """
+    Command line entry point: launch, report time to ready, then supervise.
+    """
+    parser = argparse.ArgumentParser(description='Launch the Parkonomous stack headlessly')
+    parser.add_argument('--config', default=DEFAULT_CONFIG)
+    parser.add_argument('--only', action='append', default=[], metavar='NAME',
+                        help='Launch only this component (repeatable)')
+    parser.add_argument('--exit-when-ready', action='store_true',
+                        help='Stop everything and exit 0 once all components are ready')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        launcher = Launcher(load_config(args.config, args.only))
+    except LaunchConfigError as exc:
+        parser.error(str(exc))
 
-root = tk.Tk()
-root.title("ROS2 Script Runner")
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
 
-# Button for running the mobile interface script
-mobile_interface_button = tk.Button(root, text="Mobile Interface", command=run_ros2_and_script)
-mobile_interface_button.pack(padx=20, pady=20)
+    launcher.start()
+    seconds = launcher.wait_ready(stop=stop)
+    for line in launcher.report():
+        LOGGER.info(line)
+    if seconds is None:
+        for component in launcher.failed():
+            for line in component.process.run_output()[-20:]:
+                LOGGER.error("%s | %s", component.name, line)
+        LOGGER.error("Launch failed" if not stop.is_set() else "Launch interrupted")
+        launcher.stop()
+        sys.exit(1)
+    LOGGER.info("All %d components ready in %.2fs", len(launcher.components), seconds)
+    if args.exit_when_ready:
+        launcher.stop()
+        return
+    failed = launcher.watch(stop)
+    for line in launcher.report():
+        LOGGER.info(line)
+    launcher.stop()
+    if failed:
+        LOGGER.error("Gave up on %s", ', '.join(component.name for component in failed))
+        sys.exit(1)
 
-# Button for running the ego localization script
-ego_loc_button = tk.Button(root, text="Ego Localization", command=ego_local)
-ego_loc_button.pack(padx=20, pady=20)
 
-root.mainloop()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""
+metrics.py
+In-process counters and latency histograms exposed in the Prometheus text
+format, cheap enough to leave on for every ROS callback, emit and query.
+
+Each thread records into its own shard, so the hot path takes no lock and
+never contends with other threads; a scrape sums the shards. Shards of
+threads that have exited are folded into a retired total on the next scrape.
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from flask import Response, g, request
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds; spans sub-millisecond callbacks up to slow page renders
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+NAME_PATTERN = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*$')
+
+
+def _format_value(value):
+    """
+    Format a sample value the way Prometheus parses it.
+    """
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def _escape(value):
+    """
+    Escape a label value for the text format.
+    """
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=''):
+    """
+    Render ``{name="value",...}``, or nothing when there are no labels.
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Owner:
+    """
+    Held only by a thread's local storage; its collection marks the shard as retired.
+    """
+    __slots__ = ('__weakref__',)
+
+
+class _Metric:
+    """
+    A named metric whose samples are kept in one dict per recording thread.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        if not NAME_PATTERN.match(name):
+            raise ValueError(f"invalid metric name {name!r}")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live = {}
+        self._dead = deque()
+        self._retired = {}
+
+    def _shard(self):
+        """
+        Create the calling thread's shard on its first sample.
+        """
+        shard = {}
+        owner = _Owner()
+        self._local.shard = shard
+        self._local.owner = owner
+        finalizer = weakref.finalize(owner, self._dead.append, shard)
+        finalizer.atexit = False
+        with self._lock:
+            self._live[id(shard)] = shard
+        return shard
+
+    def _check(self, labels):
+        """
+        Reject a sample whose label values do not match the label names.
+        """
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {labels}")
+
+    @staticmethod
+    def _copy(value):
+        """
+        Return a snapshot of one shard value.
+        """
+        return value
+
+    @staticmethod
+    def _add(total, value):
+        """
+        Return the sum of two shard values.
+        """
+        return total + value
+
+    def _merge(self, target, shard):
+        """
+        Add a shard's values into ``target``.
+        """
+        for labels, value in shard.items():
+            value = self._copy(value)
+            target[labels] = self._add(target[labels], value) if labels in target else value
+
+    def values(self):
+        """
+        Return ``{label values: total}`` summed over every thread.
+        """
+        with self._lock:
+            while self._dead:
+                shard = self._dead.popleft()
+                self._live.pop(id(shard), None)
+                self._merge(self._retired, shard)
+            totals = {}
+            self._merge(totals, self._retired)
+            for shard in self._live.values():
+                self._merge(totals, shard.copy())
+        return totals
+
+    def expose(self):
+        """
+        Return the metric in the Prometheus text format.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in sorted(self.values().items()):
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels, value):
+        """
+        Return the sample lines for one label set.
+        """
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, e.g. messages received per topic.
+    """
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        """
+        Add ``amount`` to the count for the given label values.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        try:
+            shard[labels] += amount
+        except KeyError:
+            self._check(labels)
+            shard[labels] = amount
+
+
+class Histogram(_Metric):
+    """
+    Observed values counted into cumulative ``le`` buckets, with their sum.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value, *labels):
+        """
+        Record one value for the given label values.
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            self._check(labels)
+            # One count per bucket, one for +Inf, then the running sum
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def time(self, *labels):
+        """
+        Return a context manager observing the duration of its block.
+        """
+        return _Timer(self, labels)
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    @staticmethod
+    def _add(total, value):
+        for index, count in enumerate(value):
+            total[index] += count
+        return total
+
+    def _samples(self, labels, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), value):
+            cumulative += count
+            extra = f'le="{_format_value(bound)}"'
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, extra)} '
+                         f'{cumulative}')
+        rendered = _labels(self.labelnames, labels)
+        lines.append(f'{self.name}_sum{rendered} {_format_value(value[-1])}')
+        lines.append(f'{self.name}_count{rendered} {cumulative}')
+        return lines
+
+
+class _Timer:
+    """
+    Context manager feeding a block's duration to a histogram.
+    """
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Gauge:
+    """
+    A value read from a callback at scrape time, e.g. the connected clients.
+
+    ``func`` returns a number, or ``{label values: number}`` when the gauge
+    has labels.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, func, labelnames=()):
+        if not NAME_PATTERN.match(name):
+            raise ValueError(f"invalid metric name {name!r}")
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.labelnames = tuple(labelnames)
+
+    def expose(self):
+        """
+        Return the gauge in the Prometheus text format.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        value = self.func()
+        samples = value.items() if self.labelnames else [((), value)]
+        for labels, sample in sorted(samples):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} '
+                         f'{_format_value(sample)}')
+        return lines
+
+
+def callback_instrument(messages, latency):
+    """
+    Return an ``instrument(topic, callback)`` wrapper for ROS subscriptions
+    counting messages per topic in ``messages`` and timing each call in
+    ``latency``, labelled by the callback's name.
+    """
+    def instrument(topic, callback):
+        name = getattr(callback, 'func', callback).__name__
+        observe = latency.observe
+        count = messages.inc
+
+        def timed(msg):
+            start = time.perf_counter()
+            try:
+                return callback(msg)
+            finally:
+                observe(time.perf_counter() - start, name)
+                count(topic)
+        return timed
+    return instrument
+
+
+class Registry:
+    """
+    The metrics of one process, rendered together by ``expose``.
+
+    ``init_app`` adds per-route request timings to a Flask app and serves
+    the registry at ``/metrics``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.requests = None
+
+    def _register(self, metric):
+        """
+        Add a metric, refusing duplicate names.
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"duplicate metric {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """
+        Create and register a counter.
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Create and register a histogram.
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, func, labelnames=()):
+        """
+        Create and register a gauge read from ``func`` at scrape time.
+        """
+        return self._register(Gauge(name, documentation, func, labelnames))
+
+    def stats(self, prefix, func, documentation):
+        """
+        Expose every numeric value of a component's ``stats()`` as a gauge
+        named ``<prefix>_<key>``, read at scrape time.
+        """
+        for key, value in func().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.gauge(f'{prefix}_{key}', f'{documentation} ({key})',
+                           lambda key=key: func()[key])
+
+    def expose(self):
+        """
+        Return every metric in the Prometheus text format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.expose())
+            except Exception as exc:  # pylint: disable=broad-except
+                LOGGER.error("Error collecting metric %s: %s", metric.name, str(exc))
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app, path='/metrics'):
+        """
+        Time every request by route, method and status, and serve ``path``.
+        """
+        self.requests = self.histogram('http_request_duration_seconds',
+                                       'Time spent handling HTTP requests',
+                                       ('route', 'method', 'status'))
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule(path, 'metrics', self.serve)
+
+    @staticmethod
+    def _start_request():
+        """
+        Note when the request started.
+        """
+        g.metrics_start = time.perf_counter()
+
+    def _finish_request(self, response):
+        """
+        Observe the request duration, labelled by the matched route pattern.
+        """
+        start = g.get('metrics_start')
+        if start is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            self.requests.observe(time.perf_counter() - start, rule, request.method,
+                                  str(response.status_code))
+        return response
+
+    def serve(self):
+        """
+        Route returning the registry for a Prometheus scrape.
+        """
+        return Response(self.expose(), mimetype=None, content_type=CONTENT_TYPE)
@@ -0,0 +1,165 @@
+"""
+occupancy.py
+Parking spot occupancy held as a bitset, with debounced sensor readings and
+diff-only ``parking_status`` payloads.
+"""
+
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SPOTS = 500
+DEFAULT_SETTLE = 0.5  # Seconds a new reading must hold before it is published
+
+
+class OccupancyMap:
+    """
+    Availability of every spot in a lot, one bit per spot (set = occupied).
+
+    Sensor readings go through ``update``; a reading only changes the
+    published state once it has held for ``settle`` seconds, so a sensor
+    flapping between occupied and free inside that window never produces an
+    update. ``collect`` returns the spots that changed since the last call,
+    which is what gets broadcast; ``snapshot`` returns every spot for clients
+    that just connected.
+    """
+
+    def __init__(self, size=DEFAULT_SPOTS, settle=DEFAULT_SETTLE, clock=time.monotonic):
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self.size = size
+        self.settle = settle
+        self._clock = clock
+        self._bits = bytearray((size + 7) // 8)
+        self._candidates = {}
+        self._lock = threading.Lock()
+        self.readings = 0
+        self.suppressed = 0
+        self.changes = 0
+
+    def _check(self, spot_id):
+        """
+        Raise IndexError for a spot id outside the lot.
+        """
+        if not 0 <= spot_id < self.size:
+            raise IndexError(f"spot {spot_id} outside 0..{self.size - 1}")
+
+    def _get(self, spot_id):
+        """
+        Read the published bit for a spot; the caller checks the id.
+        """
+        return bool(self._bits[spot_id >> 3] & (1 << (spot_id & 7)))
+
+    def _set(self, spot_id, occupied):
+        """
+        Write the published bit for a spot; the caller checks the id.
+        """
+        if occupied:
+            self._bits[spot_id >> 3] |= 1 << (spot_id & 7)
+        else:
+            self._bits[spot_id >> 3] &= ~(1 << (spot_id & 7)) & 0xFF
+
+    def is_occupied(self, spot_id):
+        """
+        Return the published occupancy of a spot.
+        """
+        self._check(spot_id)
+        with self._lock:
+            return self._get(spot_id)
+
+    def occupied_count(self):
+        """
+        Return how many spots are published as occupied.
+        """
+        with self._lock:
+            return sum(bin(byte).count('1') for byte in self._bits)
+
+    def update(self, spot_id, occupied, now=None):
+        """
+        Record one sensor reading for a spot.
+        """
+        self._check(spot_id)
+        occupied = bool(occupied)
+        now = self._clock() if now is None else now
+        with self._lock:
+            self.readings += 1
+            candidate = self._candidates.get(spot_id)
+            if occupied == self._get(spot_id):
+                if candidate is not None:
+                    # Flipped back before settling: nothing to publish
+                    del self._candidates[spot_id]
+                    self.suppressed += 1
+            elif candidate is None:
+                self._candidates[spot_id] = now
+
+    def update_many(self, readings, now=None):
+        """
+        Record ``(spot_id, occupied)`` readings that arrived together.
+        """
+        now = self._clock() if now is None else now
+        for spot_id, occupied in readings:
+            self.update(spot_id, occupied, now)
+
+    def collect(self, now=None):
+        """
+        Publish readings that have settled and return them as ``{spot_id: available}``.
+        """
+        now = self._clock() if now is None else now
+        changed = {}
+        with self._lock:
+            for spot_id, since in list(self._candidates.items()):
+                if now - since >= self.settle:
+                    del self._candidates[spot_id]
+                    occupied = not self._get(spot_id)
+                    self._set(spot_id, occupied)
+                    changed[spot_id] = not occupied
+            self.changes += len(changed)
+        return changed
+
+    def apply(self, spots):
+        """
+        Publish ``{spot_id: available}`` states that already settled in another
+        process, e.g. relayed over the message queue; ids outside the lot are
+        skipped. Returns how many spots were applied.
+        """
+        applied = 0
+        with self._lock:
+            for spot_id, available in spots.items():
+                try:
+                    spot_id = int(spot_id)
+                    self._check(spot_id)
+                except (IndexError, TypeError, ValueError):
+                    LOGGER.warning("Ignoring relayed status of unknown spot %r", spot_id)
+                    continue
+                self._candidates.pop(spot_id, None)
+                self._set(spot_id, not available)
+                applied += 1
+        return applied
+
+    def snapshot(self):
+        """
+        Return ``{spot_id: available}`` for every spot.
+        """
+        with self._lock:
+            return {spot_id: not self._get(spot_id) for spot_id in range(self.size)}
+
+    def stats(self):
+        """
+        Return the reading, suppressed-flap and published-change counters.
+        """
+        with self._lock:
+            return {
+                'readings': self.readings,
+                'suppressed': self.suppressed,
+                'changes': self.changes,
+                'pending': len(self._candidates),
+            }
+
+
+def status_payload(spots, snapshot=False):
+    """
+    Wrap ``{spot_id: available}`` in the ``parking_status`` event payload.
+    """
+    return {'parking_spots_status': spots, 'snapshot': snapshot}
@@ -0,0 +1,134 @@
+"""
+pagecache.py
+Memoized rendering for pages whose output does not depend on the request,
+with strong ETags so repeat visitors get ``304 Not Modified``.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app, render_template, request, session
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 64
+
+
+class _Entry:
+    """
+    One rendered page: its body, ETag and what it was rendered from.
+    """
+    __slots__ = ('body', 'etag', 'template', 'version')
+
+    def __init__(self, body, etag, template, version):
+        self.body = body
+        self.etag = etag
+        self.template = template
+        self.version = version
+
+
+class PageCache:
+    """
+    Rendered bodies keyed by template and locale, least recently used evicted.
+
+    Pages with pending flashed messages are rendered fresh and not cached,
+    since they are the only per-visitor content in these templates. When the
+    app auto-reloads templates (debug mode), entries whose template file
+    changed are re-rendered. ``version`` is an optional callable whose
+    result, when it changes, invalidates every entry (e.g. the asset
+    manifest, which the rendered URLs depend on).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, version=None):
+        self.max_entries = max_entries
+        self.version = version
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def locale():
+        """
+        Return the primary language the client prefers, e.g. ``en``.
+        """
+        best = request.accept_languages.best
+        return best.split('-')[0].lower() if best else ''
+
+    def _lookup(self, key, version):
+        """
+        Return a still valid entry for a key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stale = entry.version != version or (
+                current_app.jinja_env.auto_reload and not entry.template.is_up_to_date)
+            if stale:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        """
+        Add an entry, evicting the least recently used past ``max_entries``.
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def render(self, template_name):
+        """
+        Return a response for a template, from the cache when possible.
+
+        Responses carry a strong ETag and ``Cache-Control: no-cache``, so
+        browsers revalidate every time and get a 304 when nothing changed.
+        """
+        if not self.enabled or session.get('_flashes'):
+            return render_template(template_name)
+        version = self.version() if self.version is not None else None
+        key = (template_name, self.locale())
+        entry = self._lookup(key, version)
+        if entry is None:
+            template = current_app.jinja_env.get_template(template_name)
+            body = render_template(template_name).encode('utf-8')
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            entry = _Entry(body, etag, template, version)
+            self._store(key, entry)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+        if request.if_none_match.contains(entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(entry.body, mimetype='text/html')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Language')
+        return response
+
+    def clear(self):
+        """
+        Drop every cached page.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the hit, miss, 304 and size counters.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'not_modified': self.not_modified, 'entries': len(self._entries)}
@@ -0,0 +1,209 @@
+"""
+profiler.py
+Runtime diagnostics that need neither a restart nor debug mode: a sampling
+profiler over every thread producing collapsed stacks for flamegraph tools,
+and a tracer logging requests slower than a threshold with their DB and
+emit sub-spans.
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from flask import g, has_request_context, request
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005  # Seconds between stack samples
+DEFAULT_MAX_SECONDS = 60.0  # Longest profile allowed in one call
+DEFAULT_MAX_DEPTH = 128  # Frames kept per stack, innermost first
+DEFAULT_KEEP_TRACES = 50  # Slow request traces kept for the admin route
+
+
+class ProfilerBusyError(RuntimeError):
+    """
+    Raised when a profile is requested while another one is running.
+    """
+
+
+def frame_name(frame):
+    """
+    Return the flamegraph label of a frame: ``function (file:line)``.
+    """
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})'
+
+
+def stack_of(frame, max_depth=DEFAULT_MAX_DEPTH):
+    """
+    Return a frame's stack as labels, outermost first.
+    """
+    names = []
+    while frame is not None and len(names) < max_depth:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every Python thread at a fixed interval.
+
+    Sampling reads ``sys._current_frames()`` from the calling thread, so
+    profiled threads are never interrupted or instrumented. The ROS executor,
+    fan-out and request threads all show up under their thread names. With
+    an event-loop backend, green threads appear as the one OS thread
+    running the hub, but only while they are running.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, max_seconds=DEFAULT_MAX_SECONDS,
+                 max_depth=DEFAULT_MAX_DEPTH):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self._busy = threading.Lock()
+        self.profiles = 0
+
+    def sample(self, counts, skip):
+        """
+        Add one sample of every thread except ``skip`` to ``counts``.
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == skip:
+                continue
+            stack = [names.get(ident, f'thread-{ident}')] + stack_of(frame, self.max_depth)
+            counts[';'.join(stack)] += 1
+
+    def profile(self, seconds, interval=None):
+        """
+        Sample every thread for ``seconds`` and return ``{collapsed stack: samples}``.
+
+        ``seconds`` is capped at ``max_seconds``. Raises ProfilerBusyError if
+        a profile is already running.
+        """
+        interval = max(interval or self.interval, 0.001)
+        seconds = min(max(seconds, interval), self.max_seconds)
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusyError("a profile is already running")
+        try:
+            LOGGER.info("Profiling every %.1f ms for %.1fs", interval * 1000, seconds)
+            counts = Counter()
+            me = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                self.sample(counts, me)
+                time.sleep(interval)
+            self.profiles += 1
+            return counts
+        finally:
+            self._busy.release()
+
+    @staticmethod
+    def collapsed(counts):
+        """
+        Render sample counts as ``stack count`` lines, the input of flamegraph.pl and speedscope.
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(counts.items()))
+
+
+class RequestTracer:
+    """
+    Logs requests slower than ``threshold`` seconds with their sub-spans.
+
+    ``span`` is called by the DB and emit layers after each operation; it is
+    a no-op outside a traced request. Tracing is off while ``threshold`` is
+    None and can be changed at any time. The slowest recent traces are kept
+    for ``recent``.
+    """
+
+    def __init__(self, threshold=None, keep=DEFAULT_KEEP_TRACES):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._traces = deque(maxlen=keep)
+        self.traced = 0
+        self.slow = 0
+
+    def init_app(self, app):
+        """
+        Register the request hooks on an app.
+        """
+        app.before_request(self._begin)
+        app.after_request(self._finish)
+
+    def _begin(self):
+        """
+        Start a trace for the request if tracing is on.
+        """
+        if self.threshold is not None:
+            g.trace_start = time.perf_counter()
+            g.trace_spans = []
+
+    def span(self, kind, name, seconds):
+        """
+        Record an operation of ``seconds`` that just ended, e.g. ``('db', 'find_by_name', 0.002)``.
+        """
+        if self.threshold is None or not has_request_context():
+            return
+        spans = g.get('trace_spans')
+        if spans is not None:
+            end = time.perf_counter() - g.trace_start
+            spans.append((kind, name, end - seconds, seconds))
+
+    def _finish(self, response):
+        """
+        Log the request when it took longer than the threshold.
+        """
+        start = g.get('trace_start')
+        threshold = self.threshold
+        if start is None or threshold is None:
+            return response
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.traced += 1
+        if elapsed < threshold:
+            return response
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        trace = {
+            'time': time.time(),
+            'method': request.method,
+            'route': rule,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 3),
+            'spans': [{'kind': kind, 'name': name, 'start_ms': round(offset * 1000, 3),
+                       'ms': round(seconds * 1000, 3)}
+                      for kind, name, offset, seconds in g.trace_spans],
+        }
+        with self._lock:
+            self.slow += 1
+            self._traces.append(trace)
+        totals = {}
+        for span in trace['spans']:
+            count, total = totals.get(span['kind'], (0, 0.0))
+            totals[span['kind']] = (count + 1, total + span['ms'])
+        summary = ', '.join(f'{kind} {count}x {total:.1f} ms'
+                            for kind, (count, total) in sorted(totals.items()))
+        LOGGER.warning("Slow request %s %s %d: %.1f ms (%s)", request.method, request.path,
+                       response.status_code, trace['ms'], summary or 'no spans')
+        for span in trace['spans']:
+            LOGGER.warning("  +%.1f ms %s %s %.1f ms", span['start_ms'], span['kind'],
+                           span['name'], span['ms'])
+        return response
+
+    def recent(self):
+        """
+        Return the kept slow traces, newest first.
+        """
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def stats(self):
+        """
+        Return the threshold and the traced and slow request counters.
+        """
+        with self._lock:
+            return {'threshold_ms': None if self.threshold is None else self.threshold * 1000,
+                    'traced': self.traced, 'slow': self.slow}
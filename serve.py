@@ -0,0 +1,119 @@
+"""
+serve.py
+Production launcher running the app on an event-loop backend (eventlet or
+gevent), so each long-lived /service socket costs a green thread instead of
+an OS thread. Falls back to the threading server when neither is installed.
+
+    python serve.py --backend auto --port 5000 --max-clients 5000
+
+Threading is left unpatched so the ROS executor keeps real OS threads; ROS
+callbacks only hand data to the fan-out, whose flush loop runs as a task on
+the event loop and does all the Socket.IO emits. Under gevent, subprocess is
+left unpatched too: the park node supervisor spawns and waits on children
+from its own OS thread, where gevent's child watchers do not work.
+"""
+
+import argparse
+import logging
+
+BACKENDS = ('eventlet', 'gevent', 'threading')
+
+LOGGER = logging.getLogger(__name__)
+
+
+def pick_backend(requested):
+    """
+    Return the requested backend, or the first installed one for ``auto``.
+    """
+    candidates = BACKENDS if requested == 'auto' else (requested,)
+    for backend in candidates:
+        if backend == 'threading':
+            return backend
+        try:
+            __import__(backend)
+            return backend
+        except ImportError:
+            if requested != 'auto':
+                raise
+    return 'threading'
+
+
+def patch_backend(backend):
+    """
+    Monkey patch the standard library for the backend, leaving threads native.
+    """
+    if backend == 'eventlet':
+        import eventlet  # pylint: disable=import-outside-toplevel
+        eventlet.monkey_patch(thread=False)
+    elif backend == 'gevent':
+        from gevent import monkey  # pylint: disable=import-outside-toplevel
+        monkey.patch_all(thread=False, subprocess=False)
+
+
+def main():
+    """
+    Parse arguments, patch for the chosen backend, then import and serve the app.
+    """
+    parser = argparse.ArgumentParser(description='Run Parkonomous on an event-loop server')
+    parser.add_argument('--backend', choices=('auto',) + BACKENDS, default='auto')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--max-clients', type=int, default=None,
+                        help='Refuse Socket.IO connections beyond this many')
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help='Packets queued for a client before its pose rate is lowered')
+    parser.add_argument('--stall-seconds', type=float, default=None,
+                        help='Seconds a client may stay over --max-queue before it is '
+                             'disconnected')
+    parser.add_argument('--message-queue', default=None,
+                        help='redis:// or local:// backplane URL shared with other workers')
+    parser.add_argument('--spots-database', default=None,
+                        help='SQLite file for spot reservations shared by workers; '
+                             'the customer database with --message-queue')
+    parser.add_argument('--no-ros', action='store_true',
+                        help='Do not start the ROS bridge, e.g. when a bridge process '
+                             'publishes to --message-queue')
+    parser.add_argument('--admin', action='append', type=int, default=[], metavar='ID',
+                        help='Customer id (sno) allowed to use the /admin routes (repeatable)')
+    parser.add_argument('--slow-request-ms', type=float, default=None,
+                        help='Log requests slower than this with their DB and emit spans')
+    args = parser.parse_args()
+
+    backend = pick_backend(args.backend)
+    patch_backend(backend)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Import only after patching so every module sees the patched stdlib
+    import db  # pylint: disable=import-outside-toplevel
+    from web import create_app  # pylint: disable=import-outside-toplevel
+
+    config = {
+        'MAX_CLIENTS': args.max_clients,
+        'ADMIN_CUSTOMER_IDS': tuple(args.admin),
+        'SOCKETIO_ASYNC_MODE': backend,
+        'SOCKETIO_MESSAGE_QUEUE': args.message_queue,
+    }
+    if args.spots_database or args.message_queue:
+        # Workers share spot reservations through the database, not process memory
+        config['SPOTS_DATABASE'] = args.spots_database or db.DEFAULT_DATABASE
+    if args.max_queue is not None:
+        config['SEND_QUEUE_HIGH_WATER'] = args.max_queue
+        config['SEND_QUEUE_LOW_WATER'] = args.max_queue // 8
+    if args.stall_seconds is not None:
+        config['SLOW_CLIENT_STALL_SECONDS'] = args.stall_seconds
+    application = create_app(config)
+    services = application.extensions['parkonomous']
+    if args.slow_request_ms is not None:
+        services.tracer.threshold = args.slow_request_ms / 1000
+    socketio = services.socketio
+    LOGGER.info("Serving with the %s backend", socketio.async_mode)
+    if args.no_ros:
+        services.fanout.start()
+    else:
+        services.start_ros_node()
+    socketio.run(application, host=args.host, port=args.port, debug=False,
+                 allow_unsafe_werkzeug=backend == 'threading')
+
+if __name__ == '__main__':
+    main()
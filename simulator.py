@@ -0,0 +1,135 @@
+"""
+simulator.py
+Simulated pose source that drives ROSNode callbacks directly from a recorded
+or synthetic trajectory at a configurable rate, for load tests without ROS
+topics.
+
+Recorded trajectories are CSV files with ``x,y`` columns (an optional ``t``
+column is ignored; the replay rate sets the timing).
+"""
+
+import csv
+import logging
+import math
+import threading
+import time
+from types import SimpleNamespace
+
+LOGGER = logging.getLogger(__name__)
+
+
+def make_pose_msg(xpos, ypos):
+    """
+    Build a PoseStamped, or a stand-in with the same shape when ROS is missing.
+    """
+    try:
+        from geometry_msgs.msg import PoseStamped  # pylint: disable=import-outside-toplevel
+        msg = PoseStamped()
+        msg.pose.position.x = float(xpos)
+        msg.pose.position.y = float(ypos)
+        return msg
+    except (ImportError, AttributeError):
+        position = SimpleNamespace(x=xpos, y=ypos, z=0.0)
+        return SimpleNamespace(pose=SimpleNamespace(position=position))
+
+
+def loop_trajectory(points, center=(5.0, 5.0), radius=4.0):
+    """
+    Return ``points`` positions evenly spaced on a circle around the lot.
+    """
+    return [(center[0] + radius * math.cos(2 * math.pi * i / points),
+             center[1] + radius * math.sin(2 * math.pi * i / points)) for i in range(points)]
+
+
+def line_trajectory(points, start=(0.0, 0.0), end=(10.0, 10.0)):
+    """
+    Return ``points`` positions on a straight line from start to end.
+    """
+    steps = max(points - 1, 1)
+    return [(start[0] + (end[0] - start[0]) * i / steps,
+             start[1] + (end[1] - start[1]) * i / steps) for i in range(points)]
+
+
+def load_trajectory(path):
+    """
+    Load ``(x, y)`` positions from a CSV file with ``x`` and ``y`` columns.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        return [(float(row['x']), float(row['y'])) for row in csv.DictReader(handle)]
+
+
+class PoseReplayer:
+    """
+    Feeds a trajectory into a pose callback at a fixed rate from its own thread.
+
+    ``callback`` is called with a PoseStamped-shaped message, e.g. a bound
+    ``ROSNode.pose_callback``. ``on_send`` is called with the frame index and
+    the ``time.perf_counter()`` timestamp just before each callback.
+    """
+
+    def __init__(self, callback, trajectory, rate_hz, loop=False, on_send=None):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.callback = callback
+        self.trajectory = list(trajectory)
+        self.interval = 1.0 / rate_hz
+        self.loop = loop
+        self.on_send = on_send
+        self.sent = 0
+        self.late = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self, duration=None):
+        """
+        Replay in the calling thread until the trajectory ends, ``duration``
+        seconds pass, or ``stop`` is called; returns the number of frames sent.
+        """
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else None
+        index = 0
+        while not self._stop.is_set():
+            if index >= len(self.trajectory):
+                if not self.loop or not self.trajectory:
+                    break
+                index = 0
+            due = start + self.sent * self.interval
+            now = time.perf_counter()
+            if deadline is not None and due >= deadline:
+                break
+            if due > now:
+                if self._stop.wait(due - now):
+                    break
+            elif now - due > self.interval:
+                self.late += 1
+            xpos, ypos = self.trajectory[index]
+            msg = make_pose_msg(xpos, ypos)
+            if self.on_send is not None:
+                self.on_send(self.sent, time.perf_counter())
+            self.callback(msg)
+            self.sent += 1
+            index += 1
+        return self.sent
+
+    def start(self, duration=None):
+        """
+        Replay in a background thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(duration,),
+                                        name='pose-replayer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop replaying and wait for the thread to finish.
+        """
+        self._stop.set()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        """
+        Wait for a background replay to finish.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
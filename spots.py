@@ -0,0 +1,273 @@
+"""
+spots.py
+Registry of parking spots in world coordinates, with a uniform grid index
+for nearest-free queries and atomic per-vehicle reservations.
+
+Spot layouts are CSV files with ``id,x,y`` columns in the same metres as
+the pose topics; ids index the occupancy bitset, so they should run from 0.
+Reservations live in memory, or in a SQLite table when several worker
+processes allocate from the same lot.
+"""
+
+import csv
+import heapq
+import logging
+import math
+import threading
+from array import array
+from collections import namedtuple
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SPOTS_FILE = 'spots.csv'
+DEFAULT_CELL_SIZE = 2.5  # Metres per grid cell, about one spot width
+
+Spot = namedtuple('Spot', 'id x y')
+
+CREATE_RESERVATIONS = (
+    "CREATE TABLE IF NOT EXISTS spot_reservation("
+    "spot_id INTEGER PRIMARY KEY, vehicle_id INTEGER NOT NULL UNIQUE)"
+)
+SELECT_RESERVATIONS = "SELECT spot_id, vehicle_id FROM spot_reservation"
+# Claims a spot unless it, or a spot for the vehicle, is already reserved
+INSERT_RESERVATION = "INSERT OR IGNORE INTO spot_reservation(spot_id, vehicle_id) VALUES (?,?)"
+DELETE_RESERVATION = "DELETE FROM spot_reservation WHERE spot_id=? AND vehicle_id=?"
+
+
+class NoFreeSpotError(RuntimeError):
+    """
+    Raised when every spot in the lot is reserved or occupied.
+    """
+
+
+def load_spots(path):
+    """
+    Load spots from a CSV file with ``id``, ``x`` and ``y`` columns.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        return [Spot(int(row['id']), float(row['x']), float(row['y']))
+                for row in csv.DictReader(handle)]
+
+
+class SpotRegistry:
+    """
+    Spot positions bucketed into square grid cells, plus the reservations.
+
+    Free means neither reserved nor reported occupied by ``occupancy`` (an
+    ``OccupancyMap`` whose ids match the spot ids). Search and reservation
+    happen under one lock, so concurrent ``allocate`` calls never hand out
+    the same spot twice. With a ``pool`` the reservations are kept in the
+    ``spot_reservation`` table instead: each call reloads them first, and a
+    spot is claimed with one conditional insert, so workers sharing the
+    database never hand out the same spot either.
+    """
+
+    def __init__(self, spots, cell_size=DEFAULT_CELL_SIZE, occupancy=None, pool=None):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self.occupancy = occupancy
+        self._positions = {}
+        self._xs = array('d')
+        self._ys = array('d')
+        self._ids = array('l')
+        self._grid = {}
+        for spot in spots:
+            if spot.id in self._positions:
+                raise ValueError(f"duplicate spot id {spot.id}")
+            self._positions[spot.id] = len(self._ids)
+            self._ids.append(spot.id)
+            self._xs.append(spot.x)
+            self._ys.append(spot.y)
+            self._grid.setdefault(self._cell(spot.x, spot.y), []).append(len(self._ids) - 1)
+        if self._grid:
+            cells = list(self._grid)
+            self._bounds = (min(c[0] for c in cells), min(c[1] for c in cells),
+                            max(c[0] for c in cells), max(c[1] for c in cells))
+        else:
+            self._bounds = None
+        self._lock = threading.Lock()
+        self._reserved = {}
+        self._by_vehicle = {}
+        self.pool = pool
+        if pool is not None:
+            with pool.transaction('spot_reservations') as con:
+                con.execute(CREATE_RESERVATIONS)
+
+    @classmethod
+    def from_file(cls, path, **options):
+        """
+        Build a registry from a spot layout CSV file.
+        """
+        spots = load_spots(path)
+        LOGGER.info("Loaded %d spots from %s", len(spots), path)
+        return cls(spots, **options)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _cell(self, xpos, ypos):
+        """
+        Return the grid cell holding a point.
+        """
+        return (math.floor(xpos / self.cell_size), math.floor(ypos / self.cell_size))
+
+    def spot(self, spot_id):
+        """
+        Return a spot by id, or raise KeyError.
+        """
+        index = self._positions[spot_id]
+        return Spot(spot_id, self._xs[index], self._ys[index])
+
+    def _is_free(self, spot_id):
+        """
+        Check a spot is neither reserved nor occupied; the caller holds the lock.
+        """
+        if spot_id in self._reserved:
+            return False
+        occupancy = self.occupancy
+        if occupancy is not None and spot_id < occupancy.size:
+            return not occupancy.is_occupied(spot_id)
+        return True
+
+    def _nearest(self, xpos, ypos, count):
+        """
+        Return up to ``count`` free ``(distance, spot_id)`` pairs, nearest first.
+
+        Rings of cells are scanned outwards from the query cell, starting at
+        the first ring that reaches the lot and clipped to it; the search
+        stops once the nearest unscanned ring is farther than the worst hit.
+        """
+        if self._bounds is None or count <= 0:
+            return []
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        center_x, center_y = self._cell(xpos, ypos)
+        first_ring = max(min_cx - center_x, center_x - max_cx,
+                         min_cy - center_y, center_y - max_cy, 0)
+        max_ring = max(abs(center_x - min_cx), abs(center_x - max_cx),
+                       abs(center_y - min_cy), abs(center_y - max_cy))
+        best = []  # Max-heap of (-distance, spot_id)
+        for ring in range(first_ring, max_ring + 1):
+            if len(best) == count:
+                # Every point outside this ring is at least this far away
+                edge = (ring - 1) * self.cell_size + min(
+                    xpos - center_x * self.cell_size, (center_x + 1) * self.cell_size - xpos,
+                    ypos - center_y * self.cell_size, (center_y + 1) * self.cell_size - ypos)
+                if edge > -best[0][0]:
+                    break
+            for cell in self._ring(center_x, center_y, ring):
+                for index in self._grid.get(cell, ()):
+                    spot_id = self._ids[index]
+                    if not self._is_free(spot_id):
+                        continue
+                    distance = math.hypot(self._xs[index] - xpos, self._ys[index] - ypos)
+                    if len(best) < count:
+                        heapq.heappush(best, (-distance, spot_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, spot_id))
+        return sorted((-negative, spot_id) for negative, spot_id in best)
+
+    def _ring(self, center_x, center_y, ring):
+        """
+        Yield the cells inside the lot bounds on the square ring ``ring``
+        cells away from a center cell.
+        """
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        columns = range(max(center_x - ring, min_cx), min(center_x + ring, max_cx) + 1)
+        for row in (center_y - ring, center_y + ring):
+            if min_cy <= row <= max_cy:
+                for column in columns:
+                    yield (column, row)
+        rows = range(max(center_y - ring + 1, min_cy), min(center_y + ring - 1, max_cy) + 1)
+        for column in (center_x - ring, center_x + ring):
+            if min_cx <= column <= max_cx:
+                for row in rows:
+                    yield (column, row)
+
+    def _load(self):
+        """
+        Reload the reservations from the database; the caller holds the lock.
+        """
+        if self.pool is None:
+            return
+        with self.pool.connection('spot_reservations') as con:
+            rows = con.execute(SELECT_RESERVATIONS).fetchall()
+        self._reserved = dict(rows)
+        self._by_vehicle = {vehicle_id: spot_id for spot_id, vehicle_id in rows}
+
+    def _claim(self, spot_id, vehicle_id):
+        """
+        Reserve a spot for a vehicle; returns False if another process took
+        the spot or reserved one for the vehicle first. The caller holds the lock.
+        """
+        if self.pool is not None:
+            with self.pool.transaction('allocate_spot') as con:
+                if con.execute(INSERT_RESERVATION, (spot_id, vehicle_id)).rowcount == 0:
+                    return False
+        self._reserved[spot_id] = vehicle_id
+        self._by_vehicle[vehicle_id] = spot_id
+        return True
+
+    def nearest_free(self, xpos, ypos, count=1):
+        """
+        Return up to ``count`` free spots nearest to a point, nearest first.
+        """
+        with self._lock:
+            self._load()
+            return [self.spot(spot_id) for _, spot_id in self._nearest(xpos, ypos, count)]
+
+    def allocate(self, vehicle_id, xpos, ypos):
+        """
+        Reserve the free spot nearest to a point for a vehicle and return it.
+
+        A vehicle holds at most one reservation; asking again returns the
+        spot it already has. Raises NoFreeSpotError when the lot is full.
+        """
+        with self._lock:
+            while True:
+                self._load()
+                spot_id = self._by_vehicle.get(vehicle_id)
+                if spot_id is not None:
+                    break
+                nearest = self._nearest(xpos, ypos, 1)
+                if not nearest:
+                    raise NoFreeSpotError("no free parking spot")
+                spot_id = nearest[0][1]
+                if self._claim(spot_id, vehicle_id):
+                    break
+        return self.spot(spot_id)
+
+    def release(self, vehicle_id):
+        """
+        Drop a vehicle's reservation; returns the released spot or None.
+        """
+        with self._lock:
+            self._load()
+            spot_id = self._by_vehicle.pop(vehicle_id, None)
+            if spot_id is not None:
+                del self._reserved[spot_id]
+                if self.pool is not None:
+                    with self.pool.transaction('release_spot') as con:
+                        con.execute(DELETE_RESERVATION, (spot_id, vehicle_id))
+        return self.spot(spot_id) if spot_id is not None else None
+
+    def reservation(self, vehicle_id):
+        """
+        Return the spot reserved for a vehicle, or None.
+        """
+        with self._lock:
+            self._load()
+            spot_id = self._by_vehicle.get(vehicle_id)
+        return self.spot(spot_id) if spot_id is not None else None
+
+    def stats(self):
+        """
+        Return the spot and reservation counts.
+        """
+        with self._lock:
+            self._load()
+            return {'spots': len(self._ids), 'reserved': len(self._reserved)}
+
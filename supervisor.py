@@ -0,0 +1,250 @@
+"""
+supervisor.py
+Managed child processes with a single instance per key, restart with backoff
+and captured output, used to run the ROS2 park node.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHILDREN = 4
+DEFAULT_OUTPUT_LINES = 200
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_MAX_RESTARTS = 5
+DEFAULT_STABLE_AFTER = 30.0
+
+
+class SupervisorFullError(RuntimeError):
+    """
+    Raised when starting another child would exceed the concurrency cap.
+    """
+
+
+class ManagedProcess:
+    """
+    One supervised command, restarted with exponential backoff when it crashes.
+    """
+
+    def __init__(self, key, command, output_lines=DEFAULT_OUTPUT_LINES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, max_restarts=DEFAULT_MAX_RESTARTS,
+                 stable_after=DEFAULT_STABLE_AFTER, env=None, cwd=None):
+        self.key = key
+        self.command = list(command)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_restarts = max_restarts
+        self.stable_after = stable_after
+        self.env = env
+        self.cwd = cwd
+        self.output = deque(maxlen=output_lines)
+        self.state = 'starting'
+        self.restarts = 0
+        self.returncode = None
+        self.started_at = None
+        self.lines = 0
+        self._run_start_line = 0
+        self._process = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'supervise-{key}', daemon=True)
+
+    @property
+    def pid(self):
+        """
+        PID of the current child, or None when it is not running.
+        """
+        process = self._process
+        return process.pid if process is not None and process.poll() is None else None
+
+    def is_active(self):
+        """
+        Check whether the process is running or waiting to be restarted.
+        """
+        return self.state in ('starting', 'running', 'backoff')
+
+    def start(self):
+        """
+        Start supervising in the background; returns without waiting for the child.
+        """
+        self._thread.start()
+
+    def _spawn(self):
+        """
+        Launch the child with stdout and stderr merged into one pipe.
+        """
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, env=self.env, cwd=self.cwd, start_new_session=True)
+        with self._lock:
+            self._process = process
+            self._run_start_line = self.lines
+            self.started_at = time.time()
+            self.state = 'running'
+        LOGGER.info("Started %s (pid %d): %s", self.key, process.pid, ' '.join(self.command))
+        return process
+
+    def _pump(self, process):
+        """
+        Copy the child's output into the ring buffer until it closes the pipe.
+        """
+        for line in iter(process.stdout.readline, b''):
+            self.output.append(line.decode('utf-8', 'replace').rstrip('\n'))
+            self.lines += 1
+        process.stdout.close()
+
+    def _run(self):
+        """
+        Supervision loop: run, wait, and restart with backoff until stopped.
+        """
+        delay = self.backoff
+        while not self._stopping.is_set():
+            try:
+                process = self._spawn()
+            except Exception as exc:  # pylint: disable=broad-except
+                self.output.append(f'failed to start: {exc}')
+                LOGGER.error("Could not start %s: %s", self.key, str(exc))
+                self.state = 'failed'
+                return
+            if self._stopping.is_set():
+                # stop() ran while the child was being spawned
+                self._terminate(process, 5.0)
+            self._pump(process)
+            self.returncode = process.wait()
+            ran_for = time.time() - self.started_at
+            if self._stopping.is_set():
+                break
+            LOGGER.warning("%s exited with code %s after %.1fs", self.key, self.returncode, ran_for)
+            if ran_for >= self.stable_after:
+                delay = self.backoff
+                self.restarts = 0
+            if self.returncode == 0 or self.restarts >= self.max_restarts:
+                self.state = 'exited' if self.returncode == 0 else 'failed'
+                return
+            self.state = 'backoff'
+            if self._stopping.wait(delay):
+                break
+            delay = min(delay * 2, self.max_backoff)
+            self.restarts += 1
+        self.state = 'stopped'
+
+    @staticmethod
+    def _terminate(process, timeout):
+        """
+        Terminate a child's process group, escalating to SIGKILL after a timeout.
+        """
+        if process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+        except ProcessLookupError:
+            pass
+
+    def stop(self, timeout=5.0):
+        """
+        Stop the child and the supervision loop.
+        """
+        self._stopping.set()
+        with self._lock:
+            process = self._process
+        if process is not None:
+            self._terminate(process, timeout)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.state = 'stopped'
+
+    def run_output(self):
+        """
+        Return the kept output lines printed since the child was last (re)started.
+        """
+        with self._lock:
+            count = self.lines - self._run_start_line
+        output = list(self.output)
+        return output[len(output) - min(count, len(output)):]
+
+    def status(self):
+        """
+        Return a JSON-serialisable snapshot of the process state.
+        """
+        return {
+            'key': self.key,
+            'state': self.state,
+            'pid': self.pid,
+            'restarts': self.restarts,
+            'returncode': self.returncode,
+            'started_at': self.started_at,
+            'output': list(self.output),
+        }
+
+
+class ProcessSupervisor:
+    """
+    Runs at most one process per key and at most ``max_children`` overall.
+    """
+
+    def __init__(self, max_children=DEFAULT_MAX_CHILDREN, **process_options):
+        self.max_children = max_children
+        self.process_options = process_options
+        self._lock = threading.Lock()
+        self._processes = {}
+
+    def start(self, key, command):
+        """
+        Start a command under a key, or return the instance already active for it.
+
+        Returns ``(process, started)`` where ``started`` is False if an active
+        instance was reused.
+        """
+        with self._lock:
+            current = self._processes.get(key)
+            if current is not None and current.is_active():
+                return current, False
+            active = sum(1 for process in self._processes.values() if process.is_active())
+            if active >= self.max_children:
+                raise SupervisorFullError(f"{active} supervised processes already running")
+            process = ManagedProcess(key, command, **self.process_options)
+            self._processes[key] = process
+        process.start()
+        return process, True
+
+    def stop(self, key, timeout=5.0):
+        """
+        Stop the process for a key; returns False if there was none.
+        """
+        with self._lock:
+            process = self._processes.get(key)
+        if process is None:
+            return False
+        process.stop(timeout)
+        return True
+
+    def status(self, key=None):
+        """
+        Return the status of one key, or of every supervised process.
+        """
+        with self._lock:
+            if key is not None:
+                process = self._processes.get(key)
+                return process.status() if process is not None else None
+            processes = list(self._processes.values())
+        return {str(process.key): process.status() for process in processes}
+
+    def shutdown(self, timeout=5.0):
+        """
+        Stop every supervised process.
+        """
+        with self._lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            process.stop(timeout)
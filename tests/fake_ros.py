@@ -0,0 +1,116 @@
+"""
+Minimal stand-ins for rclpy, geometry_msgs and std_msgs so the app and the ROS
+bridge can be imported and exercised without a ROS installation.
+"""
+
+import sys
+import threading
+import types
+from unittest import mock
+
+class FakeNode:
+    """Records subscriptions instead of talking to a ROS graph."""
+    instances = []
+
+    def __init__(self, name):
+        self.name = name
+        self.subscriptions = []
+        FakeNode.instances.append(self)
+
+    def create_subscription(self, msg_type, topic, callback, qos, callback_group=None):
+        """Record a subscription and return a handle."""
+        self.subscriptions.append((msg_type, topic, callback, qos, callback_group))
+        return mock.Mock()
+
+    def callbacks(self, topic):
+        """Return every callback subscribed to a topic."""
+        return [sub[2] for sub in self.subscriptions if sub[1] == topic]
+
+    def destroy_node(self):
+        """Nothing to release."""
+
+class FakeExecutor:
+    """Blocks in spin() until shutdown() is called, like a real executor."""
+
+    def __init__(self, num_threads=None):
+        self.num_threads = num_threads
+        self.nodes = []
+        self._stop = threading.Event()
+
+    def add_node(self, node):
+        """Attach a node."""
+        self.nodes.append(node)
+
+    def spin(self):
+        """Wait until shut down."""
+        self._stop.wait()
+
+    def shutdown(self):
+        """Release spin()."""
+        self._stop.set()
+
+class FakeCallbackGroup:
+    """Placeholder callback group."""
+
+class _Msg:
+    """Attribute bag used for message construction."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+def pose_stamped(x, y):
+    """Build a PoseStamped-shaped message."""
+    return _Msg(pose=_Msg(position=_Msg(x=x, y=y, z=0.0)))
+
+def bool_msg(data):
+    """Build a Bool-shaped message."""
+    return _Msg(data=data)
+
+def int32_array(data):
+    """Build an Int32MultiArray-shaped message."""
+    return _Msg(data=list(data))
+
+def install():
+    """Register the fake modules in sys.modules and return the fake rclpy.
+
+    Installing again returns the fakes already registered, so every test
+    module sees the rclpy that app.py was imported with.
+    """
+    installed = sys.modules.get('rclpy')
+    if getattr(installed, 'FAKE', False):
+        return installed
+    state = {'ok': False}
+    rclpy = types.ModuleType('rclpy')
+    rclpy.FAKE = True
+    rclpy.ok = mock.Mock(side_effect=lambda: state['ok'])
+    rclpy.init = mock.Mock(side_effect=lambda: state.update(ok=True))
+    rclpy.shutdown = mock.Mock(side_effect=lambda: state.update(ok=False))
+    rclpy.spin = mock.Mock()
+    node = types.ModuleType('rclpy.node')
+    node.Node = FakeNode
+    executors = types.ModuleType('rclpy.executors')
+    executors.MultiThreadedExecutor = FakeExecutor
+    callback_groups = types.ModuleType('rclpy.callback_groups')
+    callback_groups.MutuallyExclusiveCallbackGroup = FakeCallbackGroup
+    callback_groups.ReentrantCallbackGroup = FakeCallbackGroup
+    rclpy.node = node
+    rclpy.executors = executors
+    rclpy.callback_groups = callback_groups
+    geometry_msgs = types.ModuleType('geometry_msgs')
+    geometry_msgs.msg = types.ModuleType('geometry_msgs.msg')
+    geometry_msgs.msg.PoseStamped = type('PoseStamped', (_Msg,), {})
+    std_msgs = types.ModuleType('std_msgs')
+    std_msgs.msg = types.ModuleType('std_msgs.msg')
+    std_msgs.msg.Bool = type('Bool', (_Msg,), {})
+    std_msgs.msg.Int32MultiArray = type('Int32MultiArray', (_Msg,), {})
+    sys.modules.update({
+        'rclpy': rclpy,
+        'rclpy.node': node,
+        'rclpy.executors': executors,
+        'rclpy.callback_groups': callback_groups,
+        'geometry_msgs': geometry_msgs,
+        'geometry_msgs.msg': geometry_msgs.msg,
+        'std_msgs': std_msgs,
+        'std_msgs.msg': std_msgs.msg,
+    })
+    return rclpy
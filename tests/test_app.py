@@ -6,6 +6,7 @@ import unittest
 import tempfile
 import os
 import logging
+import auth
 from app import app, get_db_connection
 
 class FlaskTestCase(unittest.TestCase):
@@ -110,6 +111,35 @@ class FlaskTestCase(unittest.TestCase):
         self.assertTrue(b'Destination Status' in rv.data or b'destination status' in rv.data.lower())
         logging.info("Service page test passed")
 
+    def test_login_with_shared_name(self):
+        """TC_FLASK_014: Legacy rows sharing a name each log in, and the name cannot be registered again."""
+        with get_db_connection() as con:
+            con.execute('DROP TABLE customer')
+            con.execute('''CREATE TABLE customer(sno INTEGER PRIMARY KEY, name TEXT,
+                           password TEXT, mobile_number INTEGER, vehicle_id INTEGER)''')
+            con.executemany("INSERT INTO customer(name, password, mobile_number, vehicle_id) "
+                            "VALUES ('shared', ?, 1, ?)",
+                            [('pbkdf2_sha256$junk', 7), (auth.hash_password('first'), 1),
+                             (auth.hash_password('second'), 2)])
+        for password, vehicle_id in (('first', 1), ('second', 2)):
+            with self.app as client:
+                rv = client.post('/login', data=dict(name='shared', password=password))
+                self.assertTrue(rv.headers['Location'].endswith('/home'))
+                with client.session_transaction() as sess:
+                    self.assertEqual(sess['vehicle_id'], vehicle_id)
+                client.get('/logout')
+        rv = self.app.post('/login', data=dict(name='shared', password='third'),
+                           follow_redirects=True)
+        self.assertIn(b'Username and Password Mismatch', rv.data)
+        rv = self.app.post('/register', data=dict(name='shared', password='third',
+                                                  contact='1234567890', vehicle_id='3'),
+                           follow_redirects=True)
+        self.assertIn(b'UNIQUE constraint failed', rv.data)
+        with get_db_connection() as con:
+            count = con.execute("SELECT COUNT(*) FROM customer WHERE name='shared'").fetchone()[0]
+        self.assertEqual(count, 3)
+        logging.info("Shared name login test passed")
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     unittest.main()
@@ -0,0 +1,131 @@
+"""
+This module contains tests for the static asset build and its Flask integration.
+"""
+
+import unittest
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import logging
+from flask import Flask, render_template_string
+import assets
+
+class AssetPipelineTestCase(unittest.TestCase):
+    """Test case for hashed, precompressed and immutable static assets"""
+
+    def setUp(self):
+        """TC_ASSETS_001: Create a static folder with a stylesheet pointing at an image."""
+        self.root = tempfile.mkdtemp()
+        self.static = os.path.join(self.root, 'static')
+        os.makedirs(os.path.join(self.static, 'css'))
+        os.makedirs(os.path.join(self.static, 'images'))
+        with open(os.path.join(self.static, 'images', 'map.jpg'), 'wb') as handle:
+            handle.write(b'\xff\xd8 not really a jpeg')
+        with open(os.path.join(self.static, 'css', 'site.css'), 'w', encoding='utf-8') as handle:
+            handle.write("/* layout */\nbody {\n    margin: 0;\n    color: #333;\n}\n"
+                         ".map {\n    background-image: url('/static/images/map.jpg');\n}\n"
+                         ".missing { background: url('/static/images/none.png'); }\n" * 20)
+        self.app = Flask(__name__, static_folder=self.static)
+        self.assets = assets.Assets(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """TC_ASSETS_002: Remove the temporary static folder."""
+        shutil.rmtree(self.root)
+
+    def test_build_writes_hashed_files_and_manifest(self):
+        """TC_ASSETS_003: Files are renamed by content hash and listed in the manifest."""
+        manifest = assets.build(self.static)
+        css = manifest['css/site.css']['file']
+        self.assertRegex(css, r'^css/site\.[0-9a-f]{12}\.css$')
+        self.assertRegex(manifest['images/map.jpg']['file'], r'^images/map\.[0-9a-f]{12}\.jpg$')
+        dist = os.path.join(self.static, 'dist')
+        with open(os.path.join(dist, 'manifest.json'), encoding='utf-8') as handle:
+            self.assertEqual(json.load(handle), manifest)
+        self.assertEqual(assets.build(self.static)['css/site.css']['file'], css)
+        self.assertNotIn('dist/manifest.json', assets.build(self.static))
+        logging.info("Build test passed")
+
+    def test_css_is_minified_and_rewritten(self):
+        """TC_ASSETS_004: Stylesheets lose comments and whitespace and point at hashed images."""
+        manifest = assets.build(self.static)
+        with open(os.path.join(self.static, 'dist', manifest['css/site.css']['file']),
+                  encoding='utf-8') as handle:
+            css = handle.read()
+        image = manifest['images/map.jpg']['file']
+        self.assertIn(f"url('/assets/{image}')", css)
+        self.assertIn("url('/static/images/none.png')", css)
+        self.assertNotIn('/* layout */', css)
+        self.assertTrue(css.startswith('body{margin:0;color:#333}'))
+        logging.info("CSS rewrite test passed")
+
+    def test_precompressed_and_immutable(self):
+        """TC_ASSETS_005: Gzip is served when accepted, with far-future immutable caching."""
+        manifest = assets.build(self.static)
+        self.assertIn('gzip', manifest['css/site.css']['encodings'])
+        url = '/assets/' + manifest['css/site.css']['file']
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], assets.CACHE_CONTROL)
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertTrue(response.mimetype.startswith('text/css'))
+        body = gzip.decompress(response.data)
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.data, body)
+        logging.info("Precompressed serving test passed")
+
+    def test_template_helpers(self):
+        """TC_ASSETS_006: Templates get hashed URLs once built and plain static URLs before."""
+        template = "{{ asset_url('css/site.css') }}|{{ asset_url('vendor/socket.io.min.js') }}"
+        with self.app.test_request_context():
+            before = render_template_string(template).split('|')
+            self.assertEqual(before[0], '/static/css/site.css')
+            self.assertEqual(before[1], assets.VENDOR_FILES['vendor/socket.io.min.js'])
+            manifest = assets.build(self.static)
+            after = render_template_string(template).split('|')
+            self.assertEqual(after[0], '/assets/' + manifest['css/site.css']['file'])
+            picture = render_template_string("{{ asset_picture('images/map.jpg', alt='Map') }}")
+            self.assertIn('alt="Map"', picture)
+        logging.info("Template helper test passed")
+
+    @unittest.skipUnless(assets.Image is not None, "Pillow not installed")
+    def test_image_variants(self):
+        """TC_ASSETS_007: PNG images get WebP and narrower variants."""
+        image = assets.Image.new('RGBA', (1200, 600), (255, 0, 0, 128))
+        image.save(os.path.join(self.static, 'images', 'car.png'))
+        manifest = assets.build(self.static, widths=(480,))
+        variants = manifest['images/car.png']['variants']
+        self.assertEqual(sorted(variants), ['1200', '480'])
+        self.assertIn('webp', variants['1200'])
+        self.assertIn('png', variants['480'])
+        with self.app.test_request_context():
+            picture = render_template_string("{{ asset_picture('images/car.png') }}")
+        self.assertIn('type="image/webp"', picture)
+        self.assertIn('480w', picture)
+        logging.info("Image variant test passed")
+
+    def test_vendor_missing_only(self):
+        """TC_ASSETS_008: Vendoring for a build fetches only the files not already present."""
+        upstream = os.path.join(self.root, 'upstream')
+        os.makedirs(upstream)
+        files = {}
+        for name in ('a.js', 'b.js'):
+            with open(os.path.join(upstream, name), 'w', encoding='utf-8') as handle:
+                handle.write(f'// upstream {name}\n')
+            files[f'vendor/{name}'] = 'file://' + os.path.join(upstream, name)
+        os.makedirs(os.path.join(self.static, 'vendor'))
+        with open(os.path.join(self.static, 'vendor', 'a.js'), 'w', encoding='utf-8') as handle:
+            handle.write('// local a.js\n')
+        assets.vendor(self.static, files, missing_only=True)
+        for name, expected in (('a.js', '// local a.js\n'), ('b.js', '// upstream b.js\n')):
+            with open(os.path.join(self.static, 'vendor', name), encoding='utf-8') as handle:
+                self.assertEqual(handle.read(), expected)
+        logging.info("Vendor missing files test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+This module contains unit tests for customer password hashing and migration.
+"""
+
+import unittest
+import tempfile
+import os
+import logging
+import auth
+import db
+
+class PasswordHashTestCase(unittest.TestCase):
+    """Test case for salted password hashing"""
+
+    def test_hash_and_verify(self):
+        """TC_AUTH_001: A hashed password verifies and a wrong one does not."""
+        stored = auth.hash_password('secret', iterations=1000)
+        self.assertTrue(auth.is_hashed(stored))
+        self.assertEqual(auth.verify_password(stored, 'secret', 1000), (True, False))
+        self.assertEqual(auth.verify_password(stored, 'wrong', 1000), (False, False))
+        logging.info("Hash and verify test passed")
+
+    def test_salts_differ(self):
+        """TC_AUTH_002: Hashing the same password twice gives different values."""
+        self.assertNotEqual(auth.hash_password('secret', 1000), auth.hash_password('secret', 1000))
+        logging.info("Salt test passed")
+
+    def test_legacy_plain_text_needs_rehash(self):
+        """TC_AUTH_003: Plain-text rows verify and are flagged for rehashing."""
+        self.assertEqual(auth.verify_password('secret', 'secret'), (True, True))
+        self.assertEqual(auth.verify_password('secret', 'nope'), (False, False))
+        logging.info("Legacy password test passed")
+
+    def test_iteration_change_needs_rehash(self):
+        """TC_AUTH_004: Hashes made with another cost are flagged for rehashing."""
+        stored = auth.hash_password('secret', iterations=1000)
+        self.assertEqual(auth.verify_password(stored, 'secret', 2000), (True, True))
+        logging.info("Iteration change test passed")
+
+    def test_malformed_hash_matches_nothing(self):
+        """TC_AUTH_008: A malformed stored hash fails verification instead of raising."""
+        for stored in ('pbkdf2_sha256$junk', 'pbkdf2_sha256$x$00$00', 'pbkdf2_sha256$1$zz$00'):
+            self.assertEqual(auth.verify_password(stored, 'junk'), (False, False))
+            with self.assertRaises(ValueError):
+                auth.parse_hash(stored)
+        logging.info("Malformed hash test passed")
+
+    def test_iteration_ceiling(self):
+        """TC_AUTH_010: Hashes above MAX_ITERATIONS are neither made, parsed nor checked."""
+        costly = 'pbkdf2_sha256$%d$%s$%s' % (auth.MAX_ITERATIONS + 1, '00' * 16, '00' * 32)
+        with self.assertRaises(ValueError):
+            auth.parse_hash(costly)
+        with self.assertLogs('auth', level='WARNING'):
+            self.assertEqual(auth.verify_password(costly, 'secret'), (False, False))
+        with self.assertRaises(ValueError):
+            auth.hash_password('secret', auth.MAX_ITERATIONS + 1)
+        self.assertEqual(auth.parse_hash(costly.replace(str(auth.MAX_ITERATIONS + 1),
+                                                        str(auth.MAX_ITERATIONS)))[0],
+                         auth.MAX_ITERATIONS)
+        logging.info("Iteration ceiling test passed")
+
+class PasswordMigrationTestCase(unittest.TestCase):
+    """Test case for migrating plain-text passwords in the customer table"""
+
+    def setUp(self):
+        """TC_AUTH_005: Create a database with plain-text and hashed rows."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.pool = db.ConnectionPool(self.db_path)
+        with self.pool.transaction() as con:
+            con.execute('''CREATE TABLE customer(sno INTEGER PRIMARY KEY, name TEXT,
+                           password TEXT, mobile_number INTEGER, vehicle_id INTEGER)''')
+        self.customers = db.CustomerRepository(self.pool, db.CustomerCache())
+        self.customers.insert('old', 'plain', 1, 1)
+        self.customers.insert('new', auth.hash_password('hashed', 1000), 2, 2)
+
+    def tearDown(self):
+        """TC_AUTH_006: Close the pool and remove the database files."""
+        self.pool.close()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_migrate_passwords(self):
+        """TC_AUTH_007: Only plain-text rows are rehashed and they still verify."""
+        self.customers.find_by_name('old')
+        self.assertEqual(auth.migrate_passwords(self.customers, iterations=1000), 1)
+        stored = self.customers.find_by_name('old')[1]
+        self.assertTrue(auth.is_hashed(stored))
+        self.assertTrue(auth.verify_password(stored, 'plain', 1000)[0])
+        self.assertEqual(auth.migrate_passwords(self.customers, iterations=1000), 0)
+        logging.info("Migration test passed")
+
+    def test_remove_duplicate_names(self):
+        """TC_AUTH_009: Legacy duplicate names keep only their oldest row."""
+        with self.pool.transaction() as con:
+            con.executemany(db.INSERT_CUSTOMER, [('old', 'second', 3, 3), ('old', 'third', 4, 4)])
+        self.assertEqual(len(self.customers.find_all_by_name('old')), 3)
+        self.assertEqual(self.customers.remove_duplicate_names(), 2)
+        self.assertEqual(self.customers.find_all_by_name('old'), (('old', 'plain', 1, 1),))
+        self.assertEqual(self.customers.remove_duplicate_names(), 0)
+        self.assertEqual(auth.verify_unknown('anything', 1000), (False, False))
+        logging.info("Duplicate removal test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,235 @@
+"""
+This module contains tests for the message-queue backplane: a local broker
+and two Socket.IO workers, with every client expected to see every event.
+"""
+
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+import logging
+import socketio
+from werkzeug.serving import make_server
+from backplane import LocalBroker, LocalPubSubManager, message_queue_options
+from web import create_app
+from web.services import pose_room
+
+class BackplaneTestCase(unittest.TestCase):
+    """Test case for fan-out across workers through the local broker"""
+
+    def setUp(self):
+        """TC_BACKPLANE_001: Start a broker and two Socket.IO workers attached to it."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tmpdir, 'bus.sock')
+        self.broker = LocalBroker(self.address)
+        self.broker.start()
+        self.workers = []
+        for _ in range(2):
+            server = socketio.Server(async_mode='threading',
+                                     client_manager=LocalPubSubManager(self.address))
+            http = make_server('127.0.0.1', 0, socketio.WSGIApp(server), threaded=True)
+            threading.Thread(target=http.serve_forever, daemon=True).start()
+            self.workers.append((server, http))
+
+    def tearDown(self):
+        """TC_BACKPLANE_002: Stop the workers and the broker."""
+        for _, http in self.workers:
+            http.shutdown()
+        self.broker.close()
+        os.unlink(self.address)
+        os.rmdir(self.tmpdir)
+
+    def test_every_client_receives_every_event(self):
+        """TC_BACKPLANE_003: Events from a write-only bridge reach clients on both workers."""
+        emitter = LocalPubSubManager(self.address, write_only=True)
+        events = [{'x': i / 10.0, 'y': 1.0} for i in range(20)]
+
+        async def scenario():
+            clients = []
+            received = []
+            for _, http in self.workers:
+                for _ in range(2):
+                    client = socketio.AsyncClient(reconnection=False)
+                    log = []
+                    client.on('pose_update', log.append)
+                    await client.connect(f'http://127.0.0.1:{http.server_port}',
+                                         transports=['websocket'])
+                    clients.append(client)
+                    received.append(log)
+            # Wait for both workers' subscriptions to reach the broker
+            await asyncio.sleep(0.5)
+            for event in events:
+                emitter.emit('pose_update', event)
+            for _ in range(100):
+                if all(len(log) == len(events) for log in received):
+                    break
+                await asyncio.sleep(0.05)
+            for client in clients:
+                await client.disconnect()
+            return received
+
+        received = asyncio.run(scenario())
+        self.assertEqual(len(received), 4)
+        for log in received:
+            self.assertEqual(log, events)
+        logging.info("Backplane fan-out test passed")
+
+    def test_rooms_are_respected_across_workers(self):
+        """TC_BACKPLANE_004: A room emit reaches only that room's members on any worker."""
+        emitter = LocalPubSubManager(self.address, write_only=True)
+        for server, _ in self.workers:
+            server.on('connect', lambda sid, environ, auth, server=server: server.enter_room(
+                sid, 'vehicle_1' if 'vehicle=1' in environ.get('QUERY_STRING', '') else 'other'))
+
+        async def scenario():
+            logs = {}
+            clients = []
+            for index, (_, http) in enumerate(self.workers):
+                client = socketio.AsyncClient(reconnection=False)
+                log = []
+                client.on('destination_reached', log.append)
+                query = 'vehicle=1' if index == 0 else 'vehicle=2'
+                await client.connect(f'http://127.0.0.1:{http.server_port}?{query}',
+                                     transports=['websocket'])
+                clients.append(client)
+                logs[query] = log
+            await asyncio.sleep(0.5)
+            emitter.emit('destination_reached', {'reached': True}, room='vehicle_1')
+            await asyncio.sleep(0.5)
+            for client in clients:
+                await client.disconnect()
+            return logs
+
+        logs = asyncio.run(scenario())
+        self.assertEqual(logs['vehicle=1'], [{'reached': True}])
+        self.assertEqual(logs['vehicle=2'], [])
+        logging.info("Backplane room test passed")
+
+    def test_message_queue_options(self):
+        """TC_BACKPLANE_005: local:// URLs select the built-in manager, others go to Flask-SocketIO."""
+        options = message_queue_options('local:///tmp/bus.sock', write_only=True)
+        self.assertIsInstance(options['client_manager'], LocalPubSubManager)
+        self.assertEqual(options['client_manager'].address, '/tmp/bus.sock')
+        self.assertEqual(message_queue_options('redis://localhost:6379/0'),
+                         {'message_queue': 'redis://localhost:6379/0'})
+        logging.info("Message queue options test passed")
+
+class AppWorkerTestCase(unittest.TestCase):
+    """Test case for the real app running as a --message-queue worker"""
+
+    def setUp(self):
+        """TC_BACKPLANE_006: Start a broker and one app worker built by create_app."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tmpdir, 'bus.sock')
+        self.broker = LocalBroker(self.address)
+        self.broker.start()
+        self.app = create_app({'TESTING': True, 'SOCKETIO_ASYNC_MODE': 'threading',
+                               'SOCKETIO_MESSAGE_QUEUE': 'local://' + self.address})
+        self.services = self.app.extensions['parkonomous']
+        self.services.fanout.start()
+        self.http = make_server('127.0.0.1', 0, self.app, threaded=True)
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.http.server_port}'
+        self.emitter = LocalPubSubManager(self.address, write_only=True)
+
+    def tearDown(self):
+        """TC_BACKPLANE_007: Stop the worker and the broker."""
+        self.http.shutdown()
+        self.services.fanout.stop(timeout=1)
+        self.broker.close()
+        os.unlink(self.address)
+        os.rmdir(self.tmpdir)
+
+    def test_worker_keeps_handlers_and_relays_poses(self):
+        """TC_BACKPLANE_008: A worker client joins the pose rooms and receives bridge poses."""
+        server = self.services.socketio.server
+        self.assertIsInstance(server.manager, LocalPubSubManager)
+        self.assertIn('connect', server.handlers['/'])
+        poses = [{'x': i / 10.0, 'y': 2.0} for i in range(5)]
+
+        async def scenario():
+            client = socketio.AsyncClient(reconnection=False)
+            log = []
+            client.on('pose_update', log.append)
+            await client.connect(self.url, transports=['websocket'])
+            await asyncio.sleep(0.5)
+            for pose in poses:
+                self.emitter.emit('pose_update', pose, room=pose_room(None, 'json'))
+            for _ in range(100):
+                if len(log) == len(poses):
+                    break
+                await asyncio.sleep(0.05)
+            await client.disconnect()
+            return log
+
+        self.assertEqual(asyncio.run(scenario()), poses)
+        logging.info("App worker relay test passed")
+
+    def test_paced_client_on_worker(self):
+        """TC_BACKPLANE_009: Paced and newly connected worker clients get relayed poses."""
+        pose = {'x': 4.0, 'y': 5.0}
+
+        async def scenario():
+            paced = socketio.AsyncClient(reconnection=False)
+            paced_log = []
+            paced.on('pose_update', paced_log.append)
+            await paced.connect(self.url + '?max_rate=2', transports=['websocket'])
+            await asyncio.sleep(0.5)
+            self.emitter.emit('pose_update', pose, room=pose_room(None, 'json'))
+            self.emitter.emit('eta_update', {'eta': 12.0}, room=None)
+            for _ in range(100):
+                if paced_log:
+                    break
+                await asyncio.sleep(0.05)
+            late = socketio.AsyncClient(reconnection=False)
+            snapshots = []
+            late.on('state_snapshot', snapshots.append)
+            await late.connect(self.url, transports=['websocket'])
+            for _ in range(40):
+                if snapshots:
+                    break
+                await asyncio.sleep(0.05)
+            await paced.disconnect()
+            await late.disconnect()
+            return paced_log, snapshots
+
+        paced_log, snapshots = asyncio.run(scenario())
+        self.assertEqual(paced_log, [pose])
+        self.assertEqual(snapshots, [{'pose_update': pose, 'eta_update': {'eta': 12.0}}])
+        self.assertGreaterEqual(self.services.backpressure.stats()['paced_sends'], 1)
+        logging.info("App worker paced client test passed")
+
+    def test_relayed_parking_status(self):
+        """TC_BACKPLANE_010: Relayed parking_status changes reach the worker's occupancy map."""
+        async def scenario():
+            # Wait for the worker's subscription to reach the broker
+            await asyncio.sleep(0.5)
+            self.emitter.emit('parking_status', {'parking_spots_status': {3: False, 7: True},
+                                                 'snapshot': False})
+            for _ in range(100):
+                if self.services.occupancy.occupied_count():
+                    break
+                await asyncio.sleep(0.05)
+            client = socketio.AsyncClient(reconnection=False)
+            snapshots = []
+            client.on('parking_status', snapshots.append)
+            await client.connect(self.url, transports=['websocket'])
+            for _ in range(40):
+                if snapshots:
+                    break
+                await asyncio.sleep(0.05)
+            await client.disconnect()
+            return snapshots
+
+        snapshots = asyncio.run(scenario())
+        self.assertTrue(snapshots[0]['snapshot'])
+        self.assertFalse(snapshots[0]['parking_spots_status']['3'])
+        self.assertTrue(snapshots[0]['parking_spots_status']['7'])
+        stats = self.app.test_client().get('/occupancy_stats').get_json()
+        self.assertEqual(stats['occupied'], 1)
+        logging.info("Relayed parking status test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+This module contains tests for per-client backpressure: throttling and
+disconnecting slow Socket.IO clients and client-requested update rates.
+"""
+
+import unittest
+import json
+import time
+import logging
+from backpressure import Backpressure, MIN_RATE_HZ
+from web import create_app
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class BackpressureTestCase(unittest.TestCase):
+    """Test case for the backpressure decisions with fake queues"""
+
+    def setUp(self):
+        """TC_BACKPRESSURE_001: Watch fake clients whose queue sizes are set by the test."""
+        self.sizes = {}
+        self.paced = []
+        self.sent = []
+        self.dropped = []
+        self.clock = FakeClock()
+        self.backpressure = Backpressure(
+            self.sizes.get, lambda client: self.paced.append((client.sid, client.paced)),
+            lambda client: self.sent.append(client.sid), self.dropped.append,
+            full_rate_hz=10, high_water=10, low_water=2, slow_rate_hz=1, stall_seconds=5,
+            clock=self.clock)
+
+    def tick(self, seconds=0.1):
+        """Advance the clock and run one check."""
+        self.clock.now += seconds
+        self.backpressure.check()
+
+    def test_full_rate_clients_use_shared_rooms(self):
+        """TC_BACKPRESSURE_002: A client below high water stays in the shared rooms and gets no paced sends."""
+        self.sizes['a'] = 0
+        client = self.backpressure.add('a', [None])
+        for _ in range(20):
+            self.tick()
+        self.assertFalse(client.paced)
+        self.assertEqual(self.paced, [('a', False)])
+        self.assertEqual(self.sent, [])
+        logging.info("Full rate client test passed")
+
+    def test_throttle_and_restore(self):
+        """TC_BACKPRESSURE_003: A client past high water is paced until it drains to low water."""
+        self.sizes['a'] = 0
+        client = self.backpressure.add('a', [None])
+        self.sizes['a'] = 11
+        self.tick()
+        self.assertTrue(client.throttled)
+        self.assertEqual(client.rate, 1)
+        self.assertEqual(self.paced[-1], ('a', True))
+        self.assertEqual(self.sent, [])  # Nothing more while it is over high water
+        self.sizes['a'] = 5
+        for _ in range(10):
+            self.tick()
+        self.assertTrue(client.throttled)  # Still above low water
+        self.assertEqual(len(self.sent), 1)  # Paced at 1 Hz
+        self.sizes['a'] = 2
+        self.tick()
+        self.assertFalse(client.throttled)
+        self.assertEqual(self.paced[-1], ('a', False))
+        self.assertEqual(self.backpressure.stats()['restored'], 1)
+        logging.info("Throttle and restore test passed")
+
+    def test_stuck_client_disconnected(self):
+        """TC_BACKPRESSURE_004: A client over high water for stall_seconds is disconnected once."""
+        self.sizes['a'] = 50
+        self.backpressure.add('a', [None])
+        self.tick()
+        self.tick(4.8)
+        self.assertEqual(self.dropped, [])
+        self.tick(0.3)
+        self.tick(1.0)
+        self.assertEqual(self.dropped, ['a'])
+        self.assertEqual(self.backpressure.stats()['clients'], 0)
+        logging.info("Stuck client test passed")
+
+    def test_recovery_resets_stall(self):
+        """TC_BACKPRESSURE_005: Dipping under high water restarts the stall timer."""
+        self.sizes['a'] = 50
+        self.backpressure.add('a', [None])
+        self.tick()
+        self.tick(4.0)
+        self.sizes['a'] = 10
+        self.tick()
+        self.sizes['a'] = 50
+        self.tick()
+        self.tick(4.0)
+        self.assertEqual(self.dropped, [])
+        logging.info("Stall reset test passed")
+
+    def test_requested_rate(self):
+        """TC_BACKPRESSURE_006: A client asking for a lower rate is paced at it from the start."""
+        self.sizes['a'] = 0
+        client = self.backpressure.add('a', [None], max_rate=2)
+        self.assertTrue(client.paced)
+        self.assertEqual(self.paced, [('a', True)])
+        for _ in range(10):
+            self.tick()
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.backpressure.add('b', [None], max_rate=100).rate, 10)
+        self.assertEqual(self.backpressure.add('c', [None], max_rate=0).rate, MIN_RATE_HZ)
+        logging.info("Requested rate test passed")
+
+    def test_gone_socket_skipped(self):
+        """TC_BACKPRESSURE_007: Clients whose socket is already gone are left alone."""
+        self.backpressure.add('gone', [None], max_rate=1)
+        self.tick(10)
+        self.assertEqual((self.sent, self.dropped), ([], []))
+        self.assertIsNone(self.backpressure.remove('missing'))
+        logging.info("Gone socket test passed")
+
+class StalledClientTestCase(unittest.TestCase):
+    """Test case for stalled Engine.IO polling clients on a real app"""
+
+    def setUp(self):
+        """TC_BACKPRESSURE_008: Create an app with a small high-water mark and a short stall."""
+        self.app = create_app({'TESTING': True, 'SOCKETIO_ASYNC_MODE': 'threading',
+                               'SEND_QUEUE_HIGH_WATER': 20, 'SEND_QUEUE_LOW_WATER': 2,
+                               'SLOW_CLIENT_HZ': 2, 'SLOW_CLIENT_STALL_SECONDS': 0.5})
+        self.services = self.app.extensions['parkonomous']
+        self.http = self.app.test_client()
+
+    def connect(self, query=''):
+        """Open a polling Engine.IO session and its Socket.IO connection; returns the session url."""
+        expected = self.services.backpressure.stats()['clients'] + 1
+        handshake = self.http.get('/socket.io/?EIO=4&transport=polling' + query)
+        sid = json.loads(handshake.data[1:])['sid']  # Engine.IO open packet: 0{...}
+        url = f'/socket.io/?EIO=4&transport=polling&sid={sid}'
+        self.http.post(url, data='40')
+        deadline = time.monotonic() + 2
+        while self.services.backpressure.stats()['clients'] < expected:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        return url, sid
+
+    def queue_size(self, eio_sid):
+        """Packets waiting for a session, or None once it is closed."""
+        socket = self.services.socketio.server.eio.sockets.get(eio_sid)
+        return None if socket is None else socket.queue.qsize()
+
+    def publish(self, index):
+        """Feed one pose the way the ROS node does and run a fan-out tick."""
+        payload = {'x': float(index), 'y': 0.0}
+        self.services.last_values.remember(None, 'pose_update', payload)
+        self.services.fanout.submit('pose_update', payload)
+        self.services.fanout.flush()
+
+    def test_stalled_clients_bounded(self):
+        """TC_BACKPRESSURE_009: Stalled clients queue at most high water, then are dropped; a healthy one keeps full rate."""
+        healthy_url, healthy = self.connect()
+        stalled = [self.connect()[1] for _ in range(3)]
+        paced_url, paced = self.connect('&max_rate=2')
+        peak = 0
+        received = 0
+        paced_received = 0
+        start = time.monotonic()
+        index = 0
+        while time.monotonic() - start < 1.0:
+            index += 1
+            self.publish(index)
+            peak = max([peak] + [self.queue_size(sid) or 0 for sid in stalled])
+            if self.queue_size(healthy):
+                received += self.http.get(healthy_url).data.count(b'pose_update')
+            if self.queue_size(paced):
+                paced_received += self.http.get(paced_url).data.count(b'pose_update')
+            time.sleep(0.005)
+
+        self.assertLessEqual(peak, 21)
+        self.assertEqual([self.queue_size(sid) for sid in stalled], [None] * 3)
+        stats = self.services.backpressure.stats()
+        self.assertEqual(stats['disconnected'], 3)
+        self.assertEqual(stats['clients'], 2)
+        self.assertEqual(stats['throttled'], 3)
+        self.assertGreater(received, index * 0.9)
+        self.assertLessEqual(paced_received, 4)
+        self.assertGreaterEqual(paced_received, 1)
+        logging.info("Stalled client test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
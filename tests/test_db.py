@@ -0,0 +1,171 @@
+"""
+This module contains unit and stress tests for the pooled SQLite access layer.
+"""
+
+import unittest
+import tempfile
+import threading
+import time
+import os
+import logging
+import db
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    """Test case for the SQLite connection pool and customer repository"""
+
+    def setUp(self):
+        """TC_DB_001: Create a temporary database with the customer table."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.pool = db.ConnectionPool(self.db_path, size=4)
+        with self.pool.transaction() as con:
+            con.execute('''CREATE TABLE IF NOT EXISTS customer (
+                            name TEXT PRIMARY KEY,
+                            password TEXT NOT NULL,
+                            mobile_number INTEGER NOT NULL,
+                            vehicle_id INTEGER NOT NULL)''')
+        self.customers = db.CustomerRepository(self.pool)
+
+    def tearDown(self):
+        """TC_DB_002: Close the pool and remove the database files."""
+        self.pool.close()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_pragmas(self):
+        """TC_DB_003: Pooled connections use WAL, NORMAL sync and a busy timeout."""
+        with self.pool.connection() as con:
+            self.assertEqual(con.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(con.execute("PRAGMA synchronous").fetchone()[0], 1)
+            self.assertEqual(con.execute("PRAGMA busy_timeout").fetchone()[0],
+                             db.DEFAULT_BUSY_TIMEOUT_MS)
+        logging.info("Pragma test passed")
+
+    def test_insert_and_find(self):
+        """TC_DB_004: A registered customer can be found by credentials."""
+        self.customers.insert('alice', 'secret', 1234567890, 7)
+        self.assertEqual(self.customers.find_by_name('alice'), ('alice', 'secret', 7, 1))
+        self.assertIsNone(self.customers.find_by_name('bob'))
+        logging.info("Insert and find test passed")
+
+    def test_duplicate_name_refused(self):
+        """TC_DB_013: A taken name is refused by insert and insert_many."""
+        self.customers.insert('alice', 'secret', 1, 7)
+        with self.assertRaises(db.DuplicateCustomerError):
+            self.customers.insert('alice', 'other', 2, 8)
+        failed = self.customers.insert_many([('bob', 'pw', 3, 3), ('bob', 'pw', 4, 4)])
+        self.assertEqual(failed, [(1, 'UNIQUE constraint failed: customer.name')])
+        self.assertEqual(self.customers.find_by_name('alice'), ('alice', 'secret', 7, 1))
+        self.assertEqual(self.customers.find_by_name('bob')[2], 3)
+        logging.info("Duplicate name test passed")
+
+    def test_nested_checkout_reuses_connection(self):
+        """TC_DB_005: Nested checkouts on one thread share a single connection."""
+        with self.pool.connection() as outer:
+            with self.pool.connection() as inner:
+                self.assertIs(outer, inner)
+        logging.info("Nested checkout test passed")
+
+    def test_pool_is_bounded(self):
+        """TC_DB_006: Checkout fails with PoolExhaustedError once every slot is taken."""
+        pool = db.ConnectionPool(self.db_path, size=1, checkout_timeout=0.05)
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with pool.connection():
+                held.set()
+                release.wait(1)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait(1)
+        with self.assertRaises(db.PoolExhaustedError):
+            with pool.connection():
+                pass
+        release.set()
+        thread.join()
+        pool.close()
+        logging.info("Pool bound test passed")
+
+    def test_concurrent_register_and_login(self):
+        """TC_DB_007: Concurrent registrations and logins complete without lock errors."""
+        errors = []
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(index):
+            for i in range(25):
+                name = f'user{index}_{i}'
+                start = time.perf_counter()
+                try:
+                    self.customers.insert(name, 'pw', 5550000 + i, index)
+                    found = self.customers.find_by_name(name)
+                    if found is None:
+                        raise AssertionError(f'{name} not found after insert')
+                except Exception as exc:  # pylint: disable=broad-except
+                    with lock:
+                        errors.append(exc)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        logging.info("Concurrent register/login p99 %.2f ms, %d errors", p99 * 1000, len(errors))
+        self.assertEqual(errors, [])
+        with self.pool.connection() as con:
+            self.assertEqual(con.execute("SELECT COUNT(*) FROM customer").fetchone()[0], 400)
+
+    def test_indexes_created(self):
+        """TC_DB_008: ensure_indexes adds the name and vehicle_id indexes."""
+        self.customers.ensure_indexes()
+        with self.pool.connection() as con:
+            names = {row[0] for row in con.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='customer'")}
+        self.assertTrue({'idx_customer_name', 'idx_customer_vehicle_id'} <= names)
+        logging.info("Index test passed")
+
+class CustomerCacheTestCase(unittest.TestCase):
+    """Test case for the LRU/TTL customer record cache"""
+
+    def setUp(self):
+        """TC_DB_009: Create a small cache driven by a fake clock."""
+        self.now = [0.0]
+        self.cache = db.CustomerCache(size=2, ttl=10, clock=lambda: self.now[0])
+
+    def test_lru_eviction(self):
+        """TC_DB_010: The least recently used record is evicted when full."""
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+        self.cache.put('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        logging.info("LRU eviction test passed")
+
+    def test_ttl_expiry(self):
+        """TC_DB_011: Records expire after the TTL."""
+        self.cache.put('a', 1)
+        self.now[0] = 11
+        self.assertIsNone(self.cache.get('a'))
+        logging.info("TTL expiry test passed")
+
+    def test_invalidate(self):
+        """TC_DB_012: Invalidating a name removes only that record."""
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 2)
+        logging.info("Invalidate test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
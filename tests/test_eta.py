@@ -0,0 +1,80 @@
+"""
+This module contains unit tests for the streaming distance and ETA tracker.
+"""
+
+import unittest
+import logging
+from eta import EtaTracker
+
+class EtaTrackerTestCase(unittest.TestCase):
+    """Test case for batched, change-only ETA updates"""
+
+    def setUp(self):
+        """TC_ETA_001: Create a tracker with full-weight smoothing for exact numbers."""
+        self.tracker = EtaTracker(smoothing=1.0, min_change=1.0, relative_change=0.1)
+
+    def test_first_update_has_distance_only(self):
+        """TC_ETA_002: Before the car moves, the distance is sent without an ETA."""
+        self.tracker.update_user('vehicle_1', 10.0, 0.0)
+        self.assertEqual(self.tracker.compute(), [])
+        self.tracker.update_car('vehicle_1', 0.0, 0.0, stamp=0.0)
+        self.assertEqual(self.tracker.compute(),
+                         [('vehicle_1', {'distance': 10.0, 'speed': None, 'eta': None})])
+        self.assertEqual(self.tracker.compute(), [])
+        logging.info("First update test passed")
+
+    def test_eta_from_speed(self):
+        """TC_ETA_003: The ETA is distance over speed and is re-sent only when it moves."""
+        self.tracker.update_user('vehicle_1', 20.0, 0.0)
+        self.tracker.update_car('vehicle_1', 0.0, 0.0, stamp=0.0)
+        self.tracker.compute()
+        self.tracker.update_car('vehicle_1', 2.0, 0.0, stamp=1.0)
+        self.assertEqual(self.tracker.compute(),
+                         [('vehicle_1', {'distance': 18.0, 'speed': 2.0, 'eta': 9.0})])
+        self.tracker.update_car('vehicle_1', 2.5, 0.0, stamp=1.25)
+        self.assertEqual(self.tracker.compute(), [])  # 8.75 s is within the threshold
+        self.tracker.update_car('vehicle_1', 6.0, 0.0, stamp=3.0)
+        self.assertEqual(self.tracker.compute(),
+                         [('vehicle_1', {'distance': 14.0, 'speed': 2.0, 'eta': 7.0})])
+        logging.info("ETA test passed")
+
+    def test_speed_is_smoothed(self):
+        """TC_ETA_004: The speed follows an exponential filter over car samples."""
+        tracker = EtaTracker(smoothing=0.5, min_change=0.0, relative_change=0.0)
+        tracker.update_user(None, 100.0, 0.0)
+        for stamp, xpos in ((0.0, 0.0), (1.0, 4.0), (2.0, 6.0)):
+            tracker.update_car(None, xpos, 0.0, stamp=stamp)
+            updates = tracker.compute()
+        self.assertEqual(updates[0][1]['speed'], 3.0)
+        logging.info("Smoothing test passed")
+
+    def test_stop_clears_eta(self):
+        """TC_ETA_005: A stopped car sends an update without ETA once."""
+        self.tracker.update_user('vehicle_1', 20.0, 0.0)
+        self.tracker.update_car('vehicle_1', 0.0, 0.0, stamp=0.0)
+        self.tracker.update_car('vehicle_1', 0.0, 0.0, stamp=0.0)
+        self.tracker.compute()
+        self.tracker.update_car('vehicle_1', 2.0, 0.0, stamp=1.0)
+        self.tracker.compute()
+        self.tracker.update_car('vehicle_1', 2.0, 0.0, stamp=2.0)
+        self.assertEqual(self.tracker.compute()[0][1]['eta'], None)
+        self.tracker.update_car('vehicle_1', 2.0, 0.0, stamp=3.0)
+        self.assertEqual(self.tracker.compute(), [])
+        logging.info("Stop test passed")
+
+    def test_many_streams_in_one_batch(self):
+        """TC_ETA_006: One compute call covers every stream that moved, and only those."""
+        for vehicle in range(100):
+            self.tracker.update_user(vehicle, 5.0, 5.0)
+            self.tracker.update_car(vehicle, 0.0, 0.0, stamp=0.0)
+        self.assertEqual(len(self.tracker.compute()), 100)
+        self.tracker.update_car(42, 1.0, 1.0, stamp=1.0)
+        self.assertEqual([stream for stream, _ in self.tracker.compute()], [42])
+        self.assertEqual(self.tracker.stats()['streams'], 100)
+        with self.assertRaises(ValueError):
+            EtaTracker(smoothing=0)
+        logging.info("Batch test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+This module contains unit tests for the pose fan-out stage.
+"""
+
+import unittest
+import time
+import logging
+from fanout import PoseFanout
+
+class PoseFanoutTestCase(unittest.TestCase):
+    """Test case for the coalescing pose fan-out"""
+
+    def setUp(self):
+        """TC_FANOUT_001: Create a fan-out with a recording emit function."""
+        self.emitted = []
+        self.fanout = PoseFanout(
+            lambda event, payload, to=None: self.emitted.append((event, payload, to)),
+            rate_hz=50)
+
+    def tearDown(self):
+        """TC_FANOUT_002: Stop the flush thread."""
+        self.fanout.stop(timeout=1)
+
+    def test_coalesces_latest_per_topic(self):
+        """TC_FANOUT_003: Only the latest payload per event is emitted on flush."""
+        for i in range(100):
+            self.fanout.submit('pose_update', {'x': i, 'y': 0})
+        self.fanout.submit('user_update', {'x': 1, 'y': 1})
+        self.assertEqual(self.fanout.flush(), 2)
+        self.assertEqual(self.emitted, [('pose_update', {'x': 99, 'y': 0}, None),
+                                        ('user_update', {'x': 1, 'y': 1}, None)])
+        self.assertEqual(self.fanout.stats(), {'received': 101, 'coalesced': 99, 'emitted': 2})
+        logging.info("Coalescing test passed")
+
+    def test_rooms_are_coalesced_separately(self):
+        """TC_FANOUT_007: Payloads for different rooms are kept and routed independently."""
+        self.fanout.submit('pose_update', {'x': 1, 'y': 1}, room='vehicle_1')
+        self.fanout.submit('pose_update', {'x': 2, 'y': 2}, room='vehicle_2')
+        self.fanout.submit('pose_update', {'x': 3, 'y': 3}, room='vehicle_1')
+        self.fanout.flush()
+        self.assertEqual(sorted(self.emitted, key=lambda item: item[2]),
+                         [('pose_update', {'x': 3, 'y': 3}, 'vehicle_1'),
+                          ('pose_update', {'x': 2, 'y': 2}, 'vehicle_2')])
+        logging.info("Room routing test passed")
+
+    def test_flush_empty(self):
+        """TC_FANOUT_004: Flushing with nothing pending emits nothing."""
+        self.assertEqual(self.fanout.flush(), 0)
+        self.assertEqual(self.emitted, [])
+        logging.info("Empty flush test passed")
+
+    def test_thread_rate_limits(self):
+        """TC_FANOUT_005: The flush thread emits far fewer messages than it receives."""
+        self.fanout.start()
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            self.fanout.submit('pose_update', {'x': 0, 'y': 0})
+            time.sleep(0.001)
+        self.fanout.stop(timeout=1)
+        stats = self.fanout.stats()
+        self.assertGreater(stats['emitted'], 0)
+        self.assertLess(stats['emitted'], stats['received'])
+        self.assertEqual(stats['received'], stats['coalesced'] + stats['emitted'])
+        logging.info("Rate limit test passed")
+
+    def test_invalid_rate(self):
+        """TC_FANOUT_006: A non-positive rate is rejected."""
+        with self.assertRaises(ValueError):
+            PoseFanout(lambda event, payload, to=None: None, rate_hz=0)
+        logging.info("Invalid rate test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
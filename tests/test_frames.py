@@ -0,0 +1,92 @@
+"""
+This module contains unit tests for the binary pose frame format.
+"""
+
+import unittest
+import logging
+from frames import PoseFrameEncoder, PoseFrameDecoder, FLAG_KEYFRAME
+from web import create_app
+
+class PoseFrameTestCase(unittest.TestCase):
+    """Test case for binary pose frame encoding and decoding"""
+
+    def setUp(self):
+        """TC_FRAMES_001: Create a fresh encoder and decoder pair."""
+        self.encoder = PoseFrameEncoder(keyframe_interval=5)
+        self.decoder = PoseFrameDecoder()
+
+    def test_round_trip(self):
+        """TC_FRAMES_002: Decoded poses match the encoded ones to the millimetre."""
+        for i in range(20):
+            car = (1.0 + i * 0.013, 2.5 - i * 0.021)
+            user = (4.2, 0.5 + i * 0.007)
+            poses = self.decoder.decode(self.encoder.encode(car=car, user=user))
+            self.assertAlmostEqual(poses['car'][0], car[0], places=3)
+            self.assertAlmostEqual(poses['car'][1], car[1], places=3)
+            self.assertAlmostEqual(poses['user'][1], user[1], places=3)
+        logging.info("Round trip test passed")
+
+    def test_delta_frames_are_smaller(self):
+        """TC_FRAMES_003: Frames between keyframes use 16-bit deltas."""
+        keyframe = self.encoder.encode(car=(1.0, 1.0), user=(2.0, 2.0))
+        delta = self.encoder.encode(car=(1.1, 1.0), user=(2.0, 2.1))
+        self.assertTrue(keyframe[0] & FLAG_KEYFRAME)
+        self.assertFalse(delta[0] & FLAG_KEYFRAME)
+        self.assertEqual(len(keyframe), 21)
+        self.assertEqual(len(delta), 13)
+        logging.info("Delta size test passed")
+
+    def test_large_jump_forces_keyframe(self):
+        """TC_FRAMES_004: A move too large for an int16 delta is sent as a keyframe."""
+        self.encoder.encode(car=(0.0, 0.0))
+        frame = self.encoder.encode(car=(40.0, 0.0))
+        self.assertTrue(frame[0] & FLAG_KEYFRAME)
+        logging.info("Large jump test passed")
+
+    def test_late_joiner_waits_for_keyframe(self):
+        """TC_FRAMES_005: A decoder that missed the keyframe resyncs on the next one."""
+        self.encoder.encode(car=(1.0, 1.0))
+        self.assertIsNone(self.decoder.decode(self.encoder.encode(car=(1.1, 1.0))))
+        self.encoder.force_keyframe()
+        poses = self.decoder.decode(self.encoder.encode(car=(1.2, 1.0)))
+        self.assertAlmostEqual(poses['car'][0], 1.2, places=3)
+        logging.info("Late joiner test passed")
+
+    def test_keyframe_carries_last_known_poses(self):
+        """TC_FRAMES_006: A keyframe repeats the last user pose even if only the car moved."""
+        self.decoder.decode(self.encoder.encode(car=(1.0, 1.0), user=(3.0, 3.0)))
+        self.encoder.force_keyframe()
+        poses = self.decoder.decode(self.encoder.encode(car=(1.5, 1.0)))
+        self.assertEqual(poses['user'], (3.0, 3.0))
+        logging.info("Keyframe contents test passed")
+
+    def test_interleaved_streams(self):
+        """TC_FRAMES_007: A socket in two rooms decodes both streams without losing sync."""
+        broadcast = PoseFrameEncoder(keyframe_interval=50, stream=1)
+        vehicle = PoseFrameEncoder(keyframe_interval=50, stream=2)
+        for i in range(20):
+            for encoder, base in ((broadcast, 1.0), (vehicle, 5.0)):
+                poses = self.decoder.decode(encoder.encode(car=(base + i * 0.01, 1.0)))
+                self.assertIsNotNone(poses)
+                self.assertAlmostEqual(poses['car'][0], base + i * 0.01, places=3)
+        self.assertEqual(sorted(self.decoder.streams), [1, 2])
+        logging.info("Interleaved streams test passed")
+
+    def test_room_encoders_have_distinct_streams(self):
+        """TC_FRAMES_008: The broadcast and vehicle rooms' frames carry different stream ids."""
+        services = create_app({'TESTING': True}).extensions['parkonomous']
+        frames = []
+        services.socketio_emit = lambda event, frame, to=None: frames.append((to, frame))
+        for i in range(10):
+            services.emit_pose_frames({('pose_update', None): {'x': 1.0 + i / 100, 'y': 0.0},
+                                       ('pose_update', 'vehicle_1'): {'x': 5.0, 'y': i / 100}})
+        self.assertEqual({to for to, _ in frames}, {'all:binary', 'vehicle_1:binary'})
+        decoded = [self.decoder.decode(frame) for _, frame in frames]
+        self.assertNotIn(None, decoded)
+        self.assertEqual(decoded[-2]['car'], (1.09, 0.0))
+        self.assertEqual(decoded[-1]['car'], (5.0, 0.09))
+        logging.info("Room stream id test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
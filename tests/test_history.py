@@ -0,0 +1,131 @@
+"""
+This module contains unit tests for the pose history rings, archive and downsampling.
+"""
+
+import unittest
+import os
+import tempfile
+import logging
+import db
+from history import PoseRing, PoseHistory, lttb, minmax
+
+class PoseRingTestCase(unittest.TestCase):
+    """Test case for the fixed-size pose ring"""
+
+    def test_wraps_and_keeps_latest(self):
+        """TC_HISTORY_001: A full ring overwrites its oldest poses."""
+        ring = PoseRing(4)
+        for i in range(10):
+            ring.append(float(i), i * 0.5, 1.0)
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring.oldest(), 6.0)
+        self.assertEqual(ring.window(0, 100), [(6.0, 3.0, 1.0), (7.0, 3.5, 1.0),
+                                               (8.0, 4.0, 1.0), (9.0, 4.5, 1.0)])
+        logging.info("Ring wrap test passed")
+
+    def test_window_bounds(self):
+        """TC_HISTORY_002: Windows include both ends and can be empty."""
+        ring = PoseRing(100)
+        for i in range(50):
+            ring.append(float(i), 0.0, 0.0)
+        self.assertEqual([p[0] for p in ring.window(10, 12)], [10.0, 11.0, 12.0])
+        self.assertEqual(ring.window(60, 70), [])
+        self.assertIsNone(PoseRing(3).oldest())
+        with self.assertRaises(ValueError):
+            PoseRing(0)
+        logging.info("Window test passed")
+
+class PoseHistoryTestCase(unittest.TestCase):
+    """Test case for per-stream history with a SQLite archive"""
+
+    def setUp(self):
+        """TC_HISTORY_003: Create a history archiving to a temporary database."""
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.history = PoseHistory(capacity=10, max_streams=2, database=self.path)
+
+    def tearDown(self):
+        """TC_HISTORY_004: Close the pools and remove the database."""
+        db.close_pools()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.unlink(self.path + suffix)
+
+    def test_least_recent_stream_evicted(self):
+        """TC_HISTORY_005: Memory is bounded to max_streams rings."""
+        history = PoseHistory(capacity=10, max_streams=2)
+        history.record('vehicle_1', 0, 0, stamp=1)
+        history.record('vehicle_2', 0, 0, stamp=1)
+        history.record('vehicle_1', 1, 1, stamp=2)
+        history.record('vehicle_3', 0, 0, stamp=1)
+        self.assertEqual(history.stats()['streams'], 2)
+        self.assertEqual(history.window('vehicle_2', 0, 10), [])
+        self.assertEqual(len(history.window('vehicle_1', 0, 10)), 2)
+        logging.info("Eviction test passed")
+
+    def test_flush_is_batched(self):
+        """TC_HISTORY_006: Queued poses are written in one flush."""
+        for i in range(25):
+            self.history.record('vehicle_1', i, 0, stamp=float(i))
+        self.assertEqual(self.history.flush(), 25)
+        self.assertEqual(self.history.flush(), 0)
+        with db.get_pool(self.path).connection() as con:
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM pose_history').fetchone()[0], 25)
+        self.assertEqual(self.history.stats()['flushed'], 25)
+        logging.info("Batched flush test passed")
+
+    def test_window_spans_archive_and_ring(self):
+        """TC_HISTORY_007: Poses older than the ring come from the archive without duplicates."""
+        for i in range(25):
+            self.history.record('vehicle_1', float(i), 0.0, stamp=float(i))
+        self.history.record('vehicle_2', 99.0, 0.0, stamp=5.0)
+        points = self.history.window('vehicle_1', 3, 20)
+        self.assertEqual([p[0] for p in points], [float(i) for i in range(3, 21)])
+        self.assertEqual(self.history.window('vehicle_2', 0, 10), [(5.0, 99.0, 0.0)])
+        logging.info("Archive window test passed")
+
+    def test_stop_flushes(self):
+        """TC_HISTORY_008: Stopping the flush thread writes what is still queued."""
+        self.history.flush_interval = 60
+        self.history.start()
+        self.history.record('all', 1.0, 2.0, stamp=1.0)
+        self.history.stop(timeout=1)
+        self.assertEqual(self.history.stats()['pending'], 0)
+        self.assertEqual(self.history.stats()['flushed'], 1)
+        logging.info("Stop flush test passed")
+
+class DownsampleTestCase(unittest.TestCase):
+    """Test case for LTTB and min/max downsampling"""
+
+    def setUp(self):
+        """TC_HISTORY_009: Build an L-shaped trail with one glitch."""
+        self.points = [(float(i), float(i), 0.0) for i in range(500)]
+        self.points += [(500.0 + i, 499.0, float(i)) for i in range(500)]
+        self.points[700] = (700.0, 900.0, 200.0)
+
+    def test_lttb(self):
+        """TC_HISTORY_010: LTTB keeps the requested count, the ends and the corner."""
+        sampled = lttb(self.points, 50)
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual(sampled[0], self.points[0])
+        self.assertEqual(sampled[-1], self.points[-1])
+        self.assertIn(self.points[700], sampled)
+        self.assertTrue(any(abs(p[1] - 499) < 15 and p[2] < 15 for p in sampled))
+        self.assertEqual(sampled, sorted(sampled))
+        self.assertEqual(lttb(self.points[:10], 50), self.points[:10])
+        logging.info("LTTB test passed")
+
+    def test_minmax(self):
+        """TC_HISTORY_011: Min/max bucketing stays within budget and keeps spikes."""
+        sampled = minmax(self.points, 40)
+        self.assertLessEqual(len(sampled), 40)
+        self.assertIn(self.points[700], sampled)
+        self.assertEqual(sampled, sorted(sampled))
+        for threshold in range(7):
+            self.assertLessEqual(len(minmax(self.points, threshold)), threshold)
+        self.assertEqual(minmax(self.points, 2), [self.points[0], self.points[-1]])
+        logging.info("Min/max test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,186 @@
+"""
+This module contains tests for the bulk customer import and its admin route.
+"""
+
+import unittest
+import tempfile
+import io
+import os
+import logging
+import auth
+import db
+import importer
+from web import create_app
+
+CSV_ROWS = """name,password,contact,vehicle_id
+alice,secret,1234567890,1
+bob,hunter2,not-a-number,2
+carol,pass,5550001,3
+alice,again,1234567890,4
+dave,,5550002,5
+"""
+
+class ImporterTestCase(unittest.TestCase):
+    """Test case for streaming, validating and batch inserting customer rows"""
+
+    def setUp(self):
+        """TC_IMPORT_001: Create a temporary database whose customer names are unique."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.pool = db.ConnectionPool(self.db_path, size=2)
+        with self.pool.transaction() as con:
+            con.execute('''CREATE TABLE IF NOT EXISTS customer (
+                            name TEXT PRIMARY KEY,
+                            password TEXT NOT NULL,
+                            mobile_number INTEGER NOT NULL,
+                            vehicle_id INTEGER NOT NULL)''')
+        self.customers = db.CustomerRepository(self.pool)
+
+    def tearDown(self):
+        """TC_IMPORT_002: Close the pool and remove the database files."""
+        self.pool.close()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def names(self):
+        """Names stored in the customer table."""
+        with self.pool.connection() as con:
+            return sorted(row[0] for row in con.execute("SELECT name FROM customer"))
+
+    def test_csv_errors_reported_by_line(self):
+        """TC_IMPORT_003: Bad rows are reported by line and the rest of the batch is kept."""
+        report = importer.import_customers(self.customers, io.StringIO(CSV_ROWS), 'csv',
+                                           iterations=1, chunk_size=2)
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.failed, 3)
+        self.assertEqual([error['line'] for error in report.errors], [3, 5, 6])
+        self.assertEqual(report.errors[0]['error'], "contact must be an integer, got 'not-a-number'")
+        self.assertIn('UNIQUE constraint failed', report.errors[1]['error'])
+        self.assertEqual(report.errors[2]['error'], 'missing password')
+        self.assertEqual(self.names(), ['alice', 'carol'])
+        stored = self.customers.find_by_name('alice')[1]
+        self.assertEqual(auth.verify_password(stored, 'secret', 1), (True, False))
+        logging.info("CSV import test passed")
+
+    def test_jsonl_and_prehashed(self):
+        """TC_IMPORT_004: JSON lines are imported, hashed passwords are kept and bad lines reported."""
+        hashed = auth.hash_password('secret', 1)
+        lines = io.StringIO(
+            '{"name": "erin", "password": "%s", "contact": 1, "vehicle_id": 9}\n'
+            '\n'
+            '{"name": "frank", "password": "pw", "contact": "2", "vehicle_id": "10"}\n'
+            '[1, 2]\n'
+            '{"name": "gina"\n' % hashed)
+        report = importer.import_customers(self.customers, lines, 'jsonl', iterations=1)
+        self.assertEqual((report.imported, report.failed), (2, 2))
+        self.assertEqual([error['line'] for error in report.errors], [4, 5])
+        self.assertEqual(self.customers.find_by_name('erin'), ('erin', hashed, 9, 1))
+        self.assertEqual(self.customers.find_by_name('frank')[2], 10)
+        logging.info("JSON lines import test passed")
+
+    def test_invalid_json_values(self):
+        """TC_IMPORT_012: Non-integer ids and malformed hashes are rejected per line."""
+        lines = io.StringIO('\n'.join(
+            '{"name": "%s", "password": %s, "contact": %s, "vehicle_id": 1}' % row for row in (
+                ('a', '"pw"', '[1]'), ('b', '"pw"', '{}'), ('c', '"pw"', '1.7'),
+                ('d', '"pw"', 'true'), ('e', '"pbkdf2_sha256$junk"', '1'),
+                ('f', '"pbkdf2_sha256$1$00$00"', '1'), ('g', '"pw"', '" 42 "'),
+                ('h', '"pbkdf2_sha256$999999999$%s$%s"' % ('00' * 16, '00' * 32), '1'))) + '\n')
+        report = importer.import_customers(self.customers, lines, 'jsonl', iterations=1)
+        self.assertEqual((report.imported, report.failed), (1, 7))
+        self.assertEqual([error['line'] for error in report.errors], [1, 2, 3, 4, 5, 6, 8])
+        self.assertIn('above the limit', report.errors[6]['error'])
+        self.assertIn('contact must be an integer', report.errors[3]['error'])
+        self.assertIn('invalid password hash', report.errors[4]['error'])
+        self.assertEqual(self.customers.find_by_name('g')[2], 1)
+        logging.info("Invalid JSON values test passed")
+
+    def test_error_cap(self):
+        """TC_IMPORT_005: Only max_errors errors are listed but every failure is counted."""
+        lines = io.StringIO('name,password,contact,vehicle_id\n' + 'x,y,z,1\n' * 10)
+        report = importer.import_customers(self.customers, lines, max_errors=3)
+        self.assertEqual((report.failed, len(report.errors)), (10, 3))
+        self.assertTrue(report.to_dict()['errors_truncated'])
+        logging.info("Error cap test passed")
+
+    def test_insert_many(self):
+        """TC_IMPORT_006: insert_many keeps the good rows of a batch with a rejected one."""
+        self.customers.insert('alice', 'pw', 1, 1)
+        failed = self.customers.insert_many([('bob', 'pw', 2, 2), ('alice', 'pw', 3, 3),
+                                             ('carol', 'pw', 4, 4)])
+        self.assertEqual([position for position, _ in failed], [1])
+        self.assertEqual(self.names(), ['alice', 'bob', 'carol'])
+        self.assertEqual(self.customers.insert_many([('dave', 'pw', 5, 5)]), [])
+        logging.info("Insert many test passed")
+
+    def test_detect_format(self):
+        """TC_IMPORT_007: The format is guessed from the file name."""
+        self.assertEqual(importer.detect_format('fleet.jsonl'), 'jsonl')
+        self.assertEqual(importer.detect_format('fleet.NDJSON'), 'jsonl')
+        self.assertEqual(importer.detect_format('fleet.csv'), 'csv')
+        self.assertEqual(importer.detect_format(None), 'csv')
+        logging.info("Format detection test passed")
+
+class ImportRouteTestCase(unittest.TestCase):
+    """Test case for the admin bulk import route"""
+
+    def setUp(self):
+        """TC_IMPORT_008: Create an app on a temporary database with one admin."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        with db.connect(self.db_path) as con:
+            con.execute('''CREATE TABLE customer (
+                            name TEXT PRIMARY KEY,
+                            password TEXT NOT NULL,
+                            mobile_number INTEGER NOT NULL,
+                            vehicle_id INTEGER NOT NULL)''')
+        self.app = create_app({'TESTING': True, 'DATABASE': self.db_path,
+                               'ADMIN_CUSTOMER_IDS': (1,), 'PASSWORD_HASH_ITERATIONS': 1})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """TC_IMPORT_009: Close the shared pools and remove the database files."""
+        db.close_pools()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_admin_only(self):
+        """TC_IMPORT_010: Non-admins cannot import."""
+        response = self.client.post('/admin/import', data=CSV_ROWS)
+        self.assertEqual(response.status_code, 403)
+        logging.info("Import route guard test passed")
+
+    def test_upload_and_raw_body(self):
+        """TC_IMPORT_011: Uploaded files and raw bodies are imported with a per-row report."""
+        with self.client.session_transaction() as sess:
+            sess['customer_id'] = 1
+        response = self.client.post('/admin/import', data={
+            'file': (io.BytesIO(CSV_ROWS.encode('utf-8')), 'fleet.csv')})
+        body = response.get_json()
+        self.assertEqual((body['imported'], body['failed']), (2, 3))
+        self.assertEqual([error['line'] for error in body['errors']], [3, 5, 6])
+        response = self.client.post('/admin/import?format=jsonl', data=(
+            '{"name": "erin", "password": "pw", "contact": 1, "vehicle_id": 9}\n'))
+        self.assertEqual(response.get_json()['imported'], 1)
+        self.assertEqual(self.client.post('/admin/import?format=xml', data='').status_code, 400)
+        login = self.client.post('/login', data={'name': 'erin', 'password': 'pw'})
+        self.assertTrue(login.headers['Location'].endswith('/home'))
+        logging.info("Import route test passed")
+
+    def test_duplicate_admin_name_refused(self):
+        """TC_IMPORT_013: Registering an admin's name again grants no admin rights."""
+        register = {'name': 'ops', 'password': 'real', 'contact': '1', 'vehicle_id': '1'}
+        self.client.post('/register', data=register)
+        self.client.post('/register', data=dict(register, password='intruder'))
+        self.client.post('/login', data={'name': 'ops', 'password': 'intruder'})
+        self.assertEqual(self.client.post('/admin/tracing').status_code, 403)
+        self.assertEqual(self.client.post('/admin/import', data=CSV_ROWS).status_code, 403)
+        self.client.post('/login', data={'name': 'ops', 'password': 'real'})
+        self.assertEqual(self.client.get('/admin/tracing').status_code, 200)
+        logging.info("Duplicate admin name test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
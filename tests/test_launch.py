@@ -0,0 +1,221 @@
+"""
+This module contains tests for the headless launcher using stub commands.
+"""
+
+import unittest
+import tempfile
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+import logging
+import launch
+
+def python(code):
+    """Command running a snippet with this interpreter."""
+    return [sys.executable, '-u', '-c', code]
+
+def free_port():
+    """Return a TCP port nobody is listening on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class LauncherTestCase(unittest.TestCase):
+    """Test case for readiness probes, restarts and time to ready"""
+
+    def setUp(self):
+        """TC_LAUNCH_001: Track launchers so every stub process is stopped."""
+        self.tmp = tempfile.mkdtemp()
+        self.launchers = []
+
+    def tearDown(self):
+        """TC_LAUNCH_002: Stop every launched stub."""
+        for launcher in self.launchers:
+            launcher.stop(timeout=2)
+
+    def launch(self, *components):
+        """Start components in a launcher and return it."""
+        launcher = launch.Launcher(components)
+        self.launchers.append(launcher)
+        launcher.start()
+        return launcher
+
+    def test_parallel_ready(self):
+        """TC_LAUNCH_003: Components start in parallel and time to ready is the slowest one."""
+        port = free_port()
+        launcher = self.launch(
+            launch.Component('web', [sys.executable, '-m', 'http.server', str(port),
+                                     '--bind', '127.0.0.1'],
+                             ready={'http': f'http://127.0.0.1:{port}/'}, interval=0.05),
+            launch.Component('slow', python('import time; time.sleep(0.5); print("up");'
+                                            'time.sleep(30)'),
+                             ready={'output': '^up$'}, interval=0.05),
+            launch.Component('plain', python('import time; time.sleep(30)')))
+        start = time.monotonic()
+        seconds = launcher.wait_ready(timeout=10)
+        self.assertIsNotNone(seconds)
+        self.assertGreaterEqual(seconds, 0.5)
+        self.assertLess(seconds, 0.5 + 2.0)  # Not the sum of sequential waits
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(all(status['ready'] for status in
+                            (component.status() for component in launcher.components)))
+        self.assertIn('ready in', launcher.report()[0])
+        logging.info("Parallel readiness test passed")
+
+    def test_restart_waits_for_probe(self):
+        """TC_LAUNCH_004: A crashed component is restarted and becomes ready again."""
+        marker = os.path.join(self.tmp, 'ran')
+        code = ('import os, sys, time\n'
+                f'first = not os.path.exists({marker!r})\n'
+                f'open({marker!r}, "w").close()\n'
+                'print("ready")\n'
+                'time.sleep(0.3 if first else 30)\n'
+                'sys.exit(1)\n')
+        component = launch.Component('node', python(code), ready={'output': 'ready'},
+                                     interval=0.02, backoff=0.1)
+        launcher = self.launch(component)
+        self.assertIsNotNone(launcher.wait_ready(timeout=5))
+        deadline = time.monotonic() + 5
+        while component.process.restarts < 1 or not component.ready.is_set():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        self.assertEqual(component.status()['restarts'], 1)
+        self.assertEqual(launcher.failed(), [])
+        logging.info("Restart readiness test passed")
+
+    def test_probe_timeout(self):
+        """TC_LAUNCH_005: A component that never passes its probe fails the launch."""
+        component = launch.Component('stuck', python('import time; time.sleep(30)'),
+                                     ready={'tcp': f'127.0.0.1:{free_port()}'},
+                                     ready_timeout=0.3, interval=0.05)
+        launcher = self.launch(component)
+        self.assertIsNone(launcher.wait_ready(timeout=5))
+        self.assertEqual(launcher.failed(), [component])
+        logging.info("Probe timeout test passed")
+
+    def test_crash_loop_fails(self):
+        """TC_LAUNCH_006: A component crashing past max_restarts fails the launch."""
+        component = launch.Component('crash', python('import sys; sys.exit(3)'),
+                                     ready={'output': 'never'}, backoff=0.01, max_restarts=2)
+        launcher = self.launch(component)
+        self.assertIsNone(launcher.wait_ready(timeout=5))
+        self.assertEqual(component.process.state, 'failed')
+        self.assertEqual(launcher.failed(), [component])
+        logging.info("Crash loop test passed")
+
+    def test_topic_probe_with_stub_ros2(self):
+        """TC_LAUNCH_007: The topic probe runs ros2 topic echo after the setup snippet."""
+        stub = os.path.join(self.tmp, 'ros2')
+        with open(stub, 'w', encoding='utf-8') as script:
+            script.write('#!/bin/sh\n[ "$READY_TOPIC" = "$4" ]\n')
+        os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+        setup = f'export PATH={self.tmp}:$PATH READY_TOPIC=/ego_vehicle_pose'
+        self.assertTrue(launch.topic_probe('/ego_vehicle_pose', setup=setup)())
+        self.assertFalse(launch.topic_probe('/other', setup=setup)())
+        self.assertFalse(launch.topic_probe('/ego_vehicle_pose', env={'PATH': '/nonexistent'})())
+        logging.info("Topic probe test passed")
+
+    def test_node_probe_with_stub_ros2(self):
+        """TC_LAUNCH_013: The node probe passes once ros2 node list shows the node."""
+        stub = os.path.join(self.tmp, 'ros2')
+        with open(stub, 'w', encoding='utf-8') as script:
+            script.write('#!/bin/sh\n[ "$1 $2" = "node list" ] && printf "$NODES"\n')
+        os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+        setup = f'export PATH={self.tmp}:$PATH NODES="/ego_localization\\n/park\\n"'
+        self.assertTrue(launch.node_probe('/park', setup=setup)())
+        self.assertFalse(launch.node_probe('/par', setup=setup)())
+        self.assertFalse(launch.node_probe('/park', env={'PATH': '/nonexistent'})())
+        component = launch.Component('park', ['true'], ready={'node': '/park'}, setup=setup)
+        self.assertTrue(component.probe())
+        logging.info("Node probe test passed")
+
+    def test_clean_exit_fails(self):
+        """TC_LAUNCH_012: A component exiting with status 0 after it was ready ends watch()."""
+        component = launch.Component('web', python('import time; print("up"); time.sleep(0.3)'),
+                                     ready={'output': '^up$'}, interval=0.02)
+        launcher = self.launch(component)
+        self.assertIsNotNone(launcher.wait_ready(timeout=5))
+        stop = threading.Event()
+        timer = threading.Timer(5, stop.set)
+        timer.start()
+        try:
+            self.assertEqual(launcher.watch(stop, interval=0.05), [component])
+        finally:
+            timer.cancel()
+        self.assertFalse(stop.is_set())
+        self.assertEqual(component.process.state, 'exited')
+        logging.info("Clean exit test passed")
+
+class LaunchConfigTestCase(unittest.TestCase):
+    """Test case for the launch config file and command line"""
+
+    def setUp(self):
+        """TC_LAUNCH_008: Write configs into a temporary directory."""
+        self.tmp = tempfile.mkdtemp()
+
+    def write(self, config):
+        """Write a config and return its path."""
+        path = os.path.join(self.tmp, 'launch.json')
+        with open(path, 'w', encoding='utf-8') as config_file:
+            json.dump(config, config_file)
+        return path
+
+    def test_load(self):
+        """TC_LAUNCH_009: Defaults, setup snippets, cwd and --only are applied."""
+        path = self.write({
+            'defaults': {'setup': 'source env.sh', 'restart': {'max_restarts': 1}},
+            'components': {
+                'web': {'command': ['python3', 'serve.py'], 'cwd': 'site'},
+                'park': {'command': 'ros2 run park park', 'ready': {'topic': '/p'}},
+            }})
+        web, park = launch.load_config(path)
+        self.assertEqual(web.process.command, ['python3', 'serve.py'])
+        self.assertEqual(web.process.cwd, os.path.join(self.tmp, 'site'))
+        self.assertEqual(park.process.command,
+                         ['bash', '-c', 'source env.sh && exec ros2 run park park'])
+        self.assertEqual(park.process.max_restarts, 1)
+        self.assertEqual([c.name for c in launch.load_config(path, ['park'])], ['park'])
+        logging.info("Config load test passed")
+
+    def test_invalid(self):
+        """TC_LAUNCH_010: Bad configs raise LaunchConfigError."""
+        for config in ({}, {'components': {'a': {}}},
+                       {'components': {'a': {'command': 'x', 'ready': {'smoke': 1}}}},
+                       {'components': {'a': {'command': 'x', 'restart': {'forever': 1}}}}):
+            with self.assertRaises(launch.LaunchConfigError):
+                launch.load_config(self.write(config))
+        with self.assertRaises(launch.LaunchConfigError):
+            launch.load_config(self.write({'components': {'a': {'command': 'x'}}}), ['b'])
+        with self.assertRaises(launch.LaunchConfigError):
+            launch.load_config(os.path.join(self.tmp, 'missing.json'))
+        logging.info("Invalid config test passed")
+
+    def test_exit_when_ready(self):
+        """TC_LAUNCH_011: The CLI reports time to ready and exits 0 once everything is up."""
+        path = self.write({'components': {
+            'a': {'command': python('print("listening", flush=True); import time; '
+                                    'time.sleep(30)'), 'ready': {'output': 'listening'}},
+            'b': {'command': 'sleep 30'},
+        }})
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, os.path.join(root, 'launch.py'), '--config',
+                                 path, '--exit-when-ready'], capture_output=True, text=True,
+                                timeout=30, check=False, cwd=root)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('All 2 components ready in', result.stderr)
+        failing = self.write({'components': {
+            'a': {'command': 'exit 4', 'restart': {'max_restarts': 0}}}})
+        result = subprocess.run([sys.executable, os.path.join(root, 'launch.py'), '--config',
+                                 failing, '--exit-when-ready'], capture_output=True, text=True,
+                                timeout=30, check=False, cwd=root)
+        self.assertEqual(result.returncode, 1)
+        logging.info("Exit when ready test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+This module contains tests for the thread-sharded metrics and the /metrics endpoint.
+"""
+
+import unittest
+import gc
+import os
+import tempfile
+import threading
+import logging
+from flask import Flask
+import db
+import metrics
+
+class MetricsTestCase(unittest.TestCase):
+    """Test case for counters, histograms and the Prometheus exposition"""
+
+    def setUp(self):
+        """TC_METRICS_001: Start from an empty registry."""
+        self.registry = metrics.Registry()
+
+    def test_counter_threads(self):
+        """TC_METRICS_002: Counts from many threads, including exited ones, are all summed."""
+        counter = self.registry.counter('messages_total', 'Messages', ('topic',))
+        workers = [threading.Thread(target=lambda: [counter.inc('/pose') for _ in range(1000)])
+                   for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        counter.inc('/user', amount=5)
+        gc.collect()
+        self.assertEqual(counter.values(), {('/pose',): 8000, ('/user',): 5})
+        # Exited threads are folded into the retired total and stay counted
+        self.assertEqual(counter.values(), {('/pose',): 8000, ('/user',): 5})
+        self.assertLessEqual(len(counter._live), 2)  # pylint: disable=protected-access
+        logging.info("Threaded counter test passed")
+
+    def test_label_count(self):
+        """TC_METRICS_003: Samples with the wrong number of labels are refused."""
+        counter = self.registry.counter('messages_total', 'Messages', ('topic',))
+        with self.assertRaises(ValueError):
+            counter.inc()
+        with self.assertRaises(ValueError):
+            self.registry.counter('messages_total', 'Again')
+        with self.assertRaises(ValueError):
+            self.registry.counter('bad-name', 'Dash')
+        logging.info("Label validation test passed")
+
+    def test_histogram_exposition(self):
+        """TC_METRICS_004: Histograms expose cumulative buckets, sum and count."""
+        histogram = self.registry.histogram('callback_seconds', 'Callbacks', ('callback',),
+                                            buckets=(0.01, 0.1))
+        for value in (0.005, 0.01, 0.05, 2.0):
+            histogram.observe(value, 'pose')
+        text = self.registry.expose()
+        self.assertIn('# TYPE callback_seconds histogram', text)
+        self.assertIn('callback_seconds_bucket{callback="pose",le="0.01"} 2', text)
+        self.assertIn('callback_seconds_bucket{callback="pose",le="0.1"} 3', text)
+        self.assertIn('callback_seconds_bucket{callback="pose",le="+Inf"} 4', text)
+        self.assertIn('callback_seconds_sum{callback="pose"} 2.065', text)
+        self.assertIn('callback_seconds_count{callback="pose"} 4', text)
+        logging.info("Histogram exposition test passed")
+
+    def test_gauges_and_stats(self):
+        """TC_METRICS_005: Gauges and component stats are read at scrape time."""
+        state = {'received': 1, 'name': 'x', 'up': True}
+        self.registry.gauge('clients', 'Clients', lambda: 3)
+        self.registry.stats('fanout', lambda: dict(state), 'Fan-out counter')
+        state['received'] = 7
+        text = self.registry.expose()
+        self.assertIn('clients 3.0', text)
+        self.assertIn('fanout_received 7.0', text)
+        self.assertNotIn('fanout_name', text)
+        self.assertNotIn('fanout_up', text)
+        logging.info("Gauge test passed")
+
+    def test_label_escaping(self):
+        """TC_METRICS_006: Quotes, backslashes and newlines in label values are escaped."""
+        counter = self.registry.counter('odd_total', 'Odd labels', ('value',))
+        counter.inc('a"b\\c\nd')
+        self.assertIn(r'odd_total{value="a\"b\\c\nd"} 1.0', self.registry.expose())
+        logging.info("Label escaping test passed")
+
+    def test_callback_instrument(self):
+        """TC_METRICS_007: Instrumented callbacks are counted per topic and timed by name."""
+        messages = self.registry.counter('ros_messages_total', 'Messages', ('topic',))
+        latency = self.registry.histogram('ros_callback_seconds', 'Callbacks', ('callback',))
+        received = []
+
+        def pose_callback(msg):
+            received.append(msg)
+        wrapped = metrics.callback_instrument(messages, latency)('/pose', pose_callback)
+        wrapped(1)
+        wrapped(2)
+        self.assertEqual(received, [1, 2])
+        self.assertEqual(messages.values(), {('/pose',): 2})
+        self.assertEqual(latency.values()[('pose_callback',)][-2], 0)  # Nothing above 10 s
+        self.assertEqual(sum(latency.values()[('pose_callback',)][:-1]), 2)
+        logging.info("Callback instrument test passed")
+
+    def test_query_observer(self):
+        """TC_METRICS_008: Pooled connection blocks are reported once per outer block."""
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        histogram = self.registry.histogram('db_query_seconds', 'Queries', ('query',))
+        db.set_query_observer(histogram.observe)
+        pool = db.ConnectionPool(path)
+        try:
+            with pool.connection('lookup') as con:
+                with pool.transaction() as inner:
+                    inner.execute('CREATE TABLE t(x)')
+                con.execute('SELECT * FROM t').fetchall()
+        finally:
+            db.set_query_observer(None)
+            pool.close()
+            os.unlink(path)
+        self.assertEqual(list(histogram.values()), [('lookup',)])
+        logging.info("Query observer test passed")
+
+    def test_flask_route(self):
+        """TC_METRICS_009: Requests are timed by route pattern and /metrics serves the text format."""
+        app = Flask(__name__)
+
+        @app.route('/item/<int:number>')
+        def item(number):
+            return str(number)
+        self.registry.init_app(app)
+        client = app.test_client()
+        client.get('/item/1')
+        client.get('/item/2')
+        client.get('/missing')
+        response = client.get('/metrics')
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_count'
+                      '{route="/item/<int:number>",method="GET",status="200"} 2', text)
+        self.assertIn('route="<unmatched>",method="GET",status="404"', text)
+        logging.info("Flask route test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
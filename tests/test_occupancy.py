@@ -0,0 +1,96 @@
+"""
+This module contains unit tests for the parking occupancy bitset.
+"""
+
+import unittest
+import logging
+from occupancy import OccupancyMap, status_payload
+
+class OccupancyMapTestCase(unittest.TestCase):
+    """Test case for debounced, diff-only spot occupancy"""
+
+    def setUp(self):
+        """TC_OCCUPANCY_001: Create a 20-spot lot with a one second settle window."""
+        self.now = 0.0
+        self.lot = OccupancyMap(20, settle=1.0, clock=lambda: self.now)
+
+    def test_starts_available(self):
+        """TC_OCCUPANCY_002: Every spot starts available and the snapshot covers the lot."""
+        snapshot = self.lot.snapshot()
+        self.assertEqual(len(snapshot), 20)
+        self.assertTrue(all(snapshot.values()))
+        self.assertEqual(self.lot.occupied_count(), 0)
+        logging.info("Initial state test passed")
+
+    def test_change_published_after_settle(self):
+        """TC_OCCUPANCY_003: A reading is published once it has held for the settle window."""
+        self.lot.update(5, True)
+        self.assertEqual(self.lot.collect(), {})
+        self.now = 1.0
+        self.assertEqual(self.lot.collect(), {5: False})
+        self.assertTrue(self.lot.is_occupied(5))
+        self.assertEqual(self.lot.collect(), {})
+        logging.info("Settle test passed")
+
+    def test_flapping_sensor_is_suppressed(self):
+        """TC_OCCUPANCY_004: A sensor flipping back inside the window never publishes."""
+        for step in range(10):
+            self.now = step * 0.1
+            self.lot.update(7, step % 2 == 0)
+        self.now = 5.0
+        self.assertEqual(self.lot.collect(), {})
+        self.assertFalse(self.lot.is_occupied(7))
+        self.assertEqual(self.lot.stats()['suppressed'], 5)
+        logging.info("Flap suppression test passed")
+
+    def test_repeated_readings_keep_first_timestamp(self):
+        """TC_OCCUPANCY_005: Repeating the same new reading does not restart the window."""
+        self.lot.update(2, True)
+        self.now = 0.9
+        self.lot.update(2, True)
+        self.now = 1.0
+        self.assertEqual(self.lot.collect(), {2: False})
+        logging.info("Repeated reading test passed")
+
+    def test_delta_only_contains_changes(self):
+        """TC_OCCUPANCY_006: Only spots that changed appear in a delta; bits span byte edges."""
+        self.lot.update_many([(0, True), (8, True), (19, True), (3, False)])
+        self.now = 2.0
+        self.assertEqual(self.lot.collect(), {0: False, 8: False, 19: False})
+        self.assertEqual(self.lot.occupied_count(), 3)
+        self.lot.update(8, False)
+        self.now = 4.0
+        self.assertEqual(self.lot.collect(), {8: True})
+        self.assertEqual(self.lot.occupied_count(), 2)
+        logging.info("Delta test passed")
+
+    def test_out_of_range(self):
+        """TC_OCCUPANCY_007: Spot ids outside the lot are rejected."""
+        with self.assertRaises(IndexError):
+            self.lot.update(20, True)
+        with self.assertRaises(IndexError):
+            self.lot.is_occupied(-1)
+        with self.assertRaises(ValueError):
+            OccupancyMap(0)
+        logging.info("Range test passed")
+
+    def test_status_payload(self):
+        """TC_OCCUPANCY_008: Payloads use the parking_spots_status key the page reads."""
+        self.assertEqual(status_payload({1: True}),
+                         {'parking_spots_status': {1: True}, 'snapshot': False})
+        logging.info("Payload test passed")
+
+    def test_apply_relayed(self):
+        """TC_OCCUPANCY_009: Relayed states are published at once and unknown ids skipped."""
+        self.lot.update(4, True)
+        self.assertEqual(self.lot.apply({'3': False, 4: False, 99: False, 'x': True}), 2)
+        self.assertTrue(self.lot.is_occupied(3) and self.lot.is_occupied(4))
+        self.now = 5.0
+        self.assertEqual(self.lot.collect(), {})
+        self.assertEqual(self.lot.apply({3: True}), 1)
+        self.assertEqual(self.lot.occupied_count(), 1)
+        logging.info("Relayed state test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
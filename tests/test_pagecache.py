@@ -0,0 +1,106 @@
+"""
+This module contains tests for the rendered-page cache and its conditional GETs.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import logging
+from flask import Flask, flash, redirect
+from pagecache import PageCache
+
+class PageCacheTestCase(unittest.TestCase):
+    """Test case for memoized pages with strong ETags"""
+
+    def setUp(self):
+        """TC_PAGECACHE_001: Create an app with one static page and one flashing page."""
+        self.templates = tempfile.mkdtemp()
+        self.page = os.path.join(self.templates, 'page.html')
+        with open(self.page, 'w', encoding='utf-8') as handle:
+            handle.write('<p>hello</p>{% for m in get_flashed_messages() %}<i>{{ m }}</i>{% endfor %}')
+        self.app = Flask(__name__, template_folder=self.templates)
+        self.app.secret_key = 'test'
+        self.version = 1
+        self.cache = PageCache(max_entries=2, version=lambda: self.version)
+
+        @self.app.route('/')
+        def page():
+            return self.cache.render('page.html')
+
+        @self.app.route('/flash')
+        def flashing():
+            flash('saved')
+            return redirect('/')
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """TC_PAGECACHE_002: Remove the template folder."""
+        shutil.rmtree(self.templates)
+
+    def test_hit_and_etag(self):
+        """TC_PAGECACHE_003: The second request is served from the cache with the same strong ETag."""
+        first = self.client.get('/')
+        second = self.client.get('/')
+        self.assertEqual(first.data, b'<p>hello</p>')
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertFalse(first.headers['ETag'].startswith('W/'))
+        self.assertEqual(first.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        logging.info("Cache hit test passed")
+
+    def test_if_none_match(self):
+        """TC_PAGECACHE_004: A matching If-None-Match gets an empty 304."""
+        etag = self.client.get('/').headers['ETag']
+        response = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.client.get('/', headers={'If-None-Match': '"other"'}).status_code,
+                         200)
+        logging.info("Conditional GET test passed")
+
+    def test_flashes_bypass_cache(self):
+        """TC_PAGECACHE_005: Pending flashed messages are rendered and never cached."""
+        self.client.get('/')
+        response = self.client.get('/flash', follow_redirects=True)
+        self.assertIn(b'<i>saved</i>', response.data)
+        self.assertEqual(self.client.get('/').data, b'<p>hello</p>')
+        logging.info("Flash bypass test passed")
+
+    def test_locale_and_version(self):
+        """TC_PAGECACHE_006: Entries are per language and dropped when the version changes."""
+        self.client.get('/', headers={'Accept-Language': 'en-GB,en;q=0.8'})
+        self.client.get('/', headers={'Accept-Language': 'de'})
+        self.client.get('/', headers={'Accept-Language': 'en-US'})
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 2, 'not_modified': 0,
+                                              'entries': 2})
+        self.version = 2
+        self.client.get('/', headers={'Accept-Language': 'en'})
+        self.assertEqual(self.cache.stats()['misses'], 3)
+        logging.info("Locale and version test passed")
+
+    def test_debug_reload(self):
+        """TC_PAGECACHE_007: With template auto-reload on, edited templates are re-rendered."""
+        self.app.jinja_env.auto_reload = True
+        self.assertEqual(self.client.get('/').data, b'<p>hello</p>')
+        with open(self.page, 'w', encoding='utf-8') as handle:
+            handle.write('<p>changed</p>')
+        later = time.time() + 5
+        os.utime(self.page, (later, later))
+        self.assertEqual(self.client.get('/').data, b'<p>changed</p>')
+        logging.info("Debug reload test passed")
+
+    def test_disabled(self):
+        """TC_PAGECACHE_008: A disabled cache renders every time without ETags."""
+        self.cache.enabled = False
+        self.assertNotIn('ETag', self.client.get('/').headers)
+        self.assertEqual(self.cache.stats()['misses'], 0)
+        logging.info("Disabled cache test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+This module contains tests for the sampling profiler, slow-request tracing and
+their admin routes.
+"""
+
+import unittest
+import threading
+import time
+import logging
+from flask import Flask
+from tests import fake_ros
+from profiler import SamplingProfiler, RequestTracer, ProfilerBusyError
+
+fake_ros.install()
+import app  # pylint: disable=wrong-import-position
+
+def spin_until(stop):
+    """Busy loop the profiler should find."""
+    while not stop.is_set():
+        sum(range(100))
+
+class ProfilerTestCase(unittest.TestCase):
+    """Test case for the sampling profiler"""
+
+    def test_collapsed_stacks(self):
+        """TC_PROFILER_001: Samples of other threads come back as collapsed stacks under their names."""
+        stop = threading.Event()
+        worker = threading.Thread(target=spin_until, args=(stop,), name='busy-worker')
+        worker.start()
+        try:
+            counts = SamplingProfiler(interval=0.001).profile(0.1)
+        finally:
+            stop.set()
+            worker.join()
+        text = SamplingProfiler.collapsed(counts)
+        busy = [line for line in text.splitlines() if line.startswith('busy-worker;')]
+        self.assertTrue(busy)
+        self.assertTrue(any('spin_until (test_profiler.py:' in line for line in busy))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in text.splitlines()))
+        self.assertNotIn('profile (profiler.py', text)  # The sampling thread is skipped
+        logging.info("Collapsed stack test passed")
+
+    def test_one_profile_at_a_time(self):
+        """TC_PROFILER_002: A second concurrent profile is refused and the window is capped."""
+        sampler = SamplingProfiler(interval=0.001, max_seconds=0.2)
+        started = time.monotonic()
+        worker = threading.Thread(target=sampler.profile, args=(30,))
+        worker.start()
+        time.sleep(0.05)
+        with self.assertRaises(ProfilerBusyError):
+            sampler.profile(0.01)
+        worker.join()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(sampler.profiles, 1)
+        logging.info("Busy profiler test passed")
+
+class RequestTracerTestCase(unittest.TestCase):
+    """Test case for slow-request tracing"""
+
+    def setUp(self):
+        """TC_TRACER_001: Create an app whose route reports two spans."""
+        self.tracer = RequestTracer()
+        self.app = Flask(__name__)
+        self.tracer.init_app(self.app)
+
+        @self.app.route('/slow/<int:number>')
+        def slow(number):
+            time.sleep(0.01)
+            self.tracer.span('db', 'find_by_name', 0.004)
+            self.tracer.span('emit', 'pose_update', 0.001)
+            return str(number)
+        self.client = self.app.test_client()
+
+    def test_off_by_default(self):
+        """TC_TRACER_002: Without a threshold nothing is traced."""
+        self.client.get('/slow/1')
+        self.tracer.span('db', 'outside', 0.1)  # Outside a request: ignored
+        self.assertEqual(self.tracer.stats(), {'threshold_ms': None, 'traced': 0, 'slow': 0})
+        logging.info("Tracing off test passed")
+
+    def test_slow_request_logged(self):
+        """TC_TRACER_003: Requests above the threshold are logged and kept with their spans."""
+        self.tracer.threshold = 0.005
+        with self.assertLogs('profiler', level='WARNING') as logs:
+            self.client.get('/slow/2')
+        self.assertIn('Slow request GET /slow/2 200', logs.output[0])
+        self.assertIn('db 1x 4.0 ms, emit 1x 1.0 ms', logs.output[0])
+        trace = self.tracer.recent()[0]
+        self.assertEqual(trace['route'], '/slow/<int:number>')
+        self.assertEqual([span['name'] for span in trace['spans']], ['find_by_name', 'pose_update'])
+        self.assertGreater(trace['spans'][0]['start_ms'], 5)
+        self.tracer.threshold = 10
+        self.client.get('/slow/3')
+        self.assertEqual(self.tracer.stats(), {'threshold_ms': 10000, 'traced': 2, 'slow': 1})
+        logging.info("Slow request test passed")
+
+class AdminRoutesTestCase(unittest.TestCase):
+    """Test case for the admin-only diagnostics routes"""
+
+    def setUp(self):
+        """TC_ADMIN_001: Allow one admin customer."""
+        app.APP.config['ADMIN_CUSTOMER_IDS'] = (1,)
+        self.client = app.APP.test_client()
+
+    def tearDown(self):
+        """TC_ADMIN_002: Restore the defaults."""
+        app.APP.config['ADMIN_CUSTOMER_IDS'] = ()
+        app.TRACER.threshold = None
+
+    def test_refused_without_admin(self):
+        """TC_ADMIN_003: Anonymous and non-admin users get 403."""
+        self.assertEqual(self.client.post('/admin/profile').status_code, 403)
+        with self.client.session_transaction() as sess:
+            sess['name'] = 'ops'
+            sess['customer_id'] = 2
+        self.assertEqual(self.client.get('/admin/tracing').status_code, 403)
+        logging.info("Admin refusal test passed")
+
+    def test_profile_and_tracing(self):
+        """TC_ADMIN_004: Admins can profile and switch tracing on at runtime."""
+        with self.client.session_transaction() as sess:
+            sess['customer_id'] = 1
+        # A thread to sample even when this test runs on its own
+        worker = threading.Thread(target=time.sleep, args=(0.5,))
+        worker.start()
+        response = self.client.post('/admin/profile', data={'seconds': '0.05'})
+        worker.join()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn(';_bootstrap (threading.py:', response.get_data(as_text=True))
+        self.assertEqual(self.client.post('/admin/profile', data={'seconds': 'x'}).status_code,
+                         400)
+        body = self.client.post('/admin/tracing', data={'threshold_ms': '0'}).get_json()
+        self.assertEqual(body['threshold_ms'], 0)
+        with self.assertLogs('profiler', level='WARNING'):
+            self.client.get('/about')
+        body = self.client.post('/admin/tracing', data={'threshold_ms': ''}).get_json()
+        self.assertIsNone(body['threshold_ms'])
+        self.assertEqual(body['traces'][0]['route'], '/about')
+        logging.info("Admin diagnostics test passed")
+
+    def test_non_finite_parameters(self):
+        """TC_ADMIN_005: Infinite, NaN and non-positive parameters get 400."""
+        with self.client.session_transaction() as sess:
+            sess['customer_id'] = 1
+        for data in ({'seconds': '0.05', 'interval_ms': 'inf'}, {'seconds': 'nan'},
+                     {'seconds': 'inf'}, {'seconds': '0.05', 'interval_ms': '0'},
+                     {'seconds': '-1'}):
+            self.assertEqual(self.client.post('/admin/profile', data=data).status_code, 400)
+        for value in ('nan', 'inf', '-5'):
+            response = self.client.post('/admin/tracing', data={'threshold_ms': value})
+            self.assertEqual(response.status_code, 400)
+        self.assertIsNone(app.TRACER.threshold)
+        logging.info("Admin parameter validation test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
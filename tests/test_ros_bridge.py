@@ -0,0 +1,195 @@
+"""
+This module contains tests for the ROS bridge, with rclpy replaced by fakes so
+it runs without ROS installed.
+"""
+
+import unittest
+import threading
+import logging
+from unittest import mock
+from tests import fake_ros
+
+RCLPY = fake_ros.install()
+import app  # pylint: disable=wrong-import-position
+
+class RosBridgeTestCase(unittest.TestCase):
+    """Test case for the singleton ROS bridge"""
+
+    def setUp(self):
+        """TC_BRIDGE_001: Reset the bridge and the fake rclpy call counters."""
+        app.stop_ros_node()
+        RCLPY.init.reset_mock()
+        fake_ros.FakeNode.instances.clear()
+        app.APP.config['TESTING'] = True
+        self.client = app.APP.test_client()
+
+    def tearDown(self):
+        """TC_BRIDGE_002: Shut the bridge down."""
+        app.stop_ros_node()
+
+    def test_concurrent_service_requests_start_one_node(self):
+        """TC_BRIDGE_003: Concurrent /service hits initialise rclpy and create a node once."""
+        barrier = threading.Barrier(16)
+        statuses = []
+
+        def hit():
+            client = app.APP.test_client()
+            barrier.wait()
+            statuses.append(client.get('/service').status_code)
+
+        threads = [threading.Thread(target=hit) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [200] * 16)
+        self.assertEqual(RCLPY.init.call_count, 1)
+        self.assertEqual(len(fake_ros.FakeNode.instances), 1)
+        logging.info("Concurrent start test passed")
+
+    def test_callback_groups(self):
+        """TC_BRIDGE_004: Pose and destination subscriptions use separate callback groups."""
+        app.start_ros_node()
+        node = app.ROS_BRIDGE.node
+        groups = {sub[1]: sub[4] for sub in node.subscriptions}
+        self.assertIs(groups['/ego_vehicle_pose'], groups['/user_pose'])
+        self.assertIsNot(groups['/ego_vehicle_pose'], groups['/destination_reached'])
+        logging.info("Callback group test passed")
+
+    def test_shutdown_and_restart(self):
+        """TC_BRIDGE_005: Shutdown releases rclpy so the bridge can start again."""
+        app.start_ros_node()
+        app.stop_ros_node()
+        self.assertFalse(app.ROS_BRIDGE.started)
+        self.assertFalse(RCLPY.ok())
+        self.assertTrue(app.ROS_BRIDGE.start())
+        self.assertEqual(RCLPY.init.call_count, 2)
+        logging.info("Shutdown test passed")
+
+    def test_watch_vehicle_before_start(self):
+        """TC_BRIDGE_006: Vehicles watched before start are subscribed when the node is created."""
+        app.ROS_BRIDGE.watch_vehicle(7)
+        app.start_ros_node()
+        self.assertEqual(len(app.ROS_BRIDGE.node.callbacks('/vehicle_7/ego_vehicle_pose')), 1)
+        logging.info("Watch vehicle test passed")
+
+    def test_parking_readings_reach_clients(self):
+        """TC_BRIDGE_007: Spot readings are debounced and reach clients as deltas after a snapshot."""
+        app.OCCUPANCY.settle = 0
+        app.start_ros_node()
+        client = app.SOCKETIO.test_client(app.APP)
+        snapshot = client.get_received()[0]['args'][0]
+        self.assertTrue(snapshot['snapshot'])
+        self.assertEqual(len(snapshot['parking_spots_status']), app.OCCUPANCY.size)
+        callback = app.ROS_BRIDGE.node.callbacks('/parking_spot_status')[0]
+        callback(fake_ros.int32_array([3, 1, 4, 1, 4, 0]))
+        app.POSE_FANOUT.flush()
+        received = client.get_received()
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]['name'], 'parking_status')
+        self.assertEqual(received[0]['args'][0],
+                         {'parking_spots_status': {'3': False}, 'snapshot': False})
+        client.disconnect()
+        callback(fake_ros.int32_array([3, 0]))
+        app.POSE_FANOUT.flush()
+        self.assertFalse(app.OCCUPANCY.is_occupied(3))
+        logging.info("Parking status test passed")
+
+    def test_snapshot_on_connect(self):
+        """TC_BRIDGE_008: New sockets get the last values at once; repeated destinations are dropped."""
+        app.LAST_VALUES.clear()
+        app.start_ros_node()
+        node = app.ROS_BRIDGE.node
+        node.callbacks('/ego_vehicle_pose')[0](fake_ros.pose_stamped(1.23456, 2.0))
+        node.callbacks('/user_pose')[0](fake_ros.pose_stamped(3.0, 4.0))
+        destination = node.callbacks('/destination_reached')[0]
+        with mock.patch.object(app.SOCKETIO, 'emit') as emit:
+            for reached in (False, False, True, True, True):
+                destination(fake_ros.bool_msg(reached))
+            app.POSE_FANOUT.flush()
+        reached_emits = [call for call in emit.call_args_list
+                         if call.args[0] == 'destination_reached']
+        self.assertEqual([call.args[1] for call in reached_emits],
+                         [{'reached': False}, {'reached': True}])
+        client = app.SOCKETIO.test_client(app.APP)
+        received = {packet['name']: packet['args'][0] for packet in client.get_received()}
+        self.assertEqual(received['state_snapshot'], {
+            'pose_update': {'x': 1.235, 'y': 2.0},
+            'user_update': {'x': 3.0, 'y': 4.0},
+            'destination_reached': {'reached': True},
+            'eta_update': {'distance': 2.67, 'speed': None, 'eta': None},
+        })
+        client.disconnect()
+        logging.info("Snapshot test passed")
+
+    def test_vehicle_values_override_broadcast(self):
+        """TC_BRIDGE_009: A vehicle room's cached values win over the broadcast stream's."""
+        cache = app.LastValueCache()
+        cache.remember(None, 'pose_update', {'x': 1, 'y': 1})
+        cache.remember(None, 'user_update', {'x': 2, 'y': 2})
+        cache.remember('vehicle_5', 'pose_update', {'x': 9, 'y': 9})
+        self.assertFalse(cache.remember('vehicle_5', 'pose_update', {'x': 9, 'y': 9}))
+        self.assertEqual(cache.snapshot([None, 'vehicle_5']),
+                         {'pose_update': {'x': 9, 'y': 9}, 'user_update': {'x': 2, 'y': 2}})
+        logging.info("Room precedence test passed")
+
+    def test_allocate_spot_routes(self):
+        """TC_BRIDGE_010: Logged-in vehicles reserve the spot nearest their last pose."""
+        app.LAST_VALUES.clear()
+        self.assertEqual(self.client.post('/allocate_spot').status_code, 401)
+        with self.client.session_transaction() as sess:
+            sess['vehicle_id'] = 42
+        self.assertEqual(self.client.post('/allocate_spot').status_code, 400)
+        for xpos in ('nan', 'inf', '-inf'):
+            response = self.client.post('/allocate_spot', data={'x': xpos, 'y': '1'})
+            self.assertEqual(response.status_code, 400)
+        app.LAST_VALUES.remember(app.vehicle_room(42), 'pose_update', {'x': 8.4, 'y': 9.6})
+        response = self.client.post('/allocate_spot')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['spot'], {'id': 39, 'x': 8.5, 'y': 9.5})
+        self.assertEqual(self.client.get('/spot').get_json()['spot']['id'], 39)
+        self.assertEqual(self.client.post('/release_spot').get_json()['spot']['id'], 39)
+        self.assertIsNone(self.client.get('/spot').get_json()['spot'])
+        logging.info("Spot route test passed")
+
+    def test_history_route(self):
+        """TC_BRIDGE_011: /history returns the vehicle's downsampled poses in a window."""
+        with self.client.session_transaction() as sess:
+            sess['vehicle_id'] = 9
+        app.start_ros_node()
+        app.ROS_BRIDGE.watch_vehicle(9)
+        callback = app.ROS_BRIDGE.node.callbacks('/vehicle_9/ego_vehicle_pose')[0]
+        for i in range(200):
+            callback(fake_ros.pose_stamped(i * 0.01, 1.0))
+        body = self.client.get('/history?points=20&start=0').get_json()
+        self.assertEqual(body['stream'], 'vehicle_9')
+        self.assertEqual(body['total'], 200)
+        self.assertEqual(len(body['points']), 20)
+        self.assertEqual(body['points'][-1][1:], [1.99, 1.0])
+        self.assertEqual(body['start'], body['end'] - app.APP.config['HISTORY_MAX_WINDOW'])
+        for bounds in ('start=nan', 'end=inf', 'start=-inf', 'start=0&end=nan'):
+            self.assertEqual(self.client.get(f'/history?{bounds}').status_code, 400)
+        self.assertEqual(self.client.get('/history?mode=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/history?points=x').status_code, 400)
+        for points in ('1', '0', '-5'):
+            self.assertEqual(self.client.get(f'/history?points={points}').status_code, 400)
+        logging.info("History route test passed")
+
+    def test_metrics_route(self):
+        """TC_BRIDGE_012: /metrics counts ROS messages per topic and times callbacks and emits."""
+        app.start_ros_node()
+        callback = app.ROS_BRIDGE.node.callbacks('/destination_reached')[0]
+        before = app.ROS_MESSAGES.values().get(('/destination_reached',), 0)
+        callback(fake_ros.bool_msg(True))
+        app.POSE_FANOUT.flush()
+        self.assertEqual(app.ROS_MESSAGES.values()[('/destination_reached',)], before + 1)
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('ros_callback_seconds_count{callback="destination_callback"}', text)
+        self.assertIn('socketio_emit_seconds_count{event="destination_reached"}', text)
+        self.assertIn('socketio_connected_clients', text)
+        self.assertIn('pose_fanout_received', text)
+        logging.info("Metrics route test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
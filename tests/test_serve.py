@@ -0,0 +1,54 @@
+"""
+This module contains unit tests for the production launcher helpers.
+"""
+
+import unittest
+import logging
+import subprocess
+import sys
+import serve
+
+# Supervises a child from a native thread after patching like serve.py does
+GEVENT_SUPERVISOR = '''
+import serve
+serve.patch_backend('gevent')
+import sys, time
+from supervisor import ManagedProcess
+process = ManagedProcess('park', [sys.executable, '-c', 'print("up"); import time; time.sleep(30)'])
+process.start()
+deadline = time.monotonic() + 10
+while 'up' not in process.run_output() and time.monotonic() < deadline:
+    time.sleep(0.05)
+print(process.state, process.run_output())
+process.stop(timeout=5)
+print(process.state)
+'''
+
+class ServeTestCase(unittest.TestCase):
+    """Test case for backend selection"""
+
+    def test_pick_threading(self):
+        """TC_SERVE_001: Asking for threading always returns threading."""
+        self.assertEqual(serve.pick_backend('threading'), 'threading')
+        logging.info("Threading backend test passed")
+
+    def test_pick_auto(self):
+        """TC_SERVE_002: Auto selection returns one of the supported backends."""
+        self.assertIn(serve.pick_backend('auto'), serve.BACKENDS)
+        logging.info("Auto backend test passed")
+
+    def test_supervisor_under_gevent(self):
+        """TC_SERVE_003: The park node supervisor spawns, captures and stops children under gevent."""
+        try:
+            __import__('gevent')
+        except ImportError:
+            self.skipTest('gevent not installed')
+        result = subprocess.run([sys.executable, '-c', GEVENT_SUPERVISOR], capture_output=True,
+                                text=True, timeout=60, check=False)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.splitlines(), ["running ['up']", 'stopped'])
+        logging.info("Gevent supervisor test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+This module contains unit tests for the simulated pose publisher.
+"""
+
+import unittest
+import tempfile
+import os
+import logging
+from simulator import PoseReplayer, load_trajectory, loop_trajectory, line_trajectory
+
+class PoseReplayerTestCase(unittest.TestCase):
+    """Test case for trajectory loading and pose replay"""
+
+    def test_synthetic_trajectories(self):
+        """TC_SIM_001: Synthetic trajectories have the requested length and endpoints."""
+        line = line_trajectory(11, start=(0.0, 0.0), end=(10.0, 5.0))
+        self.assertEqual(len(line), 11)
+        self.assertEqual(line[0], (0.0, 0.0))
+        self.assertEqual(line[-1], (10.0, 5.0))
+        loop = loop_trajectory(8, center=(0.0, 0.0), radius=2.0)
+        self.assertAlmostEqual(loop[2][1], 2.0)
+        logging.info("Synthetic trajectory test passed")
+
+    def test_load_recorded_trajectory(self):
+        """TC_SIM_002: A recorded CSV trajectory loads as (x, y) pairs."""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as csv_file:
+            csv_file.write("t,x,y\n0.0,1.5,2.5\n0.1,1.6,2.4\n")
+        try:
+            self.assertEqual(load_trajectory(path), [(1.5, 2.5), (1.6, 2.4)])
+        finally:
+            os.unlink(path)
+        logging.info("Recorded trajectory test passed")
+
+    def test_replay_feeds_callback(self):
+        """TC_SIM_003: Every trajectory point reaches the callback as a pose message in order."""
+        received = []
+        sends = []
+        replayer = PoseReplayer(
+            lambda msg: received.append((msg.pose.position.x, msg.pose.position.y)),
+            line_trajectory(20), rate_hz=1000, on_send=lambda index, stamp: sends.append(index))
+        self.assertEqual(replayer.run(), 20)
+        self.assertEqual(received, line_trajectory(20))
+        self.assertEqual(sends, list(range(20)))
+        logging.info("Replay test passed")
+
+    def test_replay_rate_and_duration(self):
+        """TC_SIM_004: A looping replay is paced by the rate and bounded by the duration."""
+        replayer = PoseReplayer(lambda msg: None, loop_trajectory(10), rate_hz=100, loop=True)
+        sent = replayer.run(duration=0.2)
+        self.assertGreaterEqual(sent, 15)
+        self.assertLessEqual(sent, 21)
+        logging.info("Replay rate test passed")
+
+    def test_stop(self):
+        """TC_SIM_005: A background replay stops when asked."""
+        replayer = PoseReplayer(lambda msg: None, loop_trajectory(10), rate_hz=100, loop=True)
+        replayer.start()
+        replayer.stop(timeout=1)
+        self.assertLess(replayer.sent, 100)
+        logging.info("Replay stop test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+This module contains unit tests for the spot registry and its allocation API.
+"""
+
+import unittest
+import math
+import os
+import random
+import tempfile
+import threading
+import logging
+import db
+from occupancy import OccupancyMap
+from spots import Spot, SpotRegistry, NoFreeSpotError, load_spots
+from web import create_app
+
+def grid_spots(columns, rows, spacing=1.0):
+    """Lay spots out on a regular grid, numbered row by row."""
+    return [Spot(row * columns + column, column * spacing, row * spacing)
+            for row in range(rows) for column in range(columns)]
+
+class SpotRegistryTestCase(unittest.TestCase):
+    """Test case for nearest-free queries and reservations"""
+
+    def setUp(self):
+        """TC_SPOTS_001: Create a 20x20 lot with one metre spacing."""
+        self.occupancy = OccupancyMap(400, settle=0)
+        self.registry = SpotRegistry(grid_spots(20, 20), cell_size=2.5, occupancy=self.occupancy)
+
+    def test_nearest_matches_brute_force(self):
+        """TC_SPOTS_002: Grid k-nearest results match an exhaustive scan."""
+        rng = random.Random(7)
+        spots = [Spot(i, rng.uniform(-50, 50), rng.uniform(-50, 50)) for i in range(500)]
+        registry = SpotRegistry(spots, cell_size=4.0)
+        for _ in range(200):
+            xpos, ypos = rng.uniform(-60, 60), rng.uniform(-60, 60)
+            expected = sorted(spots, key=lambda s: (math.hypot(s.x - xpos, s.y - ypos), s.id))[:5]
+            got = registry.nearest_free(xpos, ypos, 5)
+            self.assertEqual([math.hypot(s.x - xpos, s.y - ypos) for s in got],
+                             [math.hypot(s.x - xpos, s.y - ypos) for s in expected])
+        logging.info("Brute force comparison test passed")
+
+    def test_allocate_nearest_and_idempotent(self):
+        """TC_SPOTS_003: A vehicle gets the nearest spot, and the same spot when it asks again."""
+        spot = self.registry.allocate(7, 3.1, 4.2)
+        self.assertEqual((spot.x, spot.y), (3.0, 4.0))
+        self.assertEqual(self.registry.allocate(7, 15.0, 15.0), spot)
+        self.assertEqual(self.registry.reservation(7), spot)
+        other = self.registry.allocate(8, 3.1, 4.2)
+        self.assertNotEqual(other.id, spot.id)
+        logging.info("Allocation test passed")
+
+    def test_release(self):
+        """TC_SPOTS_004: Releasing frees the spot for the next vehicle."""
+        spot = self.registry.allocate(1, 0.0, 0.0)
+        self.assertEqual(self.registry.release(1), spot)
+        self.assertIsNone(self.registry.release(1))
+        self.assertIsNone(self.registry.reservation(1))
+        self.assertEqual(self.registry.allocate(2, 0.0, 0.0), spot)
+        logging.info("Release test passed")
+
+    def test_occupied_spots_are_skipped(self):
+        """TC_SPOTS_005: Spots the sensors report occupied are never allocated."""
+        self.occupancy.update(0, True)
+        self.occupancy.collect()
+        self.assertNotEqual(self.registry.allocate(1, 0.0, 0.0).id, 0)
+        logging.info("Occupancy test passed")
+
+    def test_concurrent_allocations_are_unique(self):
+        """TC_SPOTS_006: Concurrent requests never share a spot and a full lot raises."""
+        results = {}
+        errors = []
+        barrier = threading.Barrier(32)
+
+        def request(worker):
+            barrier.wait()
+            for vehicle_id in range(worker * 20, worker * 20 + 20):
+                try:
+                    results[vehicle_id] = self.registry.allocate(vehicle_id, 10.0, 10.0).id
+                except NoFreeSpotError:
+                    errors.append(vehicle_id)
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 400)
+        self.assertEqual(len(set(results.values())), 400)
+        self.assertEqual(len(errors), 640 - 400)
+        self.assertEqual(self.registry.stats(), {'spots': 400, 'reserved': 400})
+        logging.info("Concurrent allocation test passed")
+
+    def test_load_from_file(self):
+        """TC_SPOTS_007: Layouts load from id,x,y CSV files and duplicate ids are rejected."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('id,x,y\n0,1.5,0.5\n1,1.5,1.5\n')
+        try:
+            self.assertEqual(load_spots(handle.name), [Spot(0, 1.5, 0.5), Spot(1, 1.5, 1.5)])
+            self.assertEqual(len(SpotRegistry.from_file(handle.name)), 2)
+        finally:
+            os.unlink(handle.name)
+        with self.assertRaises(ValueError):
+            SpotRegistry([Spot(0, 0, 0), Spot(0, 1, 1)])
+        logging.info("Layout file test passed")
+
+    def test_far_queries(self):
+        """TC_SPOTS_009: Queries far outside the lot scan only rings reaching it."""
+        for xpos, ypos in ((1e3, 1e3), (3e3, -3e3), (-1e9, 5.0), (1e12, 1e12)):
+            expected = min(grid_spots(20, 20),
+                           key=lambda s, x=xpos, y=ypos: (math.hypot(s.x - x, s.y - y), s.id))
+            self.assertEqual(self.registry.nearest_free(xpos, ypos), [expected])
+        # The lot covers cells 0..7 on both axes; rings are clipped to it
+        self.assertEqual(list(self.registry._ring(400, 400, 390)), [])
+        self.assertEqual(sorted(self.registry._ring(0, 0, 2)),
+                         [(0, 2), (1, 2), (2, 0), (2, 1), (2, 2)])
+        logging.info("Far query test passed")
+
+    def test_empty_lot(self):
+        """TC_SPOTS_008: An empty registry has nothing to offer."""
+        registry = SpotRegistry([])
+        self.assertEqual(registry.nearest_free(0, 0), [])
+        with self.assertRaises(NoFreeSpotError):
+            registry.allocate(1, 0, 0)
+        logging.info("Empty lot test passed")
+
+class SharedReservationsTestCase(unittest.TestCase):
+    """Test case for reservations shared by worker processes through SQLite"""
+
+    def setUp(self):
+        """TC_SPOTS_010: Create two registries, one per worker, on one database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.pools = [db.ConnectionPool(self.db_path) for _ in range(2)]
+        self.workers = [SpotRegistry(grid_spots(5, 4), pool=pool) for pool in self.pools]
+
+    def tearDown(self):
+        """TC_SPOTS_011: Close the pools and remove the database files."""
+        for pool in self.pools:
+            pool.close()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_workers_never_share_a_spot(self):
+        """TC_SPOTS_012: Concurrent allocations on two workers hand out each spot once."""
+        results = {}
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def request(worker):
+            barrier.wait()
+            registry = self.workers[worker % 2]
+            for vehicle_id in range(worker * 5, worker * 5 + 5):
+                try:
+                    results[vehicle_id] = registry.allocate(vehicle_id, 2.0, 2.0).id
+                except NoFreeSpotError:
+                    errors.append(vehicle_id)
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(set(results.values())), 20)
+        self.assertEqual(len(errors), 20)
+        self.assertEqual(self.workers[0].stats(), {'spots': 20, 'reserved': 20})
+        logging.info("Shared reservation test passed")
+
+    def test_reservations_visible_across_workers(self):
+        """TC_SPOTS_013: A spot reserved or released on one worker is seen by the other."""
+        spot = self.workers[0].allocate(1, 0.0, 0.0)
+        self.assertEqual(self.workers[1].reservation(1), spot)
+        self.assertEqual(self.workers[1].allocate(1, 3.0, 3.0), spot)
+        self.assertNotEqual(self.workers[1].allocate(2, 0.0, 0.0), spot)
+        self.assertEqual(self.workers[1].release(1), spot)
+        self.assertIsNone(self.workers[0].reservation(1))
+        self.assertEqual(self.workers[0].allocate(3, 0.0, 0.0), spot)
+        logging.info("Cross-worker visibility test passed")
+
+    def test_registry_per_app(self):
+        """TC_SPOTS_014: Each app keeps its own registry bound to its own occupancy map."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('id,x,y\n0,0.5,0.5\n1,1.5,0.5\n')
+        try:
+            first, second = (create_app({'TESTING': True, 'SPOTS_FILE': handle.name})
+                             .extensions['parkonomous'] for _ in range(2))
+            self.assertIsNot(first.get_spots(), second.get_spots())
+            self.assertIs(first.get_spots(), first.get_spots())
+            self.assertIs(second.get_spots().occupancy, second.occupancy)
+        finally:
+            os.unlink(handle.name)
+        logging.info("Registry per app test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
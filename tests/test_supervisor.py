@@ -0,0 +1,126 @@
+"""
+This module contains unit tests for the ROS2 process supervisor, using dummy
+Python commands in place of ros2.
+"""
+
+import unittest
+import sys
+import time
+import logging
+from supervisor import ProcessSupervisor, SupervisorFullError
+from web import create_app
+
+SLEEPER = [sys.executable, '-c', 'import time; print("park up", flush=True); time.sleep(30)']
+CRASHER = [sys.executable, '-c', 'import sys; print("boom", flush=True); sys.exit(3)']
+
+def wait_for(predicate, timeout=5.0):
+    """Poll a predicate until it is true or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+class ProcessSupervisorTestCase(unittest.TestCase):
+    """Test case for the process supervisor"""
+
+    def setUp(self):
+        """TC_SUP_001: Create a supervisor with a fast backoff."""
+        self.supervisor = ProcessSupervisor(max_children=2, backoff=0.05, max_backoff=0.2,
+                                            max_restarts=2, output_lines=5)
+
+    def tearDown(self):
+        """TC_SUP_002: Stop every supervised process."""
+        self.supervisor.shutdown(timeout=2)
+
+    def test_single_instance_per_key(self):
+        """TC_SUP_003: Starting the same key twice reuses the running process."""
+        first, started = self.supervisor.start('park_1', SLEEPER)
+        self.assertTrue(started)
+        self.assertTrue(wait_for(lambda: first.pid is not None))
+        second, started = self.supervisor.start('park_1', SLEEPER)
+        self.assertFalse(started)
+        self.assertIs(first, second)
+        logging.info("Single instance test passed")
+
+    def test_output_captured(self):
+        """TC_SUP_004: Child output is captured in the status ring buffer."""
+        self.supervisor.start('park_1', SLEEPER)
+        self.assertTrue(wait_for(lambda: 'park up' in self.supervisor.status('park_1')['output']))
+        self.assertEqual(self.supervisor.status('park_1')['state'], 'running')
+        logging.info("Output capture test passed")
+
+    def test_max_children(self):
+        """TC_SUP_005: Starting beyond the cap raises SupervisorFullError."""
+        self.supervisor.start('park_1', SLEEPER)
+        self.supervisor.start('park_2', SLEEPER)
+        with self.assertRaises(SupervisorFullError):
+            self.supervisor.start('park_3', SLEEPER)
+        logging.info("Max children test passed")
+
+    def test_restart_with_backoff(self):
+        """TC_SUP_006: A crashing child is restarted until max_restarts, then marked failed."""
+        self.supervisor.start('park_1', CRASHER)
+        self.assertTrue(wait_for(lambda: self.supervisor.status('park_1')['state'] == 'failed'))
+        status = self.supervisor.status('park_1')
+        self.assertEqual(status['restarts'], 2)
+        self.assertEqual(status['returncode'], 3)
+        self.assertEqual(status['output'].count('boom'), 3)
+        logging.info("Restart test passed")
+
+    def test_stop(self):
+        """TC_SUP_007: Stopping a key terminates its child and frees the slot."""
+        process, _ = self.supervisor.start('park_1', SLEEPER)
+        self.assertTrue(wait_for(lambda: process.pid is not None))
+        self.assertTrue(self.supervisor.stop('park_1', timeout=2))
+        self.assertIsNone(process.pid)
+        self.assertEqual(self.supervisor.status('park_1')['state'], 'stopped')
+        _, started = self.supervisor.start('park_1', SLEEPER)
+        self.assertTrue(started)
+        logging.info("Stop test passed")
+
+    def test_missing_command(self):
+        """TC_SUP_008: A command that cannot be executed is reported as failed."""
+        self.supervisor.start('park_1', ['/nonexistent/ros2'])
+        self.assertTrue(wait_for(lambda: self.supervisor.status('park_1')['state'] == 'failed'))
+        logging.info("Missing command test passed")
+
+    def test_spawn_error_fails(self):
+        """TC_SUP_012: Any error while spawning marks the process failed and frees the key."""
+        self.supervisor.start('park_1', [None])
+        self.assertTrue(wait_for(lambda: self.supervisor.status('park_1')['state'] == 'failed'))
+        started, _ = self.supervisor.start('park_1', SLEEPER)
+        self.assertTrue(started)
+        logging.info("Spawn error test passed")
+
+class ParkNodeRouteTestCase(unittest.TestCase):
+    """Test case for the per-vehicle park node started from /run_ros2_node"""
+
+    def setUp(self):
+        """TC_SUP_009: Create an app whose park command echoes its arguments."""
+        echo = [sys.executable, '-c',
+                'import sys, time; print(" ".join(sys.argv[1:]), flush=True); time.sleep(30)']
+        self.app = create_app({'TESTING': True, 'ROS2_PARK_COMMAND': echo})
+        self.supervisor = self.app.extensions['parkonomous'].supervisor
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """TC_SUP_010: Stop the park nodes."""
+        self.supervisor.shutdown(timeout=2)
+
+    def test_vehicle_namespace(self):
+        """TC_SUP_011: Each vehicle's park node runs in the vehicle's ROS namespace."""
+        for vehicle_id in (3, 4):
+            with self.client.session_transaction() as sess:
+                sess['vehicle_id'] = vehicle_id
+            self.client.post('/run_ros2_node')
+            key = f'park_{vehicle_id}'
+            self.assertTrue(wait_for(lambda key=key: self.supervisor.status(key)['output']))
+            self.assertEqual(self.supervisor.status(key)['output'],
+                             [f'--ros-args -r __ns:=/vehicle_{vehicle_id}'])
+        logging.info("Park node namespace test passed")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+web
+The Flask and Socket.IO side of the app, built by ``create_app``.
+
+Importing the package does not import rclpy; ROS is loaded only when the
+bridge starts, so web workers start quickly and run on machines without ROS.
+"""
+
+import os
+from flask import Flask
+import auth
+import backpressure
+import db
+import history
+import importer
+import spots
+from bridge import DEFAULT_EXECUTOR_THREADS
+from eta import DEFAULT_SMOOTHING, DEFAULT_MIN_CHANGE
+from occupancy import DEFAULT_SPOTS, DEFAULT_SETTLE
+from web.routes import register_routes
+from web.services import Services, current_services
+from web.sockets import register_sockets
+
+__all__ = ['Services', 'create_app', 'current_services']
+
+# Templates and static files live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_app(config=None):
+    """
+    Create the app with its services; ``config`` overrides the defaults below.
+
+    The services are reachable as ``current_services()`` inside requests and
+    socket events, and as ``app.extensions['parkonomous']`` outside them.
+    """
+    app = Flask('app', root_path=ROOT)
+    app.secret_key = 'supersecretkey'  # Needed for flash messaging
+
+    app.config['DATABASE'] = db.DEFAULT_DATABASE  # SQLite file holding the customer table
+    app.config['DB_POOL_SIZE'] = db.DEFAULT_POOL_SIZE  # Max pooled connections per database
+    app.config['CUSTOMER_CACHE_SIZE'] = db.DEFAULT_CACHE_SIZE  # Customer records kept in memory
+    app.config['CUSTOMER_CACHE_TTL'] = db.DEFAULT_CACHE_TTL  # Seconds a cached record is kept
+    app.config['PASSWORD_HASH_ITERATIONS'] = auth.DEFAULT_ITERATIONS  # PBKDF2 cost per login
+    app.config['LOGIN_MAX_CANDIDATES'] = 4  # Rows of a legacy duplicate name checked per login
+    app.config['IMPORT_CHUNK_SIZE'] = importer.DEFAULT_CHUNK_SIZE  # Rows per bulk import transaction
+    app.config['ROS2_PARK_COMMAND'] = [  # Command supervised by /run_ros2_node, plus ROS args
+        'bash', '-c', 'source /opt/ros/foxy/setup.bash && exec ros2 run park park "$@"', 'park']
+    app.config['ROS2_MAX_CHILDREN'] = 4  # Max park nodes running at once across vehicles
+    app.config['POSE_FANOUT_HZ'] = 15  # Max pose broadcasts per second per topic
+    app.config['MAX_CLIENTS'] = None  # Refuse Socket.IO connections beyond this many
+    app.config['SEND_QUEUE_HIGH_WATER'] = backpressure.DEFAULT_HIGH_WATER  # Packets to slow down
+    app.config['SEND_QUEUE_LOW_WATER'] = backpressure.DEFAULT_LOW_WATER  # Packets to restore
+    app.config['SLOW_CLIENT_HZ'] = backpressure.DEFAULT_SLOW_RATE_HZ  # Pose rate once slowed
+    app.config['SLOW_CLIENT_STALL_SECONDS'] = backpressure.DEFAULT_STALL_SECONDS  # Then disconnect
+    app.config['BROADCAST_LEGACY_TOPICS'] = True  # Keep relaying the un-namespaced topics
+    app.config['ROS_EXECUTOR_THREADS'] = DEFAULT_EXECUTOR_THREADS  # Threads running ROS callbacks
+    app.config['PARKING_SPOTS'] = DEFAULT_SPOTS  # Spots in the lot, ids 0..PARKING_SPOTS-1
+    app.config['PARKING_SETTLE'] = DEFAULT_SETTLE  # Seconds a spot reading must hold to publish
+    app.config['SPOTS_FILE'] = spots.DEFAULT_SPOTS_FILE  # CSV spot layout with id,x,y columns
+    app.config['SPOTS_DATABASE'] = None  # SQLite file holding reservations shared by workers
+    app.config['HISTORY_CAPACITY'] = history.DEFAULT_CAPACITY  # Poses kept in memory per vehicle
+    app.config['HISTORY_MAX_STREAMS'] = history.DEFAULT_MAX_STREAMS  # Vehicles kept in memory
+    app.config['HISTORY_DATABASE'] = None  # SQLite file archiving every pose, or None
+    app.config['HISTORY_MAX_WINDOW'] = history.DEFAULT_MAX_WINDOW  # Max seconds per /history query
+    app.config['HISTORY_FLUSH_INTERVAL'] = history.DEFAULT_FLUSH_INTERVAL  # Seconds between writes
+    app.config['ETA_SMOOTHING'] = DEFAULT_SMOOTHING  # Weight of the newest speed sample
+    app.config['ETA_MIN_CHANGE'] = DEFAULT_MIN_CHANGE  # Seconds the ETA must move to be re-sent
+    app.config['ADMIN_CUSTOMER_IDS'] = ()  # Customer row ids (sno) allowed to use /admin routes
+    app.config['SOCKETIO_ASYNC_MODE'] = None  # Socket.IO backend; None picks the best installed
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = None  # redis:// or local:// backplane URL, or None
+    app.config['SOCKETIO_QUEUE_WRITE_ONLY'] = False  # Publish to the backplane without listening
+    app.config.update(config or {})
+
+    services = Services(app)
+    register_routes(app)
+    register_sockets(services.socketio)
+    return app
@@ -0,0 +1,396 @@
+"""
+web/routes.py
+Page and JSON routes of the web app, registered on an app by ``register_routes``.
+"""
+
+import csv
+import io
+import logging
+import math
+import sqlite3
+import time
+from functools import wraps
+from flask import (Response, current_app, flash, jsonify, redirect, render_template, request,
+                   session, url_for)
+import auth
+import history
+import importer
+import profiler
+import spots
+from bridge import vehicle_room
+from supervisor import SupervisorFullError
+from web.services import current_services
+
+LOGGER = logging.getLogger(__name__)
+
+# (rule, view, options) for every route, in definition order
+ROUTES = []
+
+def route(rule, **options):
+    """
+    Decorator recording a view for ``register_routes``, like ``app.route``.
+    """
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return decorator
+
+def register_routes(app):
+    """
+    Add every recorded route to an app, keeping the view names as endpoints.
+    """
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view.__name__, view, **options)
+
+@route('/')
+def index():
+    """
+    Route for the index page.
+    """
+    return current_services().page_cache.render('index.html')
+
+@route('/login', methods=['GET', 'POST'])
+def login():
+    """
+    Route for user login handling.
+    """
+    if request.method == 'POST':
+        name = request.form['name']
+        password = request.form['password']
+        customers = current_services().get_customers()
+        iterations = current_app.config['PASSWORD_HASH_ITERATIONS']
+        # New names are unique, but older databases may hold several rows per
+        # name: log in as the oldest of the first few whose password matches
+        rows = customers.find_all_by_name(name)[:current_app.config['LOGIN_MAX_CANDIDATES']]
+        data, matches, needs_rehash = None, False, False
+        if not rows:
+            auth.verify_unknown(password, iterations)
+        for data in rows:
+            matches, needs_rehash = auth.verify_password(data[1], password, iterations)
+            if matches:
+                break
+        if matches:
+            if needs_rehash:
+                customers.update_passwords(
+                    [(auth.hash_password(password, iterations), name, data[1])])
+            session['name'] = data[0]
+            session['vehicle_id'] = data[2]
+            session['customer_id'] = data[3]
+            flash('Login successful!', 'success')
+            LOGGER.info('Login successful for user %s', name)
+            return redirect(url_for('home'))
+        flash('Username and Password Mismatch', 'danger')
+        LOGGER.warning('Username and Password Mismatch for user %s', name)
+    return redirect(url_for('index'))
+
+@route('/home', methods=['GET', 'POST'])
+def home():
+    """
+    Route for the home page.
+    """
+    return current_services().page_cache.render('home.html')
+
+@route('/register', methods=['GET', 'POST'])
+def register():
+    """
+    Route for user registration handling.
+    """
+    if request.method == 'POST':
+        try:
+            name = request.form['name']
+            password = request.form['password']
+            mobile_number = int(request.form['contact'])
+            vehicle_id = int(request.form['vehicle_id'])
+            hashed = auth.hash_password(password, current_app.config['PASSWORD_HASH_ITERATIONS'])
+            current_services().get_customers().insert(name, hashed, mobile_number, vehicle_id)
+            flash('Record Added Successfully', 'success')
+            LOGGER.info('Record Added Successfully for user %s', name)
+        except (ValueError, sqlite3.Error) as exc:
+            flash(f"Error in Insert Operation: {str(exc)}", 'danger')
+            LOGGER.error("Error in Insert Operation for user %s: %s", name, str(exc))
+        return redirect(url_for('login'))
+    return current_services().page_cache.render('register.html')
+
+@route('/logout')
+def logout():
+    """
+    Route for user logout.
+    """
+    session.clear()
+    return redirect(url_for('index'))
+
+def ros2_node_key():
+    """
+    Function to get the supervisor key for the current user's park node.
+    """
+    vehicle_id = session.get('vehicle_id')
+    return f'park_{vehicle_id}' if vehicle_id is not None else 'park'
+
+def ros2_park_command():
+    """
+    Function to get the park node command for the current user, remapped into
+    the vehicle's namespace so each vehicle's node uses its own topics.
+    """
+    command = list(current_app.config['ROS2_PARK_COMMAND'])
+    vehicle_id = session.get('vehicle_id')
+    if vehicle_id is not None:
+        command += ['--ros-args', '-r', f'__ns:=/{vehicle_room(vehicle_id)}']
+    return command
+
+@route("/run_ros2_node", methods=["POST"])
+def run_ros2_node():
+    """
+    Route for starting the ROS2 node via POST request.
+    """
+    supervisor = current_services().supervisor
+    try:
+        _, started = supervisor.start(ros2_node_key(), ros2_park_command())
+        if started:
+            flash("ROS2 Node Started Successfully", "success")
+            LOGGER.info("ROS2 Node Started Successfully")
+        else:
+            flash("ROS2 Node Already Running", "success")
+            LOGGER.info("ROS2 Node already running for %s", ros2_node_key())
+    except SupervisorFullError as exc:
+        flash(f"Error in starting ROS2 node: {str(exc)}", "danger")
+        LOGGER.error("Error in starting ROS2 node: %s", str(exc))
+    return render_template("home.html")
+
+@route("/ros2_node_status")
+def ros2_node_status():
+    """
+    Route reporting the state and recent output of the current user's park node.
+    """
+    status = current_services().supervisor.status(ros2_node_key())
+    if status is None:
+        return jsonify({'key': ros2_node_key(), 'state': 'not_started'}), 404
+    return jsonify(status)
+
+@route('/about', methods=['GET', 'POST'])
+def about():
+    """
+    Route for rendering the about page.
+    """
+    LOGGER.info('About page requested')
+    return current_services().page_cache.render('about.html')
+
+@route('/service', methods=['GET', 'POST'])
+def service():
+    """
+    Route for rendering the service page, starting the ROS node if the app did not.
+    """
+    services = current_services()
+    if not services.ros_bridge.started:
+        services.start_ros_node()
+    return current_services().page_cache.render('service.html')
+
+@route('/healthz')
+def healthz():
+    """
+    Route answering readiness probes, e.g. from launch.py; also reports
+    whether the ROS bridge is running.
+    """
+    return jsonify({'status': 'ok', 'ros': current_services().ros_bridge.started})
+
+@route('/fanout_stats')
+def fanout_stats():
+    """
+    Route reporting how many pose messages were received, coalesced and emitted.
+    """
+    return jsonify(current_services().fanout.stats())
+
+@route('/page_cache_stats')
+def page_cache_stats():
+    """
+    Route reporting rendered-page cache hits, misses and 304 responses.
+    """
+    return jsonify(current_services().page_cache.stats())
+
+def admin_required(view):
+    """
+    Decorator restricting a route to the customers listed in ADMIN_CUSTOMER_IDS.
+
+    Rights go with the customer id set at login rather than the name, so
+    another row registered under an admin's name gets no rights.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('customer_id') not in current_app.config['ADMIN_CUSTOMER_IDS']:
+            LOGGER.warning("Refused admin route %s for %s", request.path, session.get('name'))
+            return jsonify({'error': 'admin only'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@route('/admin/profile', methods=['POST'])
+@admin_required
+def admin_profile():
+    """
+    Route sampling every thread for ``seconds`` (default 10, at most 60) and
+    returning collapsed stacks for flamegraph.pl or speedscope.
+    """
+    sampler = current_services().profiler
+    try:
+        seconds = float(request.form.get('seconds', 10))
+        interval = float(request.form.get('interval_ms', sampler.interval * 1000)) / 1000
+        if not (math.isfinite(seconds) and math.isfinite(interval)) or \
+                seconds <= 0 or interval <= 0:
+            raise ValueError("seconds and interval_ms must be positive")
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be positive numbers'}), 400
+    try:
+        counts = sampler.profile(seconds, interval)
+    except profiler.ProfilerBusyError as exc:
+        return jsonify({'error': str(exc)}), 409
+    return Response(sampler.collapsed(counts), mimetype='text/plain')
+
+@route('/admin/tracing', methods=['GET', 'POST'])
+@admin_required
+def admin_tracing():
+    """
+    Route reporting recent slow requests; a POST sets ``threshold_ms``, and
+    an empty value turns tracing off.
+    """
+    tracer = current_services().tracer
+    if request.method == 'POST':
+        value = request.form.get('threshold_ms', '')
+        try:
+            threshold = float(value) / 1000 if value else None
+            if threshold is not None and not (math.isfinite(threshold) and threshold >= 0):
+                raise ValueError("threshold_ms must be finite and not negative")
+        except ValueError:
+            return jsonify({'error': 'threshold_ms must be a number of at least 0'}), 400
+        tracer.threshold = threshold
+        LOGGER.info("Slow request tracing threshold set to %s ms", value or 'off')
+    stats = tracer.stats()
+    stats['traces'] = tracer.recent()
+    return jsonify(stats)
+
+@route('/admin/import', methods=['POST'])
+@admin_required
+def admin_import():
+    """
+    Route bulk importing customers from an uploaded ``file`` or the raw body,
+    as CSV or JSON lines (``format``, else guessed from the file name), and
+    reporting the rows rejected by line.
+    """
+    upload = request.files.get('file')
+    stream, filename = (upload.stream, upload.filename) if upload else (request.stream, '')
+    fmt = request.args.get('format') or importer.detect_format(filename)
+    if fmt not in importer.FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(importer.FORMATS)}'}), 400
+    lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    try:
+        report = importer.import_customers(current_services().get_customers(), lines, fmt,
+                                           current_app.config['PASSWORD_HASH_ITERATIONS'],
+                                           current_app.config['IMPORT_CHUNK_SIZE'])
+    except (UnicodeDecodeError, csv.Error, sqlite3.Error) as exc:
+        LOGGER.error("Customer import failed: %s", str(exc))
+        return jsonify({'error': f'import failed: {exc}'}), 400
+    return jsonify(report.to_dict())
+
+@route('/occupancy_stats')
+def occupancy_stats():
+    """
+    Route reporting spot sensor readings, suppressed flaps and published changes.
+    """
+    occupancy = current_services().occupancy
+    stats = occupancy.stats()
+    stats['occupied'] = occupancy.occupied_count()
+    stats['spots'] = occupancy.size
+    return jsonify(stats)
+
+def spot_json(spot):
+    """
+    Function to serialise a spot for JSON responses.
+    """
+    return {'id': spot.id, 'x': spot.x, 'y': spot.y} if spot is not None else None
+
+@route('/spot', methods=['GET'])
+def current_spot():
+    """
+    Route reporting the spot reserved for the logged-in user's vehicle.
+    """
+    vehicle_id = session.get('vehicle_id')
+    if vehicle_id is None:
+        return jsonify({'error': 'not logged in'}), 401
+    reservation = current_services().get_spots().reservation(vehicle_id)
+    return jsonify({'vehicle_id': vehicle_id, 'spot': spot_json(reservation)})
+
+@route('/allocate_spot', methods=['POST'])
+def allocate_spot():
+    """
+    Route reserving the free spot nearest to the vehicle for the logged-in user.
+
+    The position comes from ``x`` and ``y`` form fields, or else from the
+    vehicle's last relayed pose.
+    """
+    vehicle_id = session.get('vehicle_id')
+    if vehicle_id is None:
+        return jsonify({'error': 'not logged in'}), 401
+    try:
+        if 'x' in request.form and 'y' in request.form:
+            xpos, ypos = float(request.form['x']), float(request.form['y'])
+        else:
+            state = current_services().last_values.snapshot([None, vehicle_room(vehicle_id)])
+            pose = state['pose_update']
+            xpos, ypos = pose['x'], pose['y']
+        if not (math.isfinite(xpos) and math.isfinite(ypos)):
+            raise ValueError("position must be finite")
+    except (KeyError, ValueError):
+        return jsonify({'error': 'vehicle position unknown'}), 400
+    try:
+        spot = current_services().get_spots().allocate(vehicle_id, xpos, ypos)
+    except spots.NoFreeSpotError as exc:
+        LOGGER.warning("No spot for vehicle %s: %s", vehicle_id, str(exc))
+        return jsonify({'error': str(exc)}), 409
+    LOGGER.info("Spot %s reserved for vehicle %s", spot.id, vehicle_id)
+    return jsonify({'vehicle_id': vehicle_id, 'spot': spot_json(spot)})
+
+@route('/release_spot', methods=['POST'])
+def release_spot():
+    """
+    Route releasing the logged-in user's reserved spot.
+    """
+    vehicle_id = session.get('vehicle_id')
+    if vehicle_id is None:
+        return jsonify({'error': 'not logged in'}), 401
+    released = current_services().get_spots().release(vehicle_id)
+    return jsonify({'vehicle_id': vehicle_id, 'spot': spot_json(released)})
+
+@route('/history')
+def pose_history():
+    """
+    Route returning the car's poses over a time window, downsampled server-side.
+
+    Query parameters: ``start`` and ``end`` (epoch seconds, default the last
+    five minutes), ``points`` (2 to 5000, default 500) and ``mode`` (``lttb`` or
+    ``minmax``). Windows longer than HISTORY_MAX_WINDOW are cut to their most
+    recent part. Logged-in users get their vehicle's history, others the
+    broadcast stream.
+    """
+    vehicle_id = session.get('vehicle_id')
+    stream = vehicle_room(vehicle_id) if vehicle_id is not None else 'all'
+    try:
+        end = float(request.args.get('end', time.time()))
+        start = float(request.args.get('start', end - 300))
+        points = min(int(request.args.get('points', history.DEFAULT_POINTS)), 5000)
+        if not (math.isfinite(start) and math.isfinite(end)):
+            raise ValueError("start and end must be finite")
+    except ValueError:
+        return jsonify({'error': 'start, end and points must be numbers'}), 400
+    start = max(start, end - current_app.config['HISTORY_MAX_WINDOW'])
+    if points < 2:
+        return jsonify({'error': 'points must be at least 2'}), 400
+    mode = request.args.get('mode', 'lttb')
+    if mode not in history.DOWNSAMPLERS:
+        return jsonify({'error': f'unknown mode {mode}'}), 400
+    poses = current_services().history.window(stream, start, end)
+    sampled = history.DOWNSAMPLERS[mode](poses, points)
+    return jsonify({
+        'stream': stream,
+        'start': start,
+        'end': end,
+        'mode': mode,
+        'total': len(poses),
+        'points': [[round(stamp, 3), xpos, ypos] for stamp, xpos, ypos in sampled],
+    })
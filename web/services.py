@@ -0,0 +1,382 @@
+"""
+web/services.py
+The runtime components behind one web app: Socket.IO and the emit paths,
+the pose fan-out and what it feeds, metrics, diagnostics and the ROS bridge.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from flask import current_app
+from flask_socketio import SocketIO
+import db
+import history
+import metrics
+import profiler
+import spots
+from assets import Assets
+from backplane import message_queue_options
+from backpressure import Backpressure
+from bridge import LastValueCache, RosBridge, RosUnavailableError
+from eta import EtaTracker
+from fanout import PoseFanout
+from frames import PoseFrameEncoder
+from occupancy import OccupancyMap, status_payload
+from pagecache import PageCache
+from supervisor import ProcessSupervisor
+
+LOGGER = logging.getLogger(__name__)
+
+EXTENSION_NAME = 'parkonomous'
+
+# Pose events a paced client receives from its rooms' last values
+PACED_EVENTS = ('pose_update', 'user_update')
+
+# Events sent to their target room whose last value is replayed to new sockets
+STATE_EVENTS = ('destination_reached', 'eta_update')
+
+
+def pose_room(room, pose_format):
+    """
+    Return the room carrying poses for a target room in the given wire format.
+    """
+    return f'{room or "all"}:{pose_format}'
+
+
+def pose_target(name):
+    """
+    Return the target room of a JSON pose room, the inverse of ``pose_room``.
+    """
+    room = name.rpartition(':')[0]
+    return None if room == 'all' else room
+
+
+def current_services():
+    """
+    Return the services of the app handling the current request or socket event.
+    """
+    return current_app.extensions[EXTENSION_NAME]
+
+
+class Services:
+    """
+    Everything an app needs at runtime, built from its config.
+
+    Creating the services registers them on the app: the asset route, the
+    metrics and tracing hooks and ``app.extensions['parkonomous']``. The ROS
+    node class is only imported when the bridge starts.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        app.extensions[EXTENSION_NAME] = self
+
+        # Hashed, precompressed static files built by ``python -m assets build``
+        self.assets = Assets(app)
+
+        # Rendered bodies of the pages that do not depend on the request
+        self.page_cache = PageCache(version=self.assets.version)
+
+        # Initialize SocketIO for real-time communication, on a backplane if configured
+        queue_options = {}
+        if config['SOCKETIO_MESSAGE_QUEUE']:
+            queue_options = message_queue_options(config['SOCKETIO_MESSAGE_QUEUE'],
+                                                  config['SOCKETIO_QUEUE_WRITE_ONLY'])
+        self.socketio = SocketIO(app, async_mode=config['SOCKETIO_ASYNC_MODE'], **queue_options)
+        self._deliver_relayed = None
+        if queue_options and not config['SOCKETIO_QUEUE_WRITE_ONLY']:
+            # Bridge emits reach a worker through its client manager, not the fan-out
+            manager = self.socketio.server.manager
+            self._deliver_relayed = manager._handle_emit  # pylint: disable=protected-access
+            manager._handle_emit = self.handle_relayed_emit  # pylint: disable=protected-access
+            # Listen from the start, not from the first connection, so relayed
+            # parking changes are applied before a client asks for a snapshot
+            self.socketio.server.manager_initialized = True
+            manager.initialize()
+
+        # Prometheus metrics served at /metrics, with per-route request timings
+        self.metrics = metrics.Registry()
+        self.metrics.init_app(app)
+        self.emit_seconds = self.metrics.histogram(
+            'socketio_emit_seconds', 'Time spent in SOCKETIO.emit', ('event',))
+        self.emit_deliveries = self.metrics.counter(
+            'socketio_deliveries_total', 'Sockets on this worker reached by emits', ('event',))
+        self.ros_messages = self.metrics.counter(
+            'ros_messages_total', 'ROS messages received', ('topic',))
+        self.ros_callback_seconds = self.metrics.histogram(
+            'ros_callback_seconds', 'Time spent in ROS callbacks', ('callback',))
+        self.db_query_seconds = self.metrics.histogram(
+            'db_query_seconds', 'Time a pooled SQLite connection was held', ('query',))
+
+        # Runtime diagnostics switched on from the /admin routes
+        self.profiler = profiler.SamplingProfiler()
+        self.tracer = profiler.RequestTracer()
+        self.tracer.init_app(app)
+        db.set_query_observer(self.observe_query)
+        self.metrics.gauge('socketio_connected_clients', 'Connected Socket.IO clients',
+                           lambda: len(self.socketio.server.eio.sockets))
+
+        # Supervises the park node processes started from /run_ros2_node
+        self.supervisor = ProcessSupervisor(max_children=config['ROS2_MAX_CHILDREN'])
+        atexit.register(self.supervisor.shutdown)
+
+        # One binary frame encoder per target room (None is the broadcast stream)
+        self.frame_encoders = {}
+
+        # Coalesce high-rate pose messages before they reach the browsers
+        self.fanout = PoseFanout(self.emit_pose_json, rate_hz=config['POSE_FANOUT_HZ'],
+                                 batch_emit=self.emit_pose_frames,
+                                 spawn=self.socketio.start_background_task,
+                                 sleep=self.socketio.sleep)
+
+        # Spot occupancy fed by the parking sensors; only changed spots are broadcast
+        self.occupancy = OccupancyMap(config['PARKING_SPOTS'], settle=config['PARKING_SETTLE'])
+        self.fanout.on_flush(self.emit_parking_changes)
+
+        # Latest pose and destination values per room, replayed to new sockets
+        self.last_values = LastValueCache()
+
+        # Spot registry for /allocate_spot, loaded from SPOTS_FILE on first use
+        self.spots = None
+        self._spots_lock = threading.Lock()
+
+        # Recent car poses per vehicle for trails and replays
+        self.history = history.PoseHistory(config['HISTORY_CAPACITY'],
+                                           config['HISTORY_MAX_STREAMS'],
+                                           database=config['HISTORY_DATABASE'],
+                                           flush_interval=config['HISTORY_FLUSH_INTERVAL'])
+
+        # Distance, speed and ETA between each car and its user
+        self.eta = EtaTracker(smoothing=config['ETA_SMOOTHING'],
+                              min_change=config['ETA_MIN_CHANGE'])
+        self.fanout.on_flush(self.emit_eta_updates)
+
+        # Per-client send queues; slow clients get latest-only poses at a lower rate
+        self.backpressure = Backpressure(self.client_queue_size, self.join_pose_rooms,
+                                         self.send_latest, self.drop_client,
+                                         full_rate_hz=config['POSE_FANOUT_HZ'],
+                                         high_water=config['SEND_QUEUE_HIGH_WATER'],
+                                         low_water=config['SEND_QUEUE_LOW_WATER'],
+                                         slow_rate_hz=config['SLOW_CLIENT_HZ'],
+                                         stall_seconds=config['SLOW_CLIENT_STALL_SECONDS'])
+        self.fanout.on_flush(self.backpressure.check)
+
+        # Single owner of rclpy and the ROS node for this process
+        self.ros_bridge = RosBridge(self.make_ros_node, num_threads=config['ROS_EXECUTOR_THREADS'])
+        self._ros_warned = False
+        atexit.register(self.stop_ros_node)
+
+        # Counters the components already keep, read at scrape time
+        self.metrics.stats('pose_fanout', self.fanout.stats, 'Pose fan-out counter')
+        self.metrics.stats('occupancy', self.occupancy.stats, 'Spot occupancy counter')
+        self.metrics.stats('pose_history', self.history.stats, 'Pose history counter')
+        self.metrics.stats('eta', self.eta.stats, 'ETA tracker counter')
+        self.metrics.stats('page_cache', self.page_cache.stats, 'Rendered-page cache counter')
+        self.metrics.stats('backpressure', self.backpressure.stats, 'Client backpressure counter')
+
+    def observe_query(self, seconds, label):
+        """
+        Record a pooled SQLite block in the metrics and the current request trace.
+        """
+        self.db_query_seconds.observe(seconds, label)
+        self.tracer.span('db', label, seconds)
+
+    def socketio_emit(self, event, payload, to=None):
+        """
+        Emit through Socket.IO, timing the call and counting the sockets it reaches.
+        """
+        start = time.perf_counter()
+        self.socketio.emit(event, payload, to=to)
+        elapsed = time.perf_counter() - start
+        self.emit_seconds.observe(elapsed, event)
+        self.tracer.span('emit', event, elapsed)
+        self.emit_deliveries.inc(event, amount=len(
+            self.socketio.server.manager.rooms.get('/', {}).get(to, ())))
+
+    def emit_pose_json(self, event, payload, to=None):
+        """
+        Emit a pose dict to the clients of a room that asked for JSON poses.
+        """
+        self.socketio_emit(event, payload, to=pose_room(to, 'json'))
+
+    def emit_pose_frames(self, pending):
+        """
+        Pack car and user poses per room into one binary frame for binary clients.
+        """
+        grouped = {}
+        for (event, room), payload in pending.items():
+            grouped.setdefault(room, {})[event] = (payload['x'], payload['y'])
+        for room, poses in grouped.items():
+            encoder = self.frame_encoders.get(room)
+            if encoder is None:
+                # Stream ids start at 1; 0 is left to the per-client paced encoders
+                encoder = PoseFrameEncoder(stream=len(self.frame_encoders) + 1)
+                self.frame_encoders[room] = encoder
+            frame = encoder.encode(car=poses.get('pose_update'), user=poses.get('user_update'))
+            self.socketio_emit('pose_frame', frame, to=pose_room(room, 'binary'))
+
+    def handle_relayed_emit(self, message):
+        """
+        Deliver an emit from the message queue, first keeping the pose,
+        destination and ETA values another process sent, so paced clients
+        and new sockets on this worker get them from ``last_values``, and
+        applying relayed ``parking_status`` changes to this worker's
+        occupancy map for connect-time snapshots and spot allocation.
+        """
+        event, room, data = message.get('event'), message.get('room'), message.get('data')
+        remote = message.get('host_id') != self.socketio.server.manager.host_id
+        if remote and not message.get('binary') and isinstance(data, list) and len(data) == 1:
+            if event in PACED_EVENTS and room and room.endswith(':json'):
+                self.last_values.remember(pose_target(room), event, data[0])
+            elif event in STATE_EVENTS:
+                self.last_values.remember(room, event, data[0])
+            elif event == 'parking_status' and isinstance(data[0], dict) and \
+                    isinstance(data[0].get('parking_spots_status'), dict):
+                self.occupancy.apply(data[0]['parking_spots_status'])
+        self._deliver_relayed(message)
+
+    def emit_parking_changes(self):
+        """
+        Broadcast the spots whose occupancy settled since the last tick.
+        """
+        changed = self.occupancy.collect()
+        if changed:
+            self.socketio_emit('parking_status', status_payload(changed))
+
+    def emit_eta_updates(self):
+        """
+        Recompute the ETA of every stream that moved and emit the ones that changed.
+        """
+        for room, payload in self.eta.compute():
+            self.last_values.remember(room, 'eta_update', payload)
+            self.socketio_emit('eta_update', payload, to=room)
+
+    def client_queue_size(self, sid):
+        """
+        Return the packets waiting in a client's Engine.IO queue, or None if it is gone.
+        """
+        server = self.socketio.server
+        socket = server.eio.sockets.get(server.manager.eio_sid_from_sid(sid, '/'))
+        return None if socket is None else socket.queue.qsize()
+
+    def join_pose_rooms(self, client):
+        """
+        Put a client in the shared pose rooms of its format, or take a paced one out.
+        """
+        server = self.socketio.server
+        for room in client.rooms:
+            name = pose_room(room, client.pose_format)
+            if client.paced:
+                server.leave_room(client.sid, name)
+            else:
+                server.enter_room(client.sid, name)
+                if client.pose_format == 'binary' and room in self.frame_encoders:
+                    self.frame_encoders[room].force_keyframe()
+
+    def send_latest(self, client):
+        """
+        Send a paced client the poses of its rooms that changed since its last send.
+
+        Binary clients get a keyframe, so no frame depends on one they skipped.
+        """
+        latest = self.last_values.snapshot(client.rooms)
+        changed = [event for event in PACED_EVENTS
+                   if event in latest and latest[event] is not client.sent.get(event)]
+        if not changed:
+            return
+        for event in changed:
+            client.sent[event] = latest[event]
+        if client.pose_format == 'binary':
+            if client.encoder is None:
+                client.encoder = PoseFrameEncoder(keyframe_interval=0)
+            car, user = (latest.get(event) for event in PACED_EVENTS)
+            frame = client.encoder.encode(car=car and (car['x'], car['y']),
+                                          user=user and (user['x'], user['y']))
+            self.socketio_emit('pose_frame', frame, to=client.sid)
+        else:
+            for event in changed:
+                self.socketio_emit(event, latest[event], to=client.sid)
+
+    def drop_client(self, sid):
+        """
+        Disconnect a client and discard its queue without waiting for it to drain.
+        """
+        server = self.socketio.server
+        eio_sid = server.manager.eio_sid_from_sid(sid, '/')
+        server.disconnect(sid)
+        socket = server.eio.sockets.pop(eio_sid, None)
+        if socket is not None:
+            socket.close(wait=False, abort=True)
+
+    def emit_from_ros(self, event, payload, to=None):
+        """
+        Emit from a ROS callback by handing the emit to the fan-out loop, so ROS
+        threads never call into the Socket.IO server directly.
+        """
+        self.fanout.call_soon(self.socketio_emit, event, payload, to=to)
+
+    def make_ros_node(self, vehicle_ids):
+        """
+        Create the web ROS node wired to the fan-out and Socket.IO.
+        """
+        from bridge.node import ROSNode  # pylint: disable=import-outside-toplevel
+        return ROSNode(self.fanout, self.emit_from_ros, vehicle_ids,
+                       self.app.config['BROADCAST_LEGACY_TOPICS'],
+                       occupancy=self.occupancy, last_values=self.last_values,
+                       history=self.history, eta=self.eta,
+                       instrument=metrics.callback_instrument(self.ros_messages,
+                                                              self.ros_callback_seconds))
+
+    def start_ros_node(self):
+        """
+        Start the fan-out and history loops and the ROS bridge.
+
+        Without ROS 2 installed the web side keeps running with no live data.
+        """
+        self.fanout.start()
+        self.history.start()
+        try:
+            self.ros_bridge.start()
+        except RosUnavailableError as exc:
+            if not self._ros_warned:
+                self._ros_warned = True
+                LOGGER.warning("Serving without live ROS data: %s", str(exc))
+
+    def stop_ros_node(self):
+        """
+        Stop the ROS node and flush the fan-out.
+        """
+        self.ros_bridge.shutdown()
+        self.fanout.stop(timeout=1)
+        self.history.stop(timeout=1)
+
+    def get_db_connection(self):
+        """
+        Open a SQLite connection to the configured database.
+        """
+        return db.connect(self.app.config['DATABASE'])
+
+    def get_customers(self):
+        """
+        Return the cached customer repository backed by the shared connection pool.
+        """
+        config = self.app.config
+        return db.get_customers(config['DATABASE'], config['DB_POOL_SIZE'],
+                                config['CUSTOMER_CACHE_SIZE'], config['CUSTOMER_CACHE_TTL'])
+
+    def get_spots(self):
+        """
+        Return the spot registry for the configured lot layout, loading it on
+        first use; reservations go to SPOTS_DATABASE when one is set.
+        """
+        with self._spots_lock:
+            if self.spots is None:
+                config = self.app.config
+                pool = None
+                if config['SPOTS_DATABASE']:
+                    pool = db.get_pool(config['SPOTS_DATABASE'], config['DB_POOL_SIZE'])
+                self.spots = spots.SpotRegistry.from_file(config['SPOTS_FILE'],
+                                                          occupancy=self.occupancy, pool=pool)
+            return self.spots
@@ -0,0 +1,62 @@
+"""
+web/sockets.py
+Socket.IO event handlers of the web app, registered by ``register_sockets``.
+"""
+
+import logging
+from flask import current_app, request, session
+from flask_socketio import emit, join_room
+from bridge import vehicle_room
+from occupancy import status_payload
+from web.services import current_services
+
+LOGGER = logging.getLogger(__name__)
+
+def handle_connect():
+    """
+    Join the logged-in user's vehicle room so only its updates reach this socket.
+
+    Clients connecting with ``?pose_format=binary`` receive ``pose_frame``
+    binary frames instead of the ``pose_update``/``user_update`` dicts, and
+    ``?max_rate=<Hz>`` caps how often poses are sent to them. Every
+    client gets a full ``parking_status`` snapshot; later ones carry only
+    changes. A ``state_snapshot`` with the last known pose, user and
+    destination values, keyed by event name, is sent as soon as it connects.
+    """
+    services = current_services()
+    max_clients = current_app.config['MAX_CLIENTS']
+    if max_clients is not None and len(services.socketio.server.eio.sockets) > max_clients:
+        LOGGER.warning('Refusing Socket.IO connection: %d clients connected', max_clients)
+        return False
+    pose_format = 'binary' if request.args.get('pose_format') == 'binary' else 'json'
+    rooms = [None]
+    vehicle_id = session.get('vehicle_id')
+    if vehicle_id is not None:
+        rooms.append(vehicle_room(vehicle_id))
+        join_room(rooms[-1])
+        services.ros_bridge.watch_vehicle(vehicle_id)
+        LOGGER.info('Socket joined room for vehicle %s', vehicle_id)
+    try:
+        max_rate = float(request.args['max_rate'])
+    except (KeyError, ValueError):
+        max_rate = None
+    services.backpressure.add(request.sid, rooms, pose_format, max_rate)
+    emit('parking_status', status_payload(services.occupancy.snapshot(), snapshot=True))
+    state = services.last_values.snapshot(rooms)
+    if state:
+        emit('state_snapshot', state)
+    return None
+
+def handle_disconnect(reason=None):
+    """
+    Stop watching the send queue of a socket that went away.
+    """
+    current_services().backpressure.remove(request.sid)
+    LOGGER.debug('Socket %s disconnected: %s', request.sid, reason)
+
+def register_sockets(socketio):
+    """
+    Attach the event handlers to a Socket.IO server.
+    """
+    socketio.on('connect')(handle_connect)
+    socketio.on('disconnect')(handle_disconnect)